@@ -0,0 +1,277 @@
+# benchmarks/bench_app.py
+"""Headless benchmarks of the document, conversion, paint, navigation and action hot paths.
+
+    python -m benchmarks.bench_app [--output results.json] [--compare baseline.json] [--quick]
+
+Runs with QT_QPA_PLATFORM=offscreen against generated PNG and PDF fixtures and
+writes the timings as JSON, to benchmarks/benchmark-results.json by default.
+With --compare, each benchmark's median is compared with the same benchmark in
+an earlier results file, and the exit code is 1 when one got slower than
+--threshold times its baseline.
+"""
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+
+from PyQt6.QtGui import QImage
+from PyQt6.QtWidgets import QApplication
+
+import labeldoc
+from labeldoc.actions import ActionManager, DrawShapeAction, PanAction
+from labeldoc.controllers.app_controller import AppController
+from labeldoc.models.disk_cache import DiskPageCache
+from labeldoc.models.document_model import DocumentModel
+from labeldoc.utils.image_conversion import mapped_page_to_qimage, pil_to_qimage
+from labeldoc.views.main_view import MainWindow
+
+from .fixtures import PAGE_SIZES, make_page, make_pdf, make_png, make_shapes
+
+# Next to the benchmarks rather than in the working directory; ignored by git
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'benchmark-results.json')
+
+
+def measure(function, repeat=5, number=1, setup=None):
+    """Time function, number calls per sample, and return statistics in milliseconds per call."""
+    samples = []
+    for _ in range(repeat):
+        if setup is not None:
+            setup()
+        start = time.perf_counter()
+        for _ in range(number):
+            function()
+        samples.append((time.perf_counter() - start) * 1000 / number)
+    return {
+        'median_ms': statistics.median(samples),
+        'min_ms': min(samples),
+        'mean_ms': statistics.fmean(samples),
+        'repeat': repeat,
+        'number': number,
+    }
+
+
+class BenchmarkSuite:
+    def __init__(self, work_dir, quick=False):
+        self.work_dir = work_dir
+        self.quick = quick
+        self.results = {}
+
+    def run(self, name, function, **kwargs):
+        try:
+            result = function(**kwargs)
+        except Exception as e:
+            # E.g. poppler is not installed, the other benchmarks still run
+            result = {'error': f'{type(e).__name__}: {e}'}
+        self.results[name] = result
+        summary = result.get('error') or f"{result['median_ms']:10.3f} ms"
+        print(f'{name:<48} {summary}')
+
+    def new_model(self):
+        model = DocumentModel()
+        # A private disk cache, so that earlier runs and the user's cache do not skew the timings
+        model.disk_cache = DiskPageCache(os.path.join(self.work_dir, 'page-cache'), float('inf'))
+        model.disk_cache.clear()
+        return model
+
+    # Benchmarks
+
+    def load_document(self, paths):
+        """Open the document and render its first page, with cold caches."""
+        holder = {}
+
+        def setup():
+            holder['model'] = self.new_model()
+
+        def load():
+            holder['model'].load_document(paths)
+            holder['model'].get_current_page()
+
+        return measure(load, repeat=3 if self.quick else 5, setup=setup)
+
+    def pil_to_qimage(self, image):
+        return measure(lambda: pil_to_qimage(image), repeat=5, number=3 if self.quick else 10)
+
+    def mapped_to_qimage(self, page):
+        return measure(lambda: mapped_page_to_qimage(page), repeat=5, number=3 if self.quick else 10)
+
+    def paint(self, canvas, target, zoom_level):
+        canvas.set_zoom_level(zoom_level)
+        canvas.offset = canvas.bound_offset(canvas.offset)
+        return measure(lambda: canvas.render(target), repeat=5, number=5 if self.quick else 20)
+
+    def navigation(self, app, controller, page_count, warm):
+        """Time next_page through the controller, including the paint of the new page."""
+        target = QImage(controller.view.canvas.size(), QImage.Format.Format_ARGB32_Premultiplied)
+
+        def setup():
+            controller.first_page()
+            if not warm:
+                controller.model.page_cache.clear()
+                controller.view.canvas.qimage_cache.clear()
+                controller.model.disk_cache.clear()
+            app.processEvents()
+
+        def walk():
+            for _ in range(page_count - 1):
+                controller.next_page()
+                controller.view.canvas.render(target)
+                app.processEvents()
+
+        stats = measure(walk, repeat=3)
+        return {key: value / (page_count - 1) if key.endswith('_ms') else value for key, value in stats.items()}
+
+    def action_manager(self, make_action, count):
+        """Execute count actions, in milliseconds per action."""
+        def execute():
+            manager = ActionManager()
+            for _ in range(count):
+                manager.do_action(make_action())
+
+        stats = measure(execute, repeat=3)
+        stats = {key: value / count if key.endswith('_ms') else value for key, value in stats.items()}
+        return stats | {'actions': count, 'actions_per_second': 1000 / stats['median_ms']}
+
+
+def run_suite(work_dir, quick=False):
+    app = QApplication.instance() or QApplication(sys.argv)
+    suite = BenchmarkSuite(work_dir, quick)
+    sizes = {'small': PAGE_SIZES['small'], 'letter-150dpi': PAGE_SIZES['letter-150dpi']} if quick else PAGE_SIZES
+
+    # Fixtures
+    pngs = {name: make_png(os.path.join(work_dir, f'{name}.png'), size) for name, size in sizes.items()}
+    page_counts = (10,) if quick else (10, 100)
+    pdfs = {count: make_pdf(os.path.join(work_dir, f'{count}-pages.pdf'), count) for count in page_counts}
+    png_pages = [make_png(os.path.join(work_dir, f'page-{number}.png'), PAGE_SIZES['letter-150dpi'], number)
+                 for number in range(10)]
+
+    # DocumentModel.load_document
+    for name, path in pngs.items():
+        suite.run(f'load_document/png/{name}', suite.load_document, paths=path)
+    for count, path in pdfs.items():
+        suite.run(f'load_document/pdf/{count}-pages', suite.load_document, paths=path)
+
+    # pil_to_qimage
+    for name, size in sizes.items():
+        for mode in ('RGB', 'RGBA', 'L', 'P', '1'):
+            suite.run(f'pil_to_qimage/{mode}/{name}', suite.pil_to_qimage, image=make_page(size, mode=mode))
+
+    # mapped_page_to_qimage, over pages stored in a disk cache
+    disk_cache = DiskPageCache(os.path.join(work_dir, 'mapped-pages'), float('inf'))
+    for name, size in sizes.items():
+        for mode in ('RGB', 'L', '1'):
+            disk_cache.put(name, 0, 0, mode, make_page(size, mode=mode))
+            suite.run(f'mapped_to_qimage/{mode}/{name}', suite.mapped_to_qimage, page=disk_cache.map(name, 0, 0, mode))
+
+    # CanvasWidget.paintEvent
+    window = MainWindow()
+    window.resize(1280, 900)
+    window.show()
+    canvas = window.canvas
+    size = PAGE_SIZES['letter-150dpi']
+    canvas.load_image(make_page(size))
+    app.processEvents()
+    time.sleep(0.5)  # Let the tile pyramid build
+    app.processEvents()
+    target = QImage(canvas.size(), QImage.Format.Format_ARGB32_Premultiplied)
+    for shape_count in ((0, 1000) if quick else (0, 1000, 10000)):
+        canvas.load_shapes(make_shapes(shape_count, size))
+        for zoom_level in (canvas.calculate_zoom_to_fit_page(), 1.0, 4.0):
+            label = 'fit' if zoom_level < 1.0 else f'{zoom_level:g}x'
+            suite.run(f'paint/{shape_count}-shapes/zoom-{label}', suite.paint, canvas=canvas, target=target, zoom_level=zoom_level)
+    window.close()
+
+    # Page navigation through AppController
+    window = MainWindow()
+    window.resize(1280, 900)
+    window.show()
+    # Annotations are journaled in the work directory, not in the user's data directory
+    controller = AppController(suite.new_model(), window, os.path.join(work_dir, 'annotations.json'))
+    controller.load_document(png_pages)
+    for warm in (False, True):
+        suite.run(f"navigation/next_page/png-{len(png_pages)}-pages/{'warm' if warm else 'cold'}", suite.navigation,
+                  app=app, controller=controller, page_count=len(png_pages), warm=warm)
+    controller.shutdown()
+    window.close()
+
+    # ActionManager throughput
+    count = 2000 if quick else 20000
+    shapes = make_shapes(count, size)
+    window = MainWindow()
+    canvas = window.canvas
+    shape_iter = iter(shapes * 3)
+    suite.run('action_manager/draw_shape', suite.action_manager,
+              make_action=lambda: DrawShapeAction(canvas, next(shape_iter)), count=count)
+    start, end = canvas.offset, canvas.offset
+    suite.run('action_manager/pan_coalesced', suite.action_manager,
+              make_action=lambda: PanAction(canvas, start, end), count=count)
+    return suite.results
+
+
+def environment():
+    try:
+        commit = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                                cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        'labeldoc_version': labeldoc.__version__,
+        'commit': commit,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print the change of each benchmark against baseline and return the names of the regressions."""
+    regressions = []
+    print()
+    print(f'=== COMPARISON (regression above {threshold:.2f}x) ===')
+    for name, result in results.items():
+        previous = baseline.get(name, {})
+        if 'median_ms' not in result or 'median_ms' not in previous:
+            continue
+        ratio = result['median_ms'] / previous['median_ms'] if previous['median_ms'] else float('inf')
+        flag = ''
+        if ratio > threshold:
+            regressions.append(name)
+            flag = '  REGRESSION'
+        print(f'{name:<48} {previous["median_ms"]:10.3f} -> {result["median_ms"]:10.3f} ms ({ratio:5.2f}x){flag}')
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--output', default=DEFAULT_OUTPUT, help='JSON file the results are written to.')
+    parser.add_argument('--compare', help='Earlier results file to compare against.')
+    parser.add_argument('--threshold', type=float, default=1.25, help='Slowdown ratio reported as a regression.')
+    parser.add_argument('--quick', action='store_true', help='Fewer sizes and repetitions, for a smoke run.')
+    args = parser.parse_args(argv)
+
+    output = os.path.abspath(args.output)
+    with tempfile.TemporaryDirectory() as work_dir:
+        results = run_suite(work_dir, args.quick)
+
+    with open(output, 'w') as f:
+        json.dump({'environment': environment(), 'quick': args.quick, 'results': results}, f, indent=2)
+    print(f'\nResults written to {output}')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+        if compare(results, baseline, args.threshold):
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
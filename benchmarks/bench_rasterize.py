@@ -0,0 +1,53 @@
+# benchmarks/bench_rasterize.py
+"""Compare PDF rasterization throughput across worker counts.
+
+    python -m benchmarks.bench_rasterize [file.pdf] [--pages 300] [--workers 1 2 4 8] [--profile default]
+
+Without a file, a PDF of --pages synthetic pages is generated first.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from labeldoc.config.settings import RASTER_PROFILE, RASTER_PROFILES
+from labeldoc.models.rasterizer import rasterize_pdf
+
+from .fixtures import make_pdf
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('pdf', nargs='?', help='PDF to rasterize (default: a generated one).')
+    parser.add_argument('--pages', type=int, default=300, help='Pages of the generated PDF.')
+    parser.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, os.cpu_count() or 1])
+    parser.add_argument('--profile', choices=sorted(RASTER_PROFILES), default=RASTER_PROFILE)
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        path = args.pdf
+        if path is None:
+            path = os.path.join(temp_dir, 'bench.pdf')
+            print(f'Generating a {args.pages}-page PDF...')
+            make_pdf(path, args.pages)
+
+        from pdf2image import pdfinfo_from_path
+        page_count = int(pdfinfo_from_path(path)['Pages'])
+        print(f'{path}: {page_count} pages, profile {args.profile!r}')
+        print(f"{'workers':>8} {'seconds':>9} {'pages/s':>9} {'speedup':>8}")
+        baseline = None
+        for workers in sorted(set(args.workers)):
+            start = time.perf_counter()
+            images = rasterize_pdf(path, 1, page_count, args.profile, workers)
+            seconds = time.perf_counter() - start
+            assert len(images) == page_count
+            del images
+            baseline = baseline or seconds
+            print(f'{workers:>8} {seconds:>9.2f} {page_count / seconds:>9.1f} {baseline / seconds:>7.2f}x')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
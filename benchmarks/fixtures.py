@@ -0,0 +1,46 @@
+# benchmarks/fixtures.py
+"""Generated documents and shapes for the benchmarks."""
+
+import random
+
+from PIL import Image, ImageDraw
+
+from labeldoc.models.shape import Shape
+
+# Page sizes in pixels: a small screenshot-like page and letter pages at 150 and 300 DPI
+PAGE_SIZES = {'small': (800, 1000), 'letter-150dpi': (1275, 1650), 'letter-300dpi': (2550, 3300)}
+
+
+def make_page(size, number=1, mode='RGB'):
+    """Return a page image of size with lines of text and a frame, like a scanned document."""
+    width, height = size
+    page = Image.new('RGB', size, 'white')
+    draw = ImageDraw.Draw(page)
+    line_height = max(12, height // 60)
+    for line, y in enumerate(range(line_height * 2, height - line_height * 2, line_height)):
+        draw.text((width // 15, y), f'Page {number}, line {line + 1}: the quick brown fox jumps over the lazy dog', fill='black')
+    draw.rectangle((width // 20, height // 20, width - width // 20, height - height // 20), outline='blue')
+    return page.convert(mode)
+
+
+def make_png(path, size, number=1):
+    make_page(size, number).save(path)
+    return path
+
+
+def make_pdf(path, page_count, size=(612, 792)):
+    """Write a PDF of page_count pages, letter size by default."""
+    pages = [make_page(size, number + 1) for number in range(page_count)]
+    pages[0].save(path, save_all=True, append_images=pages[1:], resolution=72)
+    return path
+
+
+def make_shapes(count, size, seed=0):
+    """Return count random rectangles within a page of size."""
+    rng = random.Random(seed)
+    width, height = size
+    shapes = []
+    for index in range(count):
+        x, y = rng.uniform(0, width - 50), rng.uniform(0, height - 20)
+        shapes.append(Shape(f'label-{index % 8}', [(x, y), (x + rng.uniform(10, 200), y + rng.uniform(8, 40))]))
+    return shapes
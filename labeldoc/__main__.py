@@ -1,48 +1,99 @@
 # app/main.py
 
+import time
+_START_TIME = time.perf_counter()  # Before any labeldoc or Qt import, for --profile-startup
+
 import sys
 import argparse
-from PyQt6.QtWidgets import QApplication
-from .views.main_view import MainWindow
 from .config.settings import APP_NAME, WINDOW_WIDTH, WINDOW_HEIGHT
-from .config.themes import DARK_THEME
-
-from .models.document_model import DocumentModel
-from .controllers.app_controller import AppController
+from .utils import instrumentation
+from .utils.startup_profiler import StartupProfiler, on_first_paint
 
 def main():
 
+    # Headless subcommands run without importing Qt
+    if len(sys.argv) > 1 and sys.argv[1] == 'ingest':
+        from .ingest import main as ingest_main
+        sys.exit(ingest_main(sys.argv[2:]))
+    if len(sys.argv) > 1 and sys.argv[1] == 'export':
+        from .export import main as export_main
+        sys.exit(export_main(sys.argv[2:]))
+
     # Parse command-line arguments
-    parser = argparse.ArgumentParser(description=f'{APP_NAME} - A document annotation tool.')
+    parser = argparse.ArgumentParser(description=f'{APP_NAME} - A document annotation tool.',
+                                     epilog=f'Run "{APP_NAME} ingest --help" to pre-rasterize a directory of documents, '
+                                            f'"{APP_NAME} export --help" to export the annotations as a dataset.')
     parser.add_argument('file', nargs='?', help='The path to the file to open on startup.')
+    parser.add_argument('--workspace', metavar='DIRECTORY',
+                        help='Open the documents under DIRECTORY as a workspace, at its first unlabeled page.')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='Print the time spent in each startup phase up to the first paint, then exit.')
+    parser.add_argument('--instrument', action='store_true',
+                        help='Time the hot paths from startup; timings are shown in the results dock and can be dumped from the toolbar.')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='Trace Python allocations with tracemalloc, for the memory report.')
     args = parser.parse_args()
+    if args.instrument:
+        instrumentation.enable()
+    if args.trace_memory:
+        import tracemalloc
+        tracemalloc.start()
+    profiler = StartupProfiler(args.profile_startup, _START_TIME)
+    profiler.mark('Python and settings')
 
-    app = QApplication(sys.argv)
+    with profiler.phase('Import Qt'):
+        from PyQt6.QtWidgets import QApplication
+    with profiler.phase('Import views'):
+        from .views.main_view import MainWindow
+        from .config.themes import DARK_THEME
+    with profiler.phase('Import models'):
+        from .models.document_model import DocumentModel
+    with profiler.phase('Import controllers'):
+        from .controllers.app_controller import AppController
 
-    # Apply the dark theme
-    app.setStyleSheet(DARK_THEME)
+    with profiler.phase('Create QApplication'):
+        app = QApplication(sys.argv)
+
+        # Apply the dark theme
+        app.setStyleSheet(DARK_THEME)
 
     # Initialize the model
-    model = DocumentModel()
+    with profiler.phase('Create model'):
+        model = DocumentModel()
 
     # Initialize the main window (view)
-    main_window = MainWindow()
-    main_window.setGeometry(100, 100, WINDOW_WIDTH, WINDOW_HEIGHT)
-    main_window.setWindowTitle(APP_NAME)
+    with profiler.phase('Create main window'):
+        main_window = MainWindow()
+        main_window.setGeometry(100, 100, WINDOW_WIDTH, WINDOW_HEIGHT)
+        main_window.setWindowTitle(APP_NAME)
 
     # Initialize the controller, passing the model and the view
-    controller = AppController(model, main_window)
+    with profiler.phase('Create controller'):
+        controller = AppController(model, main_window)
 
     # Load the given file, if any
     if args.file:
-        main_window.setWindowTitle(f"{APP_NAME} - {args.file}")
-        main_window.controller.load_document(args.file)
+        with profiler.phase('Load document'):
+            main_window.setWindowTitle(f"{APP_NAME} - {args.file}")
+            main_window.controller.load_document(args.file)
 
     # Set the controller in the view
     main_window.set_controller(controller)
 
+    if args.workspace:
+        with profiler.phase('Open workspace'):
+            main_window.open_workspace(args.workspace)
+
     # Show the main window
-    main_window.show()
+    with profiler.phase('Show main window'):
+        main_window.show()
+
+    if args.profile_startup:
+        def report_and_quit():
+            profiler.mark('Event loop to first paint')
+            print(profiler.report())
+            main_window.close()  # Shuts the controller down and ends the event loop
+        on_first_paint(main_window, report_and_quit)
 
     # Start the application's event loop
     sys.exit(app.exec())
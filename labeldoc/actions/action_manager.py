@@ -1,36 +1,63 @@
+import time
+from collections import deque
+
+from ..config.settings import ACTION_LOG_SIZE, MAX_UNDO_STEPS, ACTION_COALESCE_SECONDS
+
+
 class ActionManager:
-    def __init__(self, track_all=False):
-        self.undo_stack = []
-        self.redo_stack = []
-        self.action_log = []
+    """Executes user actions, keeps the undo/redo stacks and a bounded action log.
+
+    Log records are (event, timestamp, action type, log args) tuples, formatted
+    only when the log is printed. Consecutive actions that support merging
+    (e.g. pan and zoom steps) are folded into one logical action.
+    """
+
+    def __init__(self, track_all=False, log_size=ACTION_LOG_SIZE, max_undo=MAX_UNDO_STEPS,
+                 coalesce_seconds=ACTION_COALESCE_SECONDS):
+        self.undo_stack = deque(maxlen=max_undo)
+        self.redo_stack = deque(maxlen=max_undo)
+        self.action_log = deque(maxlen=log_size)
         self.track_all = track_all
+        self.coalesce_seconds = coalesce_seconds
+        self._last_action = None  # Last executed action, while it can still absorb the next one
 
     def do_action(self, action):
         action.execute()
+        now = time.monotonic()
+        last = self._last_action
+        if last is not None and now - self.action_log[-1][1] <= self.coalesce_seconds and last.merge(action):
+            self.action_log[-1] = ("Executed", now, type(last), last.log_args())
+            return
         if action.track_undo or self.track_all:
             self.undo_stack.append(action)
             self.redo_stack.clear()
-        self.action_log.append(f"Executed: {action.description}")
+        self._log("Executed", action)
+        self._last_action = action
 
     def undo(self):
         if self.undo_stack:
             action = self.undo_stack.pop()
             action.undo()
             self.redo_stack.append(action)
-            self.action_log.append(f"Undone: {action.description}")
+            self._log("Undone", action)
 
     def redo(self):
         if self.redo_stack:
             action = self.redo_stack.pop()
             action.redo()
             self.undo_stack.append(action)
-            self.action_log.append(f"Redone: {action.description}")
+            self._log("Redone", action)
+
+    def _log(self, event, action):
+        self.action_log.append((event, time.monotonic(), type(action), action.log_args()))
+        if event != "Executed":
+            self._last_action = None
 
     def print_action_log(self):
         if self.action_log:
             print()
             print('=== USER ACTION LOG ===')
-            for log_entry in self.action_log:
-                print(log_entry)
+            for event, _, action_type, args in self.action_log:
+                print(f"{event}: {action_type.format_log(args)}")
         else:
             print('=== USER ACTION LOG EMPTY ===')
@@ -1,9 +1,29 @@
 class UserAction:
-    def __init__(self, description, can_undo=True, track_undo=True):
-        self.description = description
+    def __init__(self, description=None, can_undo=True, track_undo=True):
+        self._description = description
         self.can_undo = can_undo
         self.track_undo = track_undo
 
+    @property
+    def description(self):
+        """Human-readable description, formatted on demand from log_args()."""
+        if self._description is not None:
+            return self._description
+        return self.format_log(self.log_args())
+
+    def log_args(self):
+        """Return the arguments stored in the action log for this action."""
+        return ()
+
+    @classmethod
+    def format_log(cls, args):
+        """Format the log arguments of an action of this type."""
+        return cls.__name__
+
+    def merge(self, other):
+        """Fold a consecutive action into this one. Returns True if merged."""
+        return False
+
     def execute(self):
         raise NotImplementedError
 
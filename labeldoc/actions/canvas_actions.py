@@ -1,19 +1,29 @@
 from .base_action import UserAction
 
 
-def qpoint_to_str(p):
-    return f'({p.x()}, {p.y()})'
-
-
 class PanAction(UserAction):
     def __init__(self, canvas, start_pos, end_pos):
-
-        super().__init__(f"Pan from {qpoint_to_str(start_pos)} to {qpoint_to_str(end_pos)}", track_undo=False)
+        super().__init__(track_undo=False)
         self.canvas = canvas
         self.start_pos = start_pos
         self.end_pos = end_pos
         self.offset_delta = end_pos - start_pos
 
+    def log_args(self):
+        return (self.start_pos.x(), self.start_pos.y(), self.end_pos.x(), self.end_pos.y())
+
+    @classmethod
+    def format_log(cls, args):
+        return "Pan from ({}, {}) to ({}, {})".format(*args)
+
+    def merge(self, other):
+        """Extend this pan by a consecutive pan of the same canvas."""
+        if type(other) is not PanAction or other.canvas is not self.canvas:
+            return False
+        self.offset_delta += other.offset_delta
+        self.end_pos = self.start_pos + self.offset_delta
+        return True
+
     def execute(self):
         """Apply the pan by adjusting the canvas offset."""
         self.canvas.pan(self.offset_delta)
@@ -31,11 +41,25 @@ class PanAction(UserAction):
 
 class ZoomAction(UserAction):
     def __init__(self, canvas, old_zoom, new_zoom):
-        super().__init__(f"Zoom from {old_zoom} to {new_zoom}", track_undo=False)
+        super().__init__(track_undo=False)
         self.canvas = canvas
         self.old_zoom = old_zoom
         self.new_zoom = new_zoom
 
+    def log_args(self):
+        return (self.old_zoom, self.new_zoom)
+
+    @classmethod
+    def format_log(cls, args):
+        return "Zoom from {} to {}".format(*args)
+
+    def merge(self, other):
+        """Extend this zoom by a consecutive zoom of the same canvas."""
+        if type(other) is not ZoomAction or other.canvas is not self.canvas:
+            return False
+        self.new_zoom = other.new_zoom
+        return True
+
     def execute(self):
         self.canvas.set_zoom_level(self.new_zoom)
 
@@ -44,10 +68,16 @@ class ZoomAction(UserAction):
 
 class InitialZoomAction(UserAction):
     def __init__(self, canvas):
-        initial_zoom = canvas.calculate_initial_zoom()
-        super().__init__(f"Initial to {initial_zoom}", can_undo=False, track_undo=False)
+        super().__init__(can_undo=False, track_undo=False)
         self.canvas = canvas
-        self.initial_zoom = initial_zoom
+        self.initial_zoom = canvas.calculate_initial_zoom()
+
+    def log_args(self):
+        return (self.initial_zoom,)
+
+    @classmethod
+    def format_log(cls, args):
+        return "Initial to {}".format(*args)
 
     def execute(self):
         self.canvas.update_min_zoom_level()
@@ -55,12 +85,17 @@ class InitialZoomAction(UserAction):
 
 class ZoomToFitPageAction(UserAction):
     def __init__(self, canvas):
-        old_zoom = canvas.zoom_level
-        new_zoom = self.canvas.calculate_zoom_to_fit_page()
-        super().__init__(f"Zoom to fit page from {old_zoom} to {new_zoom}", track_undo=False)
+        super().__init__(track_undo=False)
         self.canvas = canvas
-        self.old_zoom = old_zoom
-        self.new_zoom = new_zoom
+        self.old_zoom = canvas.zoom_level
+        self.new_zoom = canvas.calculate_zoom_to_fit_page()
+
+    def log_args(self):
+        return (self.old_zoom, self.new_zoom)
+
+    @classmethod
+    def format_log(cls, args):
+        return "Zoom to fit page from {} to {}".format(*args)
 
     def execute(self):
         self.canvas.set_zoom_level(self.new_zoom)
@@ -70,12 +105,17 @@ class ZoomToFitPageAction(UserAction):
 
 class ZoomToFitWidthAction(UserAction):
     def __init__(self, canvas):
-        old_zoom = canvas.zoom_level
-        new_zoom = self.canvas.calculate_zoom_to_fit_width()
-        super().__init__(f"Zoom to fit width from {old_zoom} to {new_zoom}", track_undo=False)
+        super().__init__(track_undo=False)
         self.canvas = canvas
-        self.old_zoom = old_zoom
-        self.new_zoom = new_zoom
+        self.old_zoom = canvas.zoom_level
+        self.new_zoom = canvas.calculate_zoom_to_fit_width()
+
+    def log_args(self):
+        return (self.old_zoom, self.new_zoom)
+
+    @classmethod
+    def format_log(cls, args):
+        return "Zoom to fit width from {} to {}".format(*args)
 
     def execute(self):
         self.canvas.set_zoom_level(self.new_zoom)
@@ -2,10 +2,23 @@ from .base_action import UserAction
 
 
 class DrawShapeAction(UserAction):
-    def __init__(self, canvas, shape):
-        super().__init__(f"Draw shape: {shape}")
+    def __init__(self, canvas, shape, snap_to_words=False):
+        """With snap_to_words, a rectangle is fitted to the words of the page text layer it touches."""
+        super().__init__()
         self.canvas = canvas
         self.shape = shape
+        if snap_to_words and shape.shape_type == 'rectangle':
+            box = canvas.snap_box_to_words(shape.bounding_box())
+            if box is not None:
+                shape.points = [(box[0], box[1]), (box[2], box[3])]
+
+    def log_args(self):
+        # The id and box only, so the action log does not keep drawn shapes alive
+        return (self.shape.id, *self.shape.bounding_box())
+
+    @classmethod
+    def format_log(cls, args):
+        return "Draw shape {}: ({:.1f}, {:.1f}) to ({:.1f}, {:.1f})".format(*args)
 
     def execute(self):
         self.canvas.add_shape(self.shape)
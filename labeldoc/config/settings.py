@@ -1,9 +1,72 @@
 # config.py
 
+import os
+
 # Application Settings
 APP_NAME = "labeldoc"
 WINDOW_WIDTH = 1200
 WINDOW_HEIGHT = 800
 
 # Paths
-DEFAULT_SAVE_PATH = "annotations.json"
+DATA_DIR = os.path.join(os.environ.get("XDG_DATA_HOME") or os.path.join(os.path.expanduser("~"), ".local", "share"), "labeldoc")
+DEFAULT_SAVE_PATH = os.path.join(DATA_DIR, "annotations.json")  # Annotation snapshot, journaled next to it
+WORKSPACE_CATALOG_NAME = ".labeldoc-workspace.sqlite3"  # Catalog file created in a workspace directory
+CATALOG_COMMIT_DOCUMENTS = 50  # Documents cataloged between commits and progress updates
+
+# Page cache
+PAGE_CACHE_BUDGET_BYTES = 512 * 1024 * 1024  # Decoded pages kept in memory
+QIMAGE_CACHE_BUDGET_BYTES = 256 * 1024 * 1024  # Pages converted for display
+MEMORY_BUDGET_BYTES = 640 * 1024 * 1024  # All in-memory page representations together, see MemoryBudget
+PAGE_DISK_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "labeldoc", "pages")
+PAGE_DISK_CACHE_BUDGET_BYTES = 4 * 1024 * 1024 * 1024
+
+# Rasterization
+RASTER_DPI = 200
+RASTER_GRAYSCALE = False
+RASTER_WORKERS = os.cpu_count() or 1  # Poppler processes sharing a page range
+RASTER_MONO = False  # Render bilevel (1 bit per pixel) pages, for text-only scans
+RASTER_COMPACT_MODES = True  # Keep pages in the most compact exact mode: bilevel, grayscale or palette
+RASTER_PROFILE = "default"
+RASTER_PROFILES = {  # Rasterization options by document class; fmt is the poppler output format
+    "default": {"dpi": RASTER_DPI, "grayscale": RASTER_GRAYSCALE, "fmt": "ppm"},
+    "scan": {"dpi": 150, "grayscale": True, "fmt": "ppm"},
+    "bilevel": {"dpi": 300, "grayscale": True, "mono": True, "fmt": "ppm"},
+    "print": {"dpi": 300, "grayscale": False, "fmt": "ppm"},
+}
+
+# Prefetching
+PREFETCH_AHEAD = 2  # Pages rendered ahead of the current page
+PREFETCH_BEHIND = 1  # Pages rendered behind the current page
+PREFETCH_WORKERS = 2
+
+# Rendering
+TILE_SIZE = 256  # Edge length in pixels of a tile in the rendering pyramid
+GRID_CELL_SIZE = 256  # Cell size in image pixels of the shape spatial index
+DETAIL_RENDER_DELAY_MS = 200  # Zoom/pan quiet time before the visible region is re-rasterized
+DETAIL_MAX_DPI = 600  # Highest DPI of region re-rasterization
+DETAIL_MAX_PIXELS = 8 * 1024 * 1024  # Pixel budget of one region render
+CONTINUOUS_PAGE_SPACING = 12  # Pixels between pages in the continuous-scroll view
+CONTINUOUS_PRELOAD_PAGES = 2  # Pages rendered ahead of the view on each side while scrolling
+DETAIL_MARGIN = 0.25  # Extra region rendered around the view, as a fraction of its size, to absorb small pans
+
+# Annotations
+SHAPE_LINE_COLOR = "#00FF00"
+TEXT_LAYER_ENABLED = True  # Extract PDF word boxes in the background, to snap shapes to words
+TEXT_LAYER_CHUNK_PAGES = 32  # Pages whose words are extracted by one pdftotext run
+TEXT_LAYER_CACHED_PAGES = 64  # Word indexes of recently viewed pages kept in memory
+WORD_SHAPE_LABEL = "word"  # Label of the shapes drawn by double-clicking a word
+JOURNAL_FLUSH_INTERVAL = 0.5  # Seconds of journal records collected into one fsync
+JOURNAL_COMPACT_RECORDS = 5000  # Journal records written before folding them into the snapshot
+AUTOSAVE_INTERVAL_MS = 5000
+
+# Actions
+ACTION_LOG_SIZE = 10000  # Records kept in the action log ring buffer
+MAX_UNDO_STEPS = 100
+ACTION_COALESCE_SECONDS = 0.5  # Consecutive pans or zooms closer than this are merged
+DEFAULT_REFRESH_RATE = 60  # Frames per second used when the screen does not report one
+FRAME_STATS_WINDOW = 600  # Frames kept for input-to-paint latency statistics
+
+# Instrumentation
+INSTRUMENTATION_ENABLED = False  # Hot-path timers, also enabled with --instrument or from the toolbar
+INSTRUMENTATION_TRACE_SIZE = 50000  # Timings kept for the Chrome trace dump
+INSTRUMENTATION_REFRESH_MS = 1000  # Refresh interval of the live timings in the results dock
@@ -1,59 +1,216 @@
 # app/controllers/app_controller.py
+import os
+from PyQt6.QtCore import QTimer
+from ..config.settings import AUTOSAVE_INTERVAL_MS, DEFAULT_SAVE_PATH, TEXT_LAYER_ENABLED, WORKSPACE_CATALOG_NAME
+from ..models.annotation_journal import AnnotationJournal
 from ..models.document_model import DocumentModel
-from ..widgets.web_view import BrowserWindow
+from ..models.memory_budget import MemoryBudget
+from ..models.workspace_catalog import UNLABELED, WorkspaceCatalog
+from ..utils.instrumentation import timed
+from .prefetcher import PagePrefetcher
+from .text_layer_loader import TextLayerLoader
+from .workspace_indexer import WorkspaceIndexer
 
 class AppController:
-    def __init__(self, model, view):
+    def __init__(self, model, view, annotations_path=DEFAULT_SAVE_PATH):
         self.model: DocumentModel = model
         self.view = view
+        self.prefetcher = PagePrefetcher(model, view.canvas.qimage_cache)
+        self.text_layer = TextLayerLoader(model)
+
+        # One memory budget over every in-memory copy of the pages; PIL pages go before QImages
+        self.memory_budget = MemoryBudget()
+        self.memory_budget.track_cache('pil', model.page_cache, superseded_by=view.canvas.qimage_cache)
+        self.memory_budget.track_cache('qimage', view.canvas.qimage_cache)
+        self.memory_budget.track_holder('canvas', view.canvas.memory_usage)
+        self.journal = AnnotationJournal(annotations_path)
+        self.model.attach_journal(self.journal)
+        self.continuous = False  # Whether all pages are shown in one scroll instead of the canvas
+        self.streamed_source = None  # ImageListPageSource of the web page capture in progress
+        self.workspace_indexer = None  # WorkspaceIndexer of the open workspace
+        self.view.continuous_view.current_page_changed.connect(self.set_current_page)
         self.view.set_controller(self)
 
+        # Periodically journal the shapes of the current page
+        self.autosave_timer = QTimer()
+        self.autosave_timer.timeout.connect(self.save_annotations)
+        self.autosave_timer.start(AUTOSAVE_INTERVAL_MS)
+
     def load_document(self, file_path):
+        self.stop_streamed_images()
+        self.prefetcher.reset()
+        self.text_layer.reset()
         self.model.load_document(file_path)
         self.update_view()
     
+    def open_workspace(self, directory):
+        """Open the catalog of the workspace under directory and return the WorkspaceIndexer updating it.
+
+        The pages already cataloged can be queried right away. Documents added
+        or modified since the last time are cataloged in the background; connect
+        to the indexer's signals, it is started once the caller has done so.
+        """
+        if self.workspace_indexer is not None:
+            self.workspace_indexer.cancel(wait=True)
+        catalog_path = os.path.join(directory, WORKSPACE_CATALOG_NAME)
+        catalog = WorkspaceCatalog(catalog_path)
+        if self.model.catalog is not None:
+            self.model.catalog.close()
+        self.model.attach_catalog(catalog)
+        self.workspace_indexer = WorkspaceIndexer(directory, catalog_path, self.model.annotation_counts())
+        return self.workspace_indexer
+
+    def next_unlabeled_page(self):
+        """Open the next unlabeled page of the workspace after the current page; returns its catalog row or None."""
+        catalog = self.model.catalog
+        if catalog is None:
+            return None
+        if self.model.pages:
+            self.save_annotations()  # Updates the status of the current page first
+        after = (self.model.document_id, self.model.current_page_index) if self.model.document_id else None
+        row = catalog.next_page(after=after, status=UNLABELED)
+        if row is not None:
+            self.open_page(row['path'], row['page_index'])
+        return row
+
+    def open_page(self, path, page_index):
+        """Show page_index of the document at path, switching documents if another one is open."""
+        if self.model.document_id != os.path.abspath(path):
+            self.stop_streamed_images()
+            self.prefetcher.reset()
+            self.text_layer.reset()
+            self.model.load_document(path)
+        self.model.current_page_index = page_index
+        self.update_view()
+
     def load_images(self, images):
+        self.stop_streamed_images()
+        self.prefetcher.reset()
         self.model.load_images(images)
         self.update_view()
 
+    def begin_streamed_images(self):
+        """Start an empty image document whose pages arrive one at a time.
+
+        The view has already stopped its earlier capture, so loading the empty
+        document does not report that capture as cancelled.
+        """
+        self.streamed_source = None
+        self.load_images([])
+        self.streamed_source = self.model.pages.sources[0]
+
+    def stop_streamed_images(self):
+        """Cancel the web page capture streaming into the open document, before another one is loaded."""
+        if self.streamed_source is not None:
+            self.streamed_source = None
+            self.view.cancel_browser_capture()
+
+    def add_streamed_image(self, index, image):
+        """Append a streamed page, showing it right away if it is the first one."""
+        if self.streamed_source is None or not self.model.append_page(self.streamed_source, image):
+            return  # Page of a capture whose document was replaced
+        if len(self.model.pages) == 1:
+            self.update_view()
+        elif self.continuous:
+            self.view.continuous_view.refresh()
+
     def save_annotations(self):
+        if self.continuous:
+            return  # Shapes are only edited on the canvas, which is hidden
         current_page_index = self.model.current_page_index
         shapes = self.view.get_current_shapes()
         self.model.save_annotations(current_page_index, shapes)
 
+    def print_memory_report(self):
+        self.memory_budget.print_report()
+
+    def shutdown(self):
+        """Save the current page and flush pending work before the app exits."""
+        self.autosave_timer.stop()
+        if self.workspace_indexer is not None:
+            self.workspace_indexer.cancel(wait=True)
+        if self.model.pages:
+            self.save_annotations()
+        self.journal.close()
+        if self.model.catalog is not None:
+            self.model.catalog.close()
+        self.prefetcher.shutdown()
+        self.text_layer.shutdown()
+
     def load_web_image_to_canvas(self, url):
         self.view.load_image_from_web(url)
     
     def open_browser(self):
+        # The web engine (Chromium) is only loaded when the browser is first opened
+        from ..widgets.web_view import BrowserWindow
         self.browser_window = BrowserWindow()
         self.browser_window.show()
     
     def load_current_browser_page(self):
         self.view.load_current_browser_page()
 
+    def cancel_browser_capture(self):
+        self.view.cancel_browser_capture()
+
+    def set_continuous(self, enabled):
+        """Show all pages in one virtualized scroll, or the current page on the canvas."""
+        if enabled == self.continuous:
+            return
+        self.save_annotations()
+        self.continuous = enabled
+        self.view.show_continuous(enabled)
+        self.update_view()
+
+    def set_current_page(self, index):
+        """Follow the page scrolled to in the continuous view."""
+        self.model.current_page_index = index
+
+    @timed('navigation.next_page')
     def next_page(self):
         if not self.model.is_last_page():
             self.save_annotations()
             self.model.next_page()
             self.update_view()
 
+    @timed('navigation.previous_page')
     def previous_page(self):
         if not self.model.is_first_page():
             self.save_annotations()
             self.model.prev_page()
             self.update_view()
 
+    @timed('navigation.first_page')
     def first_page(self):
         self.save_annotations()
         self.model.first_page()
         self.update_view()
 
+    @timed('navigation.last_page')
     def last_page(self):
         self.save_annotations()
         self.model.last_page()
         self.update_view()
 
+    @timed('controller.update_view')
     def update_view(self):
-        pil_image = self.model.get_current_page()
+        index = self.model.current_page_index
+        if self.continuous:
+            self.view.show_continuous_page(self.model.pages, self.model.annotations, index, self.prefetcher)
+            return
+        if not self.model.pages:
+            self.view.load_page(None, self.model.get_current_annotations())
+            return
+        page_key = self.model.pages.page_key(index)
+        self.memory_budget.protect([page_key])
+        # Serve the page from the QImage cache when possible, otherwise render it now
+        image = self.prefetcher.take(index)
+        if image is None:
+            image = self.prefetcher.render(index)
         current_annotations = self.model.get_current_annotations()
-        self.view.load_page(pil_image, current_annotations)
+        self.view.load_page(image, current_annotations, page_key, self.model.get_region_renderer(index))
+        if TEXT_LAYER_ENABLED:
+            # The words are extracted in the background and reach the canvas once ready
+            text_index = self.text_layer.request(index, self.view.canvas.text_index_ready.emit)
+            if text_index is not None:
+                self.view.canvas.set_text_index(page_key, text_index)
+        self.prefetcher.schedule(index)
@@ -0,0 +1,149 @@
+# app/controllers/prefetcher.py
+
+import threading
+from concurrent.futures import ThreadPoolExecutor, CancelledError
+
+from ..config.settings import PREFETCH_AHEAD, PREFETCH_BEHIND, PREFETCH_WORKERS
+from ..utils.image_conversion import mapped_page_to_qimage, pil_to_qimage
+
+
+class PagePrefetcher:
+    """Renders and converts the pages around the current page on a worker pool.
+
+    After each navigation, schedule() queues the next pages ahead and the
+    previous pages behind, and cancels queued work that fell outside the
+    new window (e.g. after jumping to the first or last page). Converted
+    pages are stored in the canvas QImage cache. Pages in the disk cache are
+    displayed straight from their memory-mapped file, without a PIL image
+    or a pixel copy.
+
+    Consecutive pages of a document are rendered by one task, so that their
+    missing pages are rasterized as one range, split across the source's
+    poppler processes, rather than one poppler run per page.
+    """
+
+    def __init__(self, model, qimage_cache, ahead=PREFETCH_AHEAD, behind=PREFETCH_BEHIND, workers=PREFETCH_WORKERS):
+        self.model = model
+        self.qimage_cache = qimage_cache
+        self.ahead = ahead
+        self.behind = behind
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix='labeldoc-prefetch')
+        self._futures = {}  # Page index -> Future of the page conversion, shared by pages rendered together
+        self._callbacks = {}  # Future -> on_done callbacks added to it, each added once
+        self._lock = threading.Lock()
+
+    def window(self, index):
+        """Page indices to prefetch around index, nearest first, ahead before behind."""
+        page_count = len(self.model.pages)
+        indices = []
+        for distance in range(1, max(self.ahead, self.behind) + 1):
+            if distance <= self.ahead and index + distance < page_count:
+                indices.append(index + distance)
+            if distance <= self.behind and index - distance >= 0:
+                indices.append(index - distance)
+        return indices
+
+    def schedule(self, index):
+        """Prefetch the window around index and drop work outside it."""
+        self.prefetch(self.window(index), keep=(index,))
+
+    def prefetch(self, indices, keep=(), on_done=None):
+        """Render the pages of indices, in order, and cancel work for pages in neither indices nor keep.
+
+        on_done(future) is called, possibly from a worker thread, when a page of indices is ready.
+        """
+        wanted = set(indices) | set(keep)
+        pages = self.model.pages
+        with self._lock:
+            for stale_index in set(self._futures) - wanted:
+                self._futures.pop(stale_index)
+            for future in set(self._callbacks) - set(self._futures.values()):
+                # Only cancelled once no wanted page shares it
+                future.cancel()
+                del self._callbacks[future]
+            missing = []
+            for page_index in indices:
+                future = self._futures.get(page_index)
+                if (future is None or future.done()) and pages.page_key(page_index) not in self.qimage_cache:
+                    missing.append(page_index)
+            for run in self.runs(pages, missing):
+                future = self.executor.submit(self._render_run, pages, run)
+                self._callbacks[future] = set()
+                for page_index in run:
+                    self._futures[page_index] = future
+            for page_index in indices:
+                future = self._futures.get(page_index)
+                if future is None or on_done is None:
+                    continue
+                callbacks = self._callbacks.setdefault(future, set())
+                if on_done not in callbacks:
+                    # Scrolling asks for the same pages many times while they render
+                    callbacks.add(on_done)
+                    future.add_done_callback(on_done)
+
+    @staticmethod
+    def runs(pages, indices):
+        """Group indices into runs of consecutive pages of one source, ordered by their first page in indices."""
+        runs = []
+        for page_index in sorted(indices):
+            # A page that is not the first of its source follows the previous page in the same source
+            if runs and page_index == runs[-1][-1] + 1 and pages.locate(page_index)[1] > 0:
+                runs[-1].append(page_index)
+            else:
+                runs.append([page_index])
+        order = {page_index: position for position, page_index in enumerate(indices)}
+        return sorted(runs, key=lambda run: min(order[page_index] for page_index in run))
+
+    def take(self, index):
+        """Return the converted QImage for index, waiting if it is being rendered.
+
+        Returns None if the page is neither cached nor scheduled, so the caller renders it.
+        """
+        with self._lock:
+            future = self._futures.get(index)
+        if future is not None:
+            try:
+                future.result()
+            except CancelledError:
+                pass
+        return self.qimage_cache.get(self.model.pages.page_key(index))
+
+    def reset(self):
+        """Cancel all pending work, e.g. when a new document is loaded."""
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+            self._callbacks.clear()
+
+    def shutdown(self):
+        self.reset()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def render(self, index):
+        """Convert page index now, on the calling thread, and return its QImage."""
+        return self._render(self.model.pages, index)
+
+    def _render(self, pages, index):
+        qimage = self.qimage_cache.get(pages.page_key(index))
+        if qimage is None:
+            qimage = self._convert(pages, index, *pages.map_page(index))
+        return qimage
+
+    def _render_run(self, pages, indices):
+        """Render consecutive pages of one source together, then convert each of them."""
+        if len(indices) == 1:
+            self._render(pages, indices[0])
+            return
+        for index, (page, image) in zip(indices, pages.map_range(indices[0], indices[-1] + 1)):
+            self._convert(pages, index, page, image)
+
+    def _convert(self, pages, index, page, image):
+        """Convert page index, as returned by PageList.map_page, store and return its QImage."""
+        if page is not None:
+            qimage = mapped_page_to_qimage(page)
+        else:
+            # Rendered but not stored in the disk cache, or a source without one
+            qimage = pil_to_qimage(image if image is not None else pages[index])
+        self.qimage_cache.put(pages.page_key(index), qimage)
+        return qimage
@@ -0,0 +1,93 @@
+# app/controllers/text_layer_loader.py
+
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from ..config.settings import (PAGE_DISK_CACHE_BUDGET_BYTES, PAGE_DISK_CACHE_DIR, TEXT_LAYER_CACHED_PAGES,
+                               TEXT_LAYER_CHUNK_PAGES)
+from ..models.disk_cache import DiskPageCache
+from ..models.page_source import PdfPageSource
+from ..models.text_layer import PageTextIndex, TextLayerCache, extract_words
+
+
+class TextLayerLoader:
+    """Loads the word boxes of PDF pages in the background, for snapping shapes to words.
+
+    Words are read from the TextLayerCache when present. Otherwise one
+    pdftotext run extracts the chunk of TEXT_LAYER_CHUNK_PAGES pages holding
+    the requested page, and every page of the chunk is cached on disk, so a
+    document is extracted once. Page indexes are built on the worker thread
+    and the most recent ones are kept in memory. Page display never waits
+    for any of this.
+    """
+
+    def __init__(self, model, cached_pages=TEXT_LAYER_CACHED_PAGES, chunk_pages=TEXT_LAYER_CHUNK_PAGES):
+        self.model = model
+        # Next to the rasterizations in the model's disk cache, sharing its budget
+        disk_cache = model.disk_cache or DiskPageCache(PAGE_DISK_CACHE_DIR, PAGE_DISK_CACHE_BUDGET_BYTES)
+        self.cache = TextLayerCache(disk_cache)
+        self.cached_pages = cached_pages
+        self.chunk_pages = chunk_pages
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='labeldoc-text')
+        self._indexes = OrderedDict()  # Page key -> PageTextIndex, least recently used first
+        self._futures = {}  # Page key -> Future of the page index
+        self._failed = set()  # Keys of sources whose text could not be extracted
+        self._lock = threading.Lock()
+
+    def request(self, index, on_ready):
+        """Return the PageTextIndex of page index if it is loaded, otherwise None.
+
+        A page that is not loaded yet is loaded in the background, then
+        on_ready(page key, PageTextIndex) is called from the worker thread.
+        Pages of documents without a text layer (images) are never loaded.
+        """
+        source, local_index = self.model.pages.locate(index)
+        if not isinstance(source, PdfPageSource) or source.key in self._failed:
+            return None
+        key = (source.key, local_index)
+        with self._lock:
+            text_index = self._indexes.get(key)
+            if text_index is not None:
+                self._indexes.move_to_end(key)
+                return text_index
+            future = self._futures.get(key)
+            if future is None or future.done():
+                self._futures[key] = self.executor.submit(self._load, source, local_index, key, on_ready)
+        return None
+
+    def reset(self):
+        """Cancel the pages not started yet, e.g. when another document is loaded."""
+        with self._lock:
+            for future in self._futures.values():
+                future.cancel()
+            self._futures.clear()
+
+    def shutdown(self):
+        self.reset()
+        self.executor.shutdown(wait=False, cancel_futures=True)
+
+    def _load(self, source, local_index, key, on_ready):
+        file_hash = source.content_hash()
+        words = self.cache.get(file_hash, local_index)
+        if words is None:
+            start = local_index - local_index % self.chunk_pages
+            stop = min(start + self.chunk_pages, source.page_count())
+            try:
+                pages = extract_words(source.path, start + 1, stop)
+            except (OSError, RuntimeError) as e:
+                # E.g. poppler is not installed or the file is damaged; pages still display as images
+                print(f"No text layer for {source.path}: {e}")
+                self._failed.add(source.key)
+                return None
+            for page_index, page_words in zip(range(start, stop), pages):
+                self.cache.put(file_hash, page_index, page_words)
+            words = pages[local_index - start] if local_index - start < len(pages) else []
+        text_index = PageTextIndex(words, source.dpi / 72)
+        with self._lock:
+            self._indexes[key] = text_index
+            while len(self._indexes) > self.cached_pages:
+                self._indexes.popitem(last=False)
+            self._futures.pop(key, None)
+        on_ready(key, text_index)
+        return text_index
@@ -0,0 +1,57 @@
+# app/controllers/workspace_indexer.py
+
+import threading
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from ..ingest import find_documents
+from ..models.workspace_catalog import WorkspaceCatalog
+
+
+class WorkspaceIndexer(QObject):
+    """Catalogs the documents of a workspace directory on a worker thread.
+
+    The worker lists the directory and adds new and modified documents to the
+    catalog through its own connection, committing them in batches, so the
+    pages cataloged so far can be opened while it runs. Signals are emitted
+    from the worker and delivered on the GUI thread.
+    """
+    progress = pyqtSignal(int, int)  # Documents cataloged, documents to catalog
+    finished = pyqtSignal(dict)  # Counts of WorkspaceCatalog.add_documents
+    failed = pyqtSignal(str)
+
+    def __init__(self, directory, catalog_path, annotation_counts=None, parent=None):
+        super().__init__(parent)
+        self.directory = directory
+        self.catalog_path = catalog_path
+        self.annotation_counts = annotation_counts
+        self._cancelled = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='labeldoc-workspace', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def cancel(self, wait=False):
+        """Stop after the documents being opened; with wait, until the worker has stopped."""
+        self._cancelled.set()
+        if wait and self._thread.is_alive():
+            self._thread.join()
+
+    def is_running(self):
+        return self._thread.is_alive()
+
+    def _run(self):
+        try:
+            paths = find_documents(self.directory)
+            if self._cancelled.is_set():
+                return
+            catalog = WorkspaceCatalog(self.catalog_path)
+            try:
+                stats = catalog.add_documents(paths, annotation_counts=self.annotation_counts,
+                                              on_progress=self.progress.emit, cancelled=self._cancelled)
+            finally:
+                catalog.close()
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.finished.emit(stats)
@@ -0,0 +1,507 @@
+# labeldoc/export.py
+
+import argparse
+import hashlib
+import itertools
+import json
+import multiprocessing
+import os
+import re
+import tempfile
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from .config.settings import (APP_NAME, DEFAULT_SAVE_PATH, PAGE_DISK_CACHE_DIR, PAGE_DISK_CACHE_BUDGET_BYTES,
+                              RASTER_PROFILE, RASTER_PROFILES)
+from .models.annotation_journal import read_snapshot, replay_journal
+from .models.disk_cache import DiskPageCache
+from .models.page_source import PageList, open_page_source
+from .models.rasterizer import raster_profile
+
+EXPORT_FORMATS = ('coco', 'jsonl', 'labelme')
+PAGES_PER_TASK = 16  # Pages rendered by one worker task, which opens their document once
+TASKS_PER_WORKER = 4  # Tasks queued per worker, bounding the results held in memory
+MANIFEST_NAME = 'export-manifest.jsonl'
+MANIFEST_SYNC_PAGES = 200  # Pages recorded in the manifest between fsyncs
+LABELME_VERSION = '5.0.1'
+COCO_IMAGES_PART = 'coco.images.part'
+COCO_ANNOTATIONS_PART = 'coco.annotations.part'
+COCO_PARTS = (COCO_IMAGES_PART, COCO_ANNOTATIONS_PART)  # Comma-separated JSON objects streamed by DatasetWriter
+COCO_IMAGES_START = b'"images": ['
+COCO_ANNOTATIONS_START = b'], "annotations": ['
+COCO_HEADER_MAX_BYTES = 4096  # Bytes of coco.json before its images, an upper bound
+
+
+def load_annotations(snapshot_path=DEFAULT_SAVE_PATH):
+    """Return the journaled annotations as {document id: {page: [shape dicts]}}.
+
+    The snapshot is a single JSON document, so the annotations are read into
+    memory as a whole; only images and output files are streamed.
+    """
+    state = replay_journal(snapshot_path + '.journal', read_snapshot(snapshot_path))
+    return {document: {page: list(shapes.values()) for page, shapes in pages.items()}
+            for document, pages in state.items()}
+
+
+def page_stem(document_id, path, page_index):
+    """File name stem of page page_index of a document, named after path, the file holding the page.
+
+    A digest of the document id keeps stems unique across documents with the same file names.
+    """
+    name = os.path.splitext(os.path.basename(path))[0]
+    digest = hashlib.sha1(document_id.encode()).hexdigest()[:8]
+    return f'{safe_name(name)}-{digest}-p{page_index + 1:05d}'
+
+
+def safe_name(text):
+    return re.sub(r'[^\w.-]+', '_', text).strip('_') or '_'
+
+
+def shape_box(shape):
+    xs = [x for x, _ in shape['points']]
+    ys = [y for _, y in shape['points']]
+    return (min(xs), min(ys), max(xs), max(ys))
+
+
+def shape_polygon(shape):
+    """Points of the shape outline; a rectangle is given by two corners."""
+    if shape.get('shape_type', 'rectangle') == 'rectangle':
+        x0, y0, x1, y1 = shape_box(shape)
+        return [(x0, y0), (x1, y0), (x1, y1), (x0, y1)]
+    return [tuple(point) for point in shape['points']]
+
+
+def polygon_area(points):
+    return abs(sum(x0 * y1 - x1 * y0 for (x0, y0), (x1, y1) in zip(points, points[1:] + points[:1]))) / 2
+
+
+def default_file_mode():
+    """Permissions of a file created with open(): 0o666 less the umask."""
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+
+def replace_file(temp_path, path):
+    """Move a complete temporary file to path, with the permissions of any other output file.
+
+    mkstemp creates files readable by their owner only.
+    """
+    os.chmod(temp_path, default_file_mode())
+    os.replace(temp_path, path)
+
+
+def write_file_atomically(path, text):
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w') as f:
+        f.write(text)
+    replace_file(temp_path, path)
+
+
+# Worker processes
+
+def render_pages(document_id, pages, output_dir, images, crops, cache_dir, options):
+    """Encode the page images and shape crops of some pages of a document. Runs in a worker process.
+
+    pages is a list of (page index, shapes). Returns {page index: (file stem, (width, height))}.
+    """
+    disk_cache = DiskPageCache(cache_dir, float('inf'))  # Evicted once by the parent, as in ingest
+    page_list = PageList([open_page_source(path, disk_cache, options, workers=1)
+                          for path in document_id.split(os.pathsep)])
+    results = {}
+    for page_index, shapes in pages:
+        stem = page_stem(document_id, page_list.locate(page_index)[0].path, page_index)
+        if not images and not crops:
+            results[page_index] = (stem, page_list.page_size(page_index))  # Metadata only, nothing to rasterize
+            continue
+        image = page_list[page_index]
+        results[page_index] = (stem, image.size)
+        if images:
+            image_path = os.path.join(output_dir, 'images', stem + '.png')
+            if not os.path.exists(image_path):  # Written by an interrupted run
+                image.save(image_path + '.tmp.png')
+                os.replace(image_path + '.tmp.png', image_path)
+        if crops:
+            for shape in shapes:
+                x0, y0, x1, y1 = shape_box(shape)
+                box = (max(0, int(x0)), max(0, int(y0)), min(image.width, round(x1)), min(image.height, round(y1)))
+                if box[2] <= box[0] or box[3] <= box[1]:
+                    continue
+                label_dir = os.path.join(output_dir, 'crops', safe_name(shape['label']))
+                os.makedirs(label_dir, exist_ok=True)
+                image.crop(box).save(os.path.join(label_dir, f"{stem}-{shape['id']}.png"))
+    return results
+
+
+# Writers, in the main process
+
+class ExportManifest:
+    """Append-only record of the exported pages, for resuming an interrupted export.
+
+    The first line holds the export options. Each following line records a
+    page once all of its outputs are written, with the ids it used and the
+    size of every streamed output file at that point. On resume, the
+    streamed files are truncated back to the sizes of the last recorded
+    page, dropping the output of a page that was cut short.
+    """
+
+    def __init__(self, path, options):
+        self.path = path
+        self.done = set()  # (document id, page index)
+        self.next_image_id = 1
+        self.next_annotation_id = 1
+        self.categories = {}  # Label -> category id
+        self.offsets = {}  # Streamed file name -> size after the last recorded page
+        self._unsynced = 0
+        if os.path.exists(path):
+            self._load(options)
+            self._file = open(path, 'a')
+        else:
+            self._file = open(path, 'w')
+            self._file.write(json.dumps({'options': options}) + '\n')
+
+    def _load(self, options):
+        with open(self.path, 'rb') as f:
+            data = f.read()
+        # Everything after the last newline is a torn write from a crash
+        lines = data[:data.rfind(b'\n') + 1].splitlines()
+        header = json.loads(lines[0]) if lines else {}
+        if header.get('options') != options:
+            raise ValueError(f'{os.path.dirname(self.path)} holds an export with other options, '
+                             f'export to another directory or restart it with --restart')
+        valid_bytes = len(lines[0]) + 1
+        for line in lines[1:]:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            valid_bytes += len(line) + 1
+            self.done.add((record['doc'], record['page']))
+            self.next_image_id = max(self.next_image_id, record['image_id'] + 1)
+            self.next_annotation_id = max(self.next_annotation_id, record['next_annotation_id'])
+            self.categories.update(record.get('new_categories', {}))
+            self.offsets = record['offsets']
+        with open(self.path, 'r+b') as f:
+            f.truncate(valid_bytes)
+
+    def record(self, record):
+        self.done.add((record['doc'], record['page']))
+        self._file.write(json.dumps(record) + '\n')
+        self._file.flush()
+        self._unsynced += 1
+        if self._unsynced >= MANIFEST_SYNC_PAGES:
+            self.sync()
+
+    def sync(self):
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+
+    def close(self):
+        self.sync()
+        self._file.close()
+
+
+class StreamedFile:
+    """An output file written incrementally, reopened at a recorded size on resume."""
+
+    def __init__(self, path, offset):
+        self.path = path
+        if offset and os.path.exists(path):
+            self.file = open(path, 'r+b')
+            self.file.truncate(offset)
+            self.file.seek(offset)
+            self.size = offset
+        else:
+            self.file = open(path, 'wb')
+            self.size = 0
+
+    def write(self, text):
+        data = text.encode()
+        self.file.write(data)
+        self.size += len(data)
+
+    def flush(self):
+        self.file.flush()
+
+    def close(self):
+        self.file.close()
+
+
+class DatasetWriter:
+    """Writes exported pages as COCO, JSONL and labelme files, one page at a time.
+
+    JSONL lines and labelme files are final as soon as a page is written.
+    COCO images and annotations are streamed to two part files, each a
+    comma-separated run of JSON objects, which finish() joins into
+    coco.json with the categories before deleting them. Nothing but the
+    category table is kept in memory.
+    """
+
+    def __init__(self, output_dir, formats, images, manifest):
+        self.output_dir = output_dir
+        self.formats = formats
+        self.images = images
+        self.manifest = manifest
+        self.streams = {}
+        if 'jsonl' in formats:
+            self._open_stream('annotations.jsonl')
+        if 'coco' in formats:
+            if any(manifest.offsets.get(name) and not os.path.exists(os.path.join(output_dir, name))
+                   for name in COCO_PARTS):
+                self._split_coco()
+            for name in COCO_PARTS:
+                self._open_stream(name)
+        if 'labelme' in formats:
+            os.makedirs(os.path.join(output_dir, 'labelme'), exist_ok=True)
+
+    def _split_coco(self):
+        """Write the part files of a finished export back from its coco.json, so that new pages join them."""
+        coco_path = os.path.join(self.output_dir, 'coco.json')
+        if not os.path.exists(coco_path):
+            raise ValueError(f'{coco_path} of the earlier export is missing, restart the export with --restart')
+        with open(coco_path, 'rb') as f:
+            # The part files are copied verbatim between fixed separators, see finish(). The manifest may
+            # be behind coco.json after a crash, so each part is copied up to its offset and the next one
+            # is found by its separator, which cannot occur inside a JSON string with its unescaped quote.
+            f.seek(f.read(COCO_HEADER_MAX_BYTES).index(COCO_IMAGES_START) + len(COCO_IMAGES_START))
+            with open(os.path.join(self.output_dir, COCO_IMAGES_PART), 'wb') as out:
+                self._copy(f, out, self.manifest.offsets.get(COCO_IMAGES_PART, 0))
+            self._seek_past(f, COCO_ANNOTATIONS_START)
+            with open(os.path.join(self.output_dir, COCO_ANNOTATIONS_PART), 'wb') as out:
+                self._copy(f, out, self.manifest.offsets.get(COCO_ANNOTATIONS_PART, 0))
+
+    def _open_stream(self, name):
+        self.streams[name] = StreamedFile(os.path.join(self.output_dir, name), self.manifest.offsets.get(name, 0))
+
+    def _append_fragment(self, name, item):
+        stream = self.streams[name]
+        stream.write((',' if stream.size else '') + json.dumps(item))
+
+    def write_page(self, document_id, page_index, stem, shapes, size):
+        width, height = size
+        image_id = self.manifest.next_image_id
+        image_file = f'images/{stem}.png' if self.images else None
+        new_categories = {}
+        for shape in shapes:
+            if shape['label'] not in self.manifest.categories:
+                new_categories[shape['label']] = self.manifest.categories[shape['label']] = len(self.manifest.categories) + 1
+
+        if 'jsonl' in self.formats:
+            line = {'document': document_id, 'page': page_index, 'image': image_file, 'width': width,
+                    'height': height, 'shapes': shapes}
+            self.streams['annotations.jsonl'].write(json.dumps(line) + '\n')
+
+        annotation_id = self.manifest.next_annotation_id
+        if 'coco' in self.formats:
+            self._append_fragment(COCO_IMAGES_PART, {
+                'id': image_id, 'file_name': image_file or f'{stem}.png', 'width': width, 'height': height,
+                'labeldoc_document': document_id, 'labeldoc_page': page_index,
+            })
+            for shape in shapes:
+                x0, y0, x1, y1 = shape_box(shape)
+                polygon = shape_polygon(shape)
+                self._append_fragment(COCO_ANNOTATIONS_PART, {
+                    'id': annotation_id, 'image_id': image_id,
+                    'category_id': self.manifest.categories[shape['label']],
+                    'bbox': [x0, y0, x1 - x0, y1 - y0], 'area': polygon_area(polygon),
+                    'segmentation': [[value for point in polygon for value in point]], 'iscrowd': 0,
+                })
+                annotation_id += 1
+
+        if 'labelme' in self.formats:
+            labelme = {
+                'version': LABELME_VERSION, 'flags': {},
+                'shapes': [{'label': shape['label'], 'points': shape['points'], 'group_id': None,
+                            'shape_type': shape.get('shape_type', 'rectangle'), 'flags': {}} for shape in shapes],
+                'imagePath': f'../{image_file}' if image_file else None, 'imageData': None,
+                'imageHeight': height, 'imageWidth': width,
+            }
+            write_file_atomically(os.path.join(self.output_dir, 'labelme', stem + '.json'), json.dumps(labelme))
+
+        # The streams reach the OS before the manifest records their sizes, so a crash never leaves it ahead
+        for stream in self.streams.values():
+            stream.flush()
+        self.manifest.next_image_id = image_id + 1
+        self.manifest.next_annotation_id = annotation_id
+        self.manifest.record({
+            'doc': document_id, 'page': page_index, 'image_id': image_id, 'next_annotation_id': annotation_id,
+            'new_categories': new_categories, 'offsets': {name: stream.size for name, stream in self.streams.items()},
+        })
+
+    def close(self):
+        for stream in self.streams.values():
+            stream.close()
+
+    def finish(self):
+        """Close the streams and assemble coco.json, once every page is written, then delete the part files."""
+        self.close()
+        if 'coco' not in self.formats:
+            return
+        categories = [{'id': category_id, 'name': label, 'supercategory': ''}
+                      for label, category_id in sorted(self.manifest.categories.items(), key=lambda item: item[1])]
+        coco_path = os.path.join(self.output_dir, 'coco.json')
+        fd, temp_path = tempfile.mkstemp(dir=self.output_dir, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as out:
+            info = {'description': f'{APP_NAME} export', 'date_created': time.strftime('%Y-%m-%dT%H:%M:%S')}
+            out.write(f'{{"info": {json.dumps(info)}, '.encode() + COCO_IMAGES_START)
+            for name, separator in zip(COCO_PARTS, (COCO_ANNOTATIONS_START, b'')):
+                with open(os.path.join(self.output_dir, name), 'rb') as f:
+                    self._copy(f, out)
+                out.write(separator)
+            out.write(f'], "categories": {json.dumps(categories)}}}'.encode())
+        replace_file(temp_path, coco_path)
+        # Running the export again, e.g. for new annotations, splits coco.json back into them
+        for name in COCO_PARTS:
+            os.remove(os.path.join(self.output_dir, name))
+
+    @staticmethod
+    def _seek_past(f, marker, chunk_size=1024 * 1024):
+        """Move the position of the file f to just after the next occurrence of marker."""
+        data = b''
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                raise ValueError(f'{f.name} is not a COCO file written by an export, restart the export with --restart')
+            data = data[-(len(marker) - 1):] + chunk  # Keeps a marker split across two chunks
+            index = data.find(marker)
+            if index >= 0:
+                f.seek(index + len(marker) - len(data), os.SEEK_CUR)
+                return
+
+    @staticmethod
+    def _copy(f, out, size=None, chunk_size=1024 * 1024):
+        """Copy size bytes, or the rest, of the file f to out."""
+        while size is None or size > 0:
+            chunk = f.read(chunk_size if size is None else min(chunk_size, size))
+            if not chunk:
+                break
+            out.write(chunk)
+            if size is not None:
+                size -= len(chunk)
+
+
+def iter_tasks(annotations, done):
+    """Yield (document id, [(page index, shapes)]) for the annotated pages not exported yet.
+
+    Documents are removed from annotations as they are queued, so their shapes are freed once written.
+    """
+    for document_id in sorted(annotations):
+        pages = [(page_index, shapes)
+                 for page_index, shapes in sorted(annotations.pop(document_id).items())
+                 if shapes and (document_id, page_index) not in done]
+        for start in range(0, len(pages), PAGES_PER_TASK):
+            yield document_id, pages[start:start + PAGES_PER_TASK]
+
+
+def export(annotations, output_dir, formats=EXPORT_FORMATS, images=True, crops=False, workers=None,
+           cache_dir=PAGE_DISK_CACHE_DIR, budget_bytes=PAGE_DISK_CACHE_BUDGET_BYTES, profile=RASTER_PROFILE,
+           restart=False):
+    """Export annotations ({document id: {page: [shape dicts]}}) to output_dir and return stats.
+
+    Pages are rendered, encoded and cropped by a pool of worker processes,
+    with a bounded number of tasks in flight, while the main process streams
+    the annotation files. An export that was interrupted resumes from its
+    manifest, skipping the pages already written. annotations is consumed.
+
+    Shapes are in pixels of PDF pages rasterized with the app's RASTER_PROFILE,
+    so a profile with another DPI is refused rather than misplace every box.
+    """
+    options = raster_profile(profile)
+    annotation_dpi = raster_profile(RASTER_PROFILE)['dpi']
+    if options['dpi'] != annotation_dpi:
+        raise ValueError(f"shapes are in pixels of pages rasterized at {annotation_dpi} DPI "
+                         f"(the {RASTER_PROFILE!r} profile), not {options['dpi']} DPI; "
+                         f"export with a profile of the same DPI")
+    start_time = time.perf_counter()
+    os.makedirs(output_dir, exist_ok=True)
+    if images:
+        os.makedirs(os.path.join(output_dir, 'images'), exist_ok=True)
+    manifest_path = os.path.join(output_dir, MANIFEST_NAME)
+    if restart and os.path.exists(manifest_path):
+        os.remove(manifest_path)
+    manifest = ExportManifest(manifest_path, {'formats': sorted(formats), 'images': images, 'crops': crops,
+                                              'raster': options})
+    writer = DatasetWriter(output_dir, formats, images, manifest)
+    stats = {'pages': 0, 'skipped_pages': len(manifest.done), 'failed_pages': 0, 'annotations': 0}
+
+    workers = workers or os.cpu_count() or 1
+    tasks = iter_tasks(annotations, manifest.done)
+    # Workers are spawned rather than forked, so exporting from the app does not fork its Qt threads
+    context = multiprocessing.get_context('spawn')
+    try:
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context) as executor:
+            pending = {}
+
+            def submit(task):
+                document_id, pages = task
+                future = executor.submit(render_pages, document_id, pages, output_dir, images, crops, cache_dir,
+                                         options)
+                pending[future] = task
+
+            for task in itertools.islice(tasks, workers * TASKS_PER_WORKER):
+                submit(task)
+            while pending:
+                finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    document_id, pages = pending.pop(future)
+                    try:
+                        results = future.result()
+                    except Exception as e:
+                        print(f"Failed to export {document_id}: {e}")
+                        stats['failed_pages'] += len(pages)
+                    else:
+                        for page_index, shapes in pages:
+                            stem, size = results[page_index]
+                            writer.write_page(document_id, page_index, stem, shapes, size)
+                            stats['pages'] += 1
+                            stats['annotations'] += len(shapes)
+                    task = next(tasks, None)
+                    if task is not None:
+                        submit(task)
+    except BaseException:
+        writer.close()  # The manifest holds what was written; running the export again resumes it
+        manifest.close()
+        raise
+    writer.finish()
+    manifest.close()
+    if images or crops:
+        DiskPageCache(cache_dir, budget_bytes).evict()
+    stats['seconds'] = time.perf_counter() - start_time
+    return stats
+
+
+def print_stats(stats):
+    seconds = stats['seconds']
+    print()
+    print('=== EXPORT SUMMARY ===')
+    print(f"Pages:          {stats['pages']} exported, {stats['skipped_pages']} already exported, {stats['failed_pages']} failed")
+    print(f"Annotations:    {stats['annotations']}")
+    print(f"Elapsed:        {seconds:.2f} s")
+    if seconds > 0:
+        print(f"Throughput:     {stats['pages'] / seconds:.1f} pages/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog=f'{APP_NAME} export', description='Export the saved annotations as COCO, JSONL and labelme files, with page images.')
+    parser.add_argument('output', help='Directory the dataset is written to; an interrupted export in it is resumed.')
+    parser.add_argument('--annotations', default=DEFAULT_SAVE_PATH, help='Annotation snapshot, read with its journal.')
+    parser.add_argument('--formats', default=','.join(EXPORT_FORMATS), help=f'Comma-separated formats among {", ".join(EXPORT_FORMATS)}.')
+    parser.add_argument('--no-images', action='store_true', help='Do not write page images.')
+    parser.add_argument('--crops', action='store_true', help='Write the crop of every shape, by label.')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: number of CPUs).')
+    parser.add_argument('--cache-dir', default=PAGE_DISK_CACHE_DIR, help='Page cache directory.')
+    parser.add_argument('--profile', choices=sorted(RASTER_PROFILES), default=RASTER_PROFILE, help='Rasterization profile for PDF pages; its DPI must be the one the pages were annotated at.')
+    parser.add_argument('--restart', action='store_true', help='Start over instead of resuming an interrupted export.')
+    args = parser.parse_args(argv)
+
+    formats = [name.strip() for name in args.formats.split(',') if name.strip()]
+    unknown = set(formats) - set(EXPORT_FORMATS)
+    if unknown:
+        parser.error(f'unknown formats: {", ".join(sorted(unknown))}')
+    try:
+        stats = export(load_annotations(args.annotations), args.output, formats, not args.no_images, args.crops,
+                       args.workers, args.cache_dir, profile=args.profile, restart=args.restart)
+    except ValueError as e:
+        parser.error(str(e))
+    print_stats(stats)
+    return 0 if stats['failed_pages'] == 0 else 1
@@ -0,0 +1,126 @@
+# labeldoc/ingest.py
+
+import argparse
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .config.settings import APP_NAME, PAGE_DISK_CACHE_DIR, PAGE_DISK_CACHE_BUDGET_BYTES, RASTER_PROFILE, RASTER_PROFILES
+from .models.disk_cache import DiskPageCache
+from .models.page_source import open_page_source
+from .models.rasterizer import raster_profile
+
+SUPPORTED_EXTENSIONS = ('.pdf', '.png')
+PAGES_PER_TASK = 8  # Pages rasterized by one poppler run in a worker
+
+
+def find_documents(directory):
+    """Return the paths of all supported documents under directory, sorted."""
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in files:
+            if name.lower().endswith(SUPPORTED_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def ingest_pages(path, file_hash, start, stop, cache_dir, options):
+    """Rasterize pages start to stop - 1 of path into the disk cache. Runs in a worker process.
+
+    Returns (pages already cached, pages rendered, bytes written).
+    """
+    # Unbounded: measuring the cache on every task would walk all of it, and evicting
+    # here could delete pages ingested earlier in the run. The parent evicts once at the end.
+    disk_cache = DiskPageCache(cache_dir, float('inf'))
+    # Tasks already run in parallel, so each one uses a single poppler process
+    source = open_page_source(path, profile=options, workers=1)
+    # The file is hashed once by the parent process, not once per task
+    cache_keys = {index: (file_hash, index, source.dpi, source.color_mode) for index in range(start, stop)}
+
+    missing = [index for index, key in cache_keys.items() if not os.path.exists(disk_cache.path_for(*key))]
+    if not missing:
+        return stop - start, 0, 0
+
+    written = 0
+    # Render the span of missing pages in one run rather than one poppler process per page
+    for index, image in zip(range(missing[0], missing[-1] + 1), source.rasterize_range(missing[0], missing[-1] + 1)):
+        if index in missing:
+            written += disk_cache.put(*cache_keys[index], source.compact(image))
+    return stop - start - len(missing), len(missing), written
+
+
+def ingest(directory, workers=None, cache_dir=PAGE_DISK_CACHE_DIR, budget_bytes=PAGE_DISK_CACHE_BUDGET_BYTES,
+           profile=RASTER_PROFILE):
+    """Rasterize every page of every document under directory into the page cache and return stats.
+
+    The cache is brought back under budget_bytes once every page is written,
+    deleting the least recently used pages first.
+    """
+    options = raster_profile(profile)
+    start_time = time.perf_counter()
+    paths = find_documents(directory)
+    stats = {'files': 0, 'failed_files': 0, 'pages': 0, 'cached_pages': 0, 'rendered_pages': 0, 'bytes_written': 0,
+             'cache_bytes': 0}
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {}
+        for path in paths:
+            try:
+                source = open_page_source(path, profile=options)
+                file_hash = source.content_hash()
+                page_count = source.page_count()
+            except Exception as e:
+                print(f"Skipping {path}: {e}")
+                stats['failed_files'] += 1
+                continue
+            stats['files'] += 1
+            stats['pages'] += page_count
+            for start in range(0, page_count, PAGES_PER_TASK):
+                stop = min(start + PAGES_PER_TASK, page_count)
+                future = executor.submit(ingest_pages, path, file_hash, start, stop, cache_dir, options)
+                futures[future] = path
+
+        for future in as_completed(futures):
+            try:
+                cached, rendered, written = future.result()
+            except Exception as e:
+                print(f"Failed to rasterize {futures[future]}: {e}")
+                continue
+            stats['cached_pages'] += cached
+            stats['rendered_pages'] += rendered
+            stats['bytes_written'] += written
+
+    stats['cache_bytes'] = DiskPageCache(cache_dir, budget_bytes).evict()
+    stats['seconds'] = time.perf_counter() - start_time
+    return stats
+
+
+def print_stats(stats):
+    seconds = stats['seconds']
+    processed = stats['cached_pages'] + stats['rendered_pages']
+    print()
+    print('=== INGEST SUMMARY ===')
+    print(f"Files:          {stats['files']} ({stats['failed_files']} skipped)")
+    print(f"Pages:          {processed} of {stats['pages']} ({stats['cached_pages']} already cached, {stats['rendered_pages']} rendered)")
+    print(f"Written:        {stats['bytes_written'] / (1024 * 1024):.1f} MB")
+    print(f"Cache size:     {stats['cache_bytes'] / (1024 * 1024):.1f} MB")
+    print(f"Elapsed:        {seconds:.2f} s")
+    if seconds > 0:
+        print(f"Throughput:     {processed / seconds:.1f} pages/s, {stats['rendered_pages'] / seconds:.1f} rendered pages/s")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog=f'{APP_NAME} ingest', description='Rasterize a directory of documents into the page cache, without a display.')
+    parser.add_argument('directory', help='Directory searched recursively for PDF and PNG files.')
+    parser.add_argument('--workers', type=int, default=None, help='Number of worker processes (default: number of CPUs).')
+    parser.add_argument('--cache-dir', default=PAGE_DISK_CACHE_DIR, help='Page cache directory.')
+    parser.add_argument('--profile', choices=sorted(RASTER_PROFILES), default=RASTER_PROFILE, help='Rasterization profile for PDF pages.')
+    parser.add_argument('--dpi', type=int, default=None, help='Rasterization DPI, overriding the profile.')
+    parser.add_argument('--grayscale', action='store_true', default=None, help='Rasterize PDF pages in grayscale, overriding the profile.')
+    parser.add_argument('--mono', action='store_true', default=None, help='Rasterize PDF pages in black and white, overriding the profile.')
+    args = parser.parse_args(argv)
+
+    profile = raster_profile(args.profile, dpi=args.dpi, grayscale=args.grayscale, mono=args.mono)
+    stats = ingest(args.directory, args.workers, args.cache_dir, profile=profile)
+    print_stats(stats)
+    return 0 if stats['failed_files'] == 0 else 1
@@ -0,0 +1,160 @@
+# app/models/annotation_journal.py
+
+import atexit
+import json
+import os
+import queue
+import threading
+import time
+
+from ..config.settings import DEFAULT_SAVE_PATH, JOURNAL_FLUSH_INTERVAL, JOURNAL_COMPACT_RECORDS
+
+SNAPSHOT_VERSION = 1
+
+
+def read_snapshot(path):
+    """Return {document: {page: {shape id: shape dict}}} from a snapshot file."""
+    if not os.path.exists(path):
+        return {}
+    with open(path) as f:
+        data = json.load(f)
+    return {
+        document: {int(page): {shape['id']: shape for shape in shapes} for page, shapes in pages.items()}
+        for document, pages in data.get('documents', {}).items()
+    }
+
+
+def replay_journal(path, state):
+    """Apply the records of a journal file to state in place."""
+    if not os.path.exists(path):
+        return state
+    with open(path) as f:
+        for line in f:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                break  # Torn write at the end of the journal after a crash
+            apply_record(state, record)
+    return state
+
+
+def apply_record(state, record):
+    page_shapes = state.setdefault(record['doc'], {}).setdefault(record['page'], {})
+    if record['op'] == 'put':
+        page_shapes[record['shape']['id']] = record['shape']
+    elif record['op'] == 'remove':
+        page_shapes.pop(record['id'], None)
+
+
+class AnnotationJournal:
+    """Crash-safe store of annotation changes.
+
+    Changes are appended to a journal file by a background writer thread,
+    which batches the records collected during JOURNAL_FLUSH_INTERVAL and
+    fsyncs once per batch. After JOURNAL_COMPACT_RECORDS records, the
+    journal is folded into the snapshot file and truncated. Recovery reads
+    the snapshot and replays the journal on top of it.
+    """
+
+    def __init__(self, snapshot_path=DEFAULT_SAVE_PATH, flush_interval=JOURNAL_FLUSH_INTERVAL,
+                 compact_records=JOURNAL_COMPACT_RECORDS):
+        self.snapshot_path = os.path.abspath(snapshot_path)
+        self.journal_path = self.snapshot_path + '.journal'
+        os.makedirs(os.path.dirname(self.snapshot_path), exist_ok=True)
+        self.flush_interval = flush_interval
+        self.compact_records = compact_records
+        self._journaled = {}  # (document, page) -> {shape id: shape dict} last written, to compute diffs
+        self._queue = queue.Queue()
+        self._records_since_compaction = 0
+        self._writer = threading.Thread(target=self._run, name='labeldoc-journal', daemon=True)
+        self._writer.start()
+        atexit.register(self.close)
+
+    def recover(self):
+        """Return the saved annotations as {document: {page: [shape dicts]}}."""
+        state = replay_journal(self.journal_path, read_snapshot(self.snapshot_path))
+        for document, pages in state.items():
+            for page, shapes in pages.items():
+                self._journaled[(document, page)] = dict(shapes)
+        return {document: {page: list(shapes.values()) for page, shapes in pages.items()} for document, pages in state.items()}
+
+    def save_page(self, document, page, shapes):
+        """Journal the changes between shapes and the last saved state of the page.
+
+        Only added, modified and removed shapes are written.
+        """
+        previous = self._journaled.get((document, page), {})
+        current = {shape.id: shape.to_dict() for shape in shapes}
+        for shape_id, shape in current.items():
+            if previous.get(shape_id) != shape:
+                self._queue.put(('record', {'op': 'put', 'doc': document, 'page': page, 'shape': shape}))
+        for shape_id in previous.keys() - current.keys():
+            self._queue.put(('record', {'op': 'remove', 'doc': document, 'page': page, 'id': shape_id}))
+        self._journaled[(document, page)] = current
+
+    def flush(self):
+        """Block until every record queued so far is on disk."""
+        if self._writer.is_alive():
+            done = threading.Event()
+            self._queue.put(('flush', done))
+            done.wait()
+
+    def compact(self):
+        """Fold the journal into the snapshot in the background."""
+        self._queue.put(('compact', None))
+
+    def close(self):
+        if self._writer.is_alive():
+            self._queue.put(('stop', None))
+            self._writer.join()
+
+    # Writer thread
+
+    def _run(self):
+        journal = open(self.journal_path, 'a')
+        try:
+            running = True
+            while running:
+                batch = [self._queue.get()]
+                deadline = time.monotonic() + self.flush_interval
+                while batch[-1][0] == 'record' and time.monotonic() < deadline:
+                    try:
+                        batch.append(self._queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except queue.Empty:
+                        break
+
+                records = [json.dumps(item) for kind, item in batch if kind == 'record']
+                if records:
+                    journal.write('\n'.join(records) + '\n')
+                    journal.flush()
+                    os.fsync(journal.fileno())
+                    self._records_since_compaction += len(records)
+
+                for kind, item in batch:
+                    if kind == 'flush':
+                        item.set()
+                    elif kind == 'stop':
+                        running = False
+                if self._records_since_compaction >= self.compact_records or any(kind == 'compact' for kind, _ in batch):
+                    journal.close()
+                    self._write_snapshot()
+                    journal = open(self.journal_path, 'w')  # Truncate, the records are in the snapshot
+                    self._records_since_compaction = 0
+        finally:
+            journal.close()
+
+    def _write_snapshot(self):
+        state = replay_journal(self.journal_path, read_snapshot(self.snapshot_path))
+        data = {
+            'version': SNAPSHOT_VERSION,
+            'documents': {
+                document: {str(page): list(shapes.values()) for page, shapes in pages.items() if shapes}
+                for document, pages in state.items()
+            },
+        }
+        temp_path = self.snapshot_path + '.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.snapshot_path)
@@ -0,0 +1,255 @@
+# app/models/disk_cache.py
+
+import hashlib
+import mmap
+import os
+import struct
+import tempfile
+import threading
+
+from PIL import Image
+
+MAGIC = b'LDPG'
+FORMAT_VERSION = 2
+# magic, format version, mode, width, height, palette length, row stride; followed by the palette, padding
+# up to PIXEL_ALIGNMENT and the pixel rows, each padded to a multiple of 4 bytes like QImage rows
+HEADER = struct.Struct('<4sH6sIIII')
+PIXEL_ALIGNMENT = 64
+FILE_SUFFIX = '.ldpg'
+WORDS_SUFFIX = '-words.json'  # Text layer words of a page, see TextLayerCache
+ENTRY_SUFFIXES = (FILE_SUFFIX, WORDS_SUFFIX)  # Files counted against the budget and evicted
+# Bits per pixel of the raw rows of common PIL modes, others are measured
+MODE_BITS = {'1': 1, 'L': 8, 'P': 8, 'LA': 16, 'I;16': 16, 'RGB': 24, 'RGBA': 32, 'RGBX': 32, 'CMYK': 32, 'I': 32, 'F': 32}
+
+CONTENT_HASH_SAMPLE_BYTES = 1024 * 1024  # Bytes hashed at each end of a large file, see content_hash
+_hash_memo = {}  # (path, mtime_ns, size) -> content hash
+_hash_lock = threading.Lock()
+
+
+def content_hash(path, sample_bytes=CONTENT_HASH_SAMPLE_BYTES):
+    """Return a SHA-256 hex digest of the size and content of the file at path, memoized per file version.
+
+    Files up to twice sample_bytes are hashed whole; larger ones by their
+    first and last sample_bytes, so that keying the first page of a large
+    PDF reads a bounded amount of it instead of the whole file. A PDF ends
+    with its cross-reference table, whose object offsets move when an
+    object changes size, so an edited document almost always differs in
+    its sampled bytes or its size.
+    """
+    stat = os.stat(path)
+    memo_key = (os.path.abspath(path), stat.st_mtime_ns, stat.st_size)
+    with _hash_lock:
+        if memo_key in _hash_memo:
+            return _hash_memo[memo_key]
+    digest = hashlib.sha256(b'%d:' % stat.st_size)
+    with open(path, 'rb') as f:
+        digest.update(f.read(sample_bytes))
+        if stat.st_size > sample_bytes:
+            f.seek(max(sample_bytes, stat.st_size - sample_bytes))
+            digest.update(f.read(sample_bytes))
+    with _hash_lock:
+        _hash_memo[memo_key] = digest.hexdigest()
+    return _hash_memo[memo_key]
+
+
+def remember_content_hash(path, mtime_ns, size, digest):
+    """Memoize the content hash of a file version computed earlier, e.g. read from a workspace catalog.
+
+    The hash is only used while the file keeps that modification time and size.
+    """
+    with _hash_lock:
+        _hash_memo[(os.path.abspath(path), mtime_ns, size)] = digest
+
+
+def row_stride(image):
+    """Bytes per stored pixel row of image: its raw row, padded to a multiple of 4 bytes."""
+    bits = MODE_BITS.get(image.mode)
+    if bits is None:
+        row_bytes = len(image.tobytes()) // image.height if image.height else 0
+    else:
+        row_bytes = (image.width * bits + 7) // 8
+    return (row_bytes + 3) & ~3
+
+
+def pixels_offset(palette_length):
+    return -(-(HEADER.size + palette_length) // PIXEL_ALIGNMENT) * PIXEL_ALIGNMENT
+
+
+def encode_page(image):
+    """Serialize a PIL image as a header followed by its raw pixel rows, stride-aligned."""
+    palette = bytes(image.getpalette() or []) if image.mode == 'P' else b''
+    stride = row_stride(image)
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, image.mode.encode('ascii'), image.width, image.height,
+                         len(palette), stride)
+    padding = bytes(pixels_offset(len(palette)) - len(header) - len(palette))
+    pixels = image.tobytes('raw', (image.mode, stride)) if image.height else b''
+    return header + palette + padding + pixels
+
+
+def read_page_layout(data):
+    """Parse the header of encode_page output. Raises ValueError on invalid data.
+
+    Returns (mode, (width, height), palette bytes, row stride, memoryview of the pixel rows).
+    """
+    if len(data) < HEADER.size:
+        raise ValueError('Truncated page header')
+    magic, version, mode, width, height, palette_length, stride = HEADER.unpack_from(data)
+    if magic != MAGIC or version != FORMAT_VERSION:
+        raise ValueError('Unknown page format')
+    pixels_start = pixels_offset(palette_length)
+    if len(data) < pixels_start + stride * height:
+        raise ValueError('Truncated page pixels')
+    view = memoryview(data)
+    palette = bytes(view[HEADER.size:HEADER.size + palette_length])
+    pixels = view[pixels_start:pixels_start + stride * height]
+    return mode.rstrip(b'\0').decode('ascii'), (width, height), palette, stride, pixels
+
+
+def image_from_layout(mode, size, palette, stride, pixels):
+    """Build a PIL image over the pixel rows, sharing them where PIL can (e.g. 'L', 'P', 'RGBA')."""
+    image = Image.frombuffer(mode, size, pixels, 'raw', mode, stride, 1)
+    if palette:
+        image.putpalette(palette)
+    return image
+
+
+def decode_page(data):
+    """Rebuild a PIL image from encode_page output. Raises ValueError on invalid data."""
+    return image_from_layout(*read_page_layout(data))
+
+
+class MappedPage:
+    """A cached page file mapped read-only into memory.
+
+    The pixel rows are not read up front: the OS pages them in from the file
+    as they are accessed, and can drop them again under memory pressure
+    since they are backed by the file. Images built on the page keep the
+    mapping alive through their reference to its buffer.
+    """
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)  # Raises ValueError on empty files
+        self.mode, self.size, self.palette, self.stride, self.pixels = read_page_layout(self._map)
+
+    @property
+    def nbytes(self):
+        return len(self.pixels)
+
+    def to_image(self):
+        """Return the page as a PIL image, backed by the mapping for modes PIL can share."""
+        return image_from_layout(self.mode, self.size, self.palette, self.stride, self.pixels)
+
+
+class DiskPageCache:
+    """Size-bounded on-disk cache of rasterized pages.
+
+    Pages are keyed by file content hash, page index, DPI and colour mode and
+    stored uncompressed, in rows laid out like QImage rows, so a cached page
+    is memory-mapped rather than read and can be displayed in place. Files are
+    written to a temporary name and atomically renamed into place, so several
+    processes can fill the same cache. The least recently read files are
+    deleted once the cache grows past its budget. Other per-page data stored
+    through write_entry, such as text layer words, shares the budget.
+    """
+
+    def __init__(self, directory, budget_bytes):
+        self.directory = directory
+        self.budget_bytes = budget_bytes
+        self._estimated_bytes = None  # Computed on the first write
+        self._lock = threading.Lock()
+
+    def path_for(self, file_hash, page_index, dpi, color_mode):
+        return os.path.join(self.directory, file_hash[:2], file_hash, f'{page_index:05d}-{dpi}-{color_mode}{FILE_SUFFIX}')
+
+    def get(self, file_hash, page_index, dpi, color_mode):
+        """Return the cached page as a PIL image, or None on a miss."""
+        page = self.map(file_hash, page_index, dpi, color_mode)
+        return page.to_image() if page is not None else None
+
+    def map(self, file_hash, page_index, dpi, color_mode):
+        """Return the cached page as a MappedPage, or None on a miss."""
+        path = self.path_for(file_hash, page_index, dpi, color_mode)
+        try:
+            page = MappedPage(path)
+            os.utime(path)  # Mark as recently used for eviction
+            return page
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError):
+            # Unreadable or corrupt entry, drop it and render again
+            self._remove(path)
+            return None
+
+    def put(self, file_hash, page_index, dpi, color_mode, image):
+        """Store a page and return the bytes written. Failures are ignored, the cache is best effort."""
+        return self.write_entry(self.path_for(file_hash, page_index, dpi, color_mode), encode_page(image))
+
+    def write_entry(self, path, data):
+        """Atomically write data to path, under the cache directory, and return the bytes written, 0 on failure."""
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(temp_path, path)
+            except OSError:
+                self._remove(temp_path)
+                raise
+        except OSError:
+            return 0
+        self._account(len(data))
+        return len(data)
+
+    def _account(self, written_bytes):
+        if self.budget_bytes == float('inf'):
+            return  # Unbounded, e.g. in ingest workers; the cache is measured and evicted by whoever bounds it
+        with self._lock:
+            if self._estimated_bytes is None:
+                self._estimated_bytes = self.size_bytes()
+            else:
+                self._estimated_bytes += written_bytes
+            if self._estimated_bytes > self.budget_bytes:
+                self._estimated_bytes = self.evict()
+
+    def entries(self):
+        """Return (path, size, last used time) for every cache entry."""
+        found = []
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if name.endswith(ENTRY_SUFFIXES):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except FileNotFoundError:
+                        continue  # Evicted by another process
+                    found.append((path, stat.st_size, stat.st_mtime))
+        return found
+
+    def size_bytes(self):
+        return sum(size for _, size, _ in self.entries())
+
+    def evict(self, target_fraction=0.9):
+        """Delete the least recently used pages until the cache is under target_fraction of its budget."""
+        entries = sorted(self.entries(), key=lambda entry: entry[2])
+        total = sum(size for _, size, _ in entries)
+        for path, size, _ in entries:
+            if total <= self.budget_bytes * target_fraction:
+                break
+            self._remove(path)
+            total -= size
+        return total
+
+    def clear(self):
+        for path, _, _ in self.entries():
+            self._remove(path)
+        with self._lock:
+            self._estimated_bytes = 0
+
+    @staticmethod
+    def _remove(path):
+        try:
+            os.remove(path)
+        except OSError:
+            pass
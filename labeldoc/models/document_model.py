@@ -1,50 +1,125 @@
 # app/models/document_model.py
 
-from pdf2image import convert_from_path
-from PIL import Image
+import functools
+import os
+from ..config.settings import PAGE_CACHE_BUDGET_BYTES, PAGE_DISK_CACHE_DIR, PAGE_DISK_CACHE_BUDGET_BYTES, RASTER_PROFILE
+from .disk_cache import DiskPageCache
+from .page_cache import PageCache
+from .page_source import PageList, ImageListPageSource, PdfPageSource, open_page_source
+from .shape import Shape
+from ..utils.instrumentation import timed
 
 class DocumentModel:
     def __init__(self):
-        self.pages: list[Image.Image] = []  # List of PIL.Image objects
+        self.page_cache = PageCache(PAGE_CACHE_BUDGET_BYTES)
+        self.disk_cache = DiskPageCache(PAGE_DISK_CACHE_DIR, PAGE_DISK_CACHE_BUDGET_BYTES)
+        self.pages: PageList = PageList(cache=self.page_cache)  # Pages are rasterized on first access
         self.annotations = {}  # Annotations by page index
         self.current_page_index = 0
+        self.document_id = None  # Absolute path of the loaded document, None for in-memory images
+        self.journal = None
+        self.saved_annotations = {}  # Recovered shape dicts by document and page index
+        self.catalog = None  # WorkspaceCatalog of the open workspace, if any
+        self.recorded_counts = {}  # Annotation count last written to the catalog by (document, page index)
+
+    def attach_journal(self, journal):
+        """Persist annotations through journal and recover the ones saved in earlier sessions."""
+        self.journal = journal
+        self.saved_annotations = journal.recover()
+
+    def attach_catalog(self, catalog):
+        """Record the annotation progress of workspace documents in catalog."""
+        self.catalog = catalog
+        self.recorded_counts = {}
 
     def load_document(self, file_path):
-        """Load the document and split it into pages."""
+        """Load the document and split it into pages, rasterized with RASTER_PROFILE.
+
+        Shapes are stored in pixels of the pages, so every document is opened
+        with the same profile, the one export checks its DPI against.
+        """
+        self.stash_annotations()
+        paths = [file_path] if isinstance(file_path, str) else file_path
+        if self.catalog is not None:
+            # Cached pages are keyed by content hash, known from the catalog without reading the file
+            self.catalog.remember_content_hashes(paths)
         self.pages = self.split_document_into_pages(file_path)
         self.current_page_index = 0
+        self.document_id = os.pathsep.join(os.path.abspath(path) for path in paths)
+        self.annotations = {
+            page: [Shape.from_dict(shape) for shape in shapes]
+            for page, shapes in self.saved_annotations.get(self.document_id, {}).items()
+        }
     
     def load_images(self, images):
         """Load the images and split them into pages."""
-        self.pages = images if isinstance(images, list) else [images]
+        images = images if isinstance(images, list) else [images]
+        self.stash_annotations()
+        self.pages = PageList([ImageListPageSource(images)], self.page_cache)
         self.current_page_index = 0
+        self.document_id = None
+        self.annotations = {}
+
+    def stash_annotations(self):
+        """Keep the annotations of the open document, so that they are restored when it is opened again."""
+        if self.document_id:
+            self.saved_annotations[self.document_id] = {
+                page: [shape.to_dict() for shape in shapes] for page, shapes in self.annotations.items()
+            }
+
+    def annotation_counts(self):
+        """Return {document id: {page index: number of shapes}} over the saved and open documents."""
+        self.stash_annotations()
+        return {document: {page: len(shapes) for page, shapes in pages.items()}
+                for document, pages in self.saved_annotations.items()}
+
+    def append_page(self, source, image):
+        """Append an image as a new last page of source, an image document being streamed in.
 
+        Returns False, dropping the image, if another document was loaded since.
+        """
+        if source not in self.pages.sources:
+            return False
+        source.images.append(image)
+        self.pages.refresh()
+        return True
+
+    @timed('document.split_pages')
     def split_document_into_pages(self, file_paths):
-        """Load images from a path or list of paths (PDF or PNG)"""
+        """Open a path or list of paths (PDF or PNG) without rasterizing any pages yet."""
         if isinstance(file_paths, str):
             file_paths = [file_paths]
         
-        images = []
-        for path in file_paths:
-            clean_path = path.lower()
-            if clean_path.endswith('.pdf'):
-                images.extend(convert_from_path(path))
-            elif clean_path.endswith('.png'):
-                images.append(Image.open(path))
-            else:
-                raise ValueError(f'Could not load {path}. File type not supported.')
-        
-        return images
+        return PageList([open_page_source(path, self.disk_cache, RASTER_PROFILE) for path in file_paths], self.page_cache)
 
     def get_current_page(self):
         return self.pages[self.current_page_index] if self.pages else None
 
+    def get_region_renderer(self, index):
+        """Return render(scale, box) re-rasterizing part of page index at a higher DPI, or None if the page cannot be."""
+        source, local_index = self.pages.locate(index)
+        if not isinstance(source, PdfPageSource):
+            return None
+        return functools.partial(source.render_region, local_index)
+
     def get_current_annotations(self):
         return self.annotations.get(self.current_page_index, [])
 
+
     def save_annotations(self, page_index, shapes):
-        """Save the shapes for the current page."""
+        """Save the shapes for the current page, journaling the changes to disk.
+
+        The catalog is only written when the page's annotation count changed,
+        so the autosave does not hit SQLite on every tick.
+        """
         self.annotations[page_index] = shapes
+        if self.journal and self.document_id:
+            self.journal.save_page(self.document_id, page_index, shapes)
+        if self.catalog is not None and self.document_id:
+            key = (self.document_id, page_index)
+            if self.recorded_counts.get(key) != len(shapes):
+                self.catalog.record_annotations(self.document_id, page_index, len(shapes))
+                self.recorded_counts[key] = len(shapes)
     
     def next_page(self):
         """Move to the next page in the document."""
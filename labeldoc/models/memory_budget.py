@@ -0,0 +1,144 @@
+# app/models/memory_budget.py
+
+import os
+import threading
+import tracemalloc
+
+from ..config.settings import MEMORY_BUDGET_BYTES
+
+MB = 1024 * 1024
+
+
+def describe_source(source_key):
+    """Readable name of a page source key."""
+    if source_key[0] == 'images':
+        return f'images #{source_key[1]}'
+    return os.path.basename(source_key[0])
+
+
+def describe_page_key(key):
+    """Readable name of a page cache key (source key, page index)."""
+    source_key, index = key
+    return f'{describe_source(source_key)} page {index + 1}'
+
+
+class MemoryBudget:
+    """Process-wide accounting of the memory held by decoded pages, with a byte budget.
+
+    Pages are held in several representations: PIL images in the model's
+    page cache, QImages in the canvas cache, and the page on screen with its
+    tile pyramid and detail render. Tracked caches report their decoded
+    sizes; other holders report them through a callable. When the total goes
+    over the budget, enforce() first drops representations superseded by
+    another cache (a PIL page whose QImage is cached), then evicts least
+    recently used pages from the caches in the order they were tracked.
+    Protected pages, e.g. the current one, are never evicted.
+
+    PIL images and Qt's own buffers are allocated outside the Python
+    allocator, so tracemalloc snapshots in the report only show the pixel
+    buffers exported to Python bytes, next to the other Python allocations.
+    """
+
+    def __init__(self, budget_bytes=MEMORY_BUDGET_BYTES):
+        self.budget_bytes = budget_bytes
+        self.caches = {}  # Name -> (PageCache, superseding PageCache or None)
+        self.holders = {}  # Name -> function returning {representation: bytes} held outside the caches
+        self.protected = set()  # Page keys never evicted
+        self.downgrades = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def track_cache(self, name, cache, superseded_by=None):
+        """Account for cache; its entries whose key is also in superseded_by are dropped first."""
+        self.caches[name] = (cache, superseded_by)
+        cache.memory_budget = self
+
+    def track_holder(self, name, usage):
+        self.holders[name] = usage
+
+    def protect(self, keys):
+        self.protected = set(keys)
+
+    def holder_bytes(self):
+        return {name: usage() for name, usage in self.holders.items()}
+
+    def total_bytes(self):
+        cache_bytes = sum(cache.total_bytes for cache, _ in self.caches.values())
+        return cache_bytes + sum(sum(usage.values()) for usage in self.holder_bytes().values())
+
+    def enforce(self):
+        """Downgrade or evict cached pages until the total fits the budget. Returns the bytes freed."""
+        with self._lock:
+            excess = self.total_bytes() - self.budget_bytes
+            if excess <= 0:
+                return 0
+            freed = 0
+            # Drop representations that another cache can stand in for
+            for cache, superseded_by in self.caches.values():
+                if superseded_by is None:
+                    continue
+                for key, size in cache.sizes():
+                    if freed >= excess:
+                        return freed
+                    if key in superseded_by and key not in self.protected:
+                        cache.discard(key)
+                        freed += size
+                        self.downgrades += 1
+            # Then evict least recently used pages
+            for cache, _ in self.caches.values():
+                if freed >= excess:
+                    break
+                evictions = cache.evictions
+                freed += cache.trim(cache.total_bytes - (excess - freed), keep=self.protected)
+                self.evictions += cache.evictions - evictions
+            return freed
+
+    def page_usage(self):
+        """Return {page key: {cache name: bytes}} over the tracked caches."""
+        pages = {}
+        for name, (cache, _) in self.caches.items():
+            for key, size in cache.sizes():
+                pages.setdefault(key, {})[name] = size
+        return pages
+
+    def report(self, tracemalloc_top=10):
+        """Return a text report of memory use by page, document and representation."""
+        lines = ['=== MEMORY REPORT ===']
+        total = self.total_bytes()
+        lines.append(f'Total:   {total / MB:8.1f} MB of {self.budget_bytes / MB:.1f} MB budget '
+                     f'({self.downgrades} downgrades, {self.evictions} evictions)')
+        for name, (cache, _) in self.caches.items():
+            stats = cache.stats()
+            lines.append(f'{name + ":":<8} {stats["total_bytes"] / MB:8.1f} MB in {stats["entries"]} pages '
+                         f'({stats["hits"]} hits, {stats["misses"]} misses, {stats["evictions"]} evictions, '
+                         f'{stats["hit_rate"]:.0%} hit rate)')
+        for name, usage in self.holder_bytes().items():
+            details = ', '.join(f'{part} {size / MB:.1f} MB' for part, size in usage.items())
+            lines.append(f'{name + ":":<8} {sum(usage.values()) / MB:8.1f} MB ({details})')
+
+        pages = self.page_usage()
+        documents = {}
+        for key, usage in pages.items():
+            documents[key[0]] = documents.get(key[0], 0) + sum(usage.values())
+        if documents:
+            lines.append('')
+            lines.append('By document:')
+            for source_key, size in sorted(documents.items(), key=lambda item: -item[1]):
+                lines.append(f'  {describe_source(source_key)}: {size / MB:.1f} MB')
+            lines.append('By page:')
+            for key, usage in sorted(pages.items(), key=lambda item: -sum(item[1].values())):
+                details = ', '.join(f'{name} {size / MB:.1f} MB' for name, size in usage.items())
+                protected = ' (current)' if key in self.protected else ''
+                lines.append(f'  {describe_page_key(key)}{protected}: {details}')
+
+        if tracemalloc.is_tracing():
+            current, peak = tracemalloc.get_traced_memory()
+            lines.append('')
+            lines.append(f'Python allocations (tracemalloc): {current / MB:.1f} MB, peak {peak / MB:.1f} MB')
+            for stat in tracemalloc.take_snapshot().statistics('lineno')[:tracemalloc_top]:
+                lines.append(f'  {stat}')
+        return '\n'.join(lines)
+
+    def print_report(self):
+        print()
+        print(self.report())
@@ -0,0 +1,121 @@
+# app/models/page_cache.py
+
+import threading
+from collections import OrderedDict
+
+# Bytes per pixel of the decoded image for each PIL mode
+MODE_BYTES_PER_PIXEL = {
+    '1': 1,  # PIL keeps bilevel images unpacked, one byte per pixel
+    'L': 1,
+    'P': 1,
+    'LA': 2,
+    'I;16': 2,
+    'RGB': 3,
+    'RGBA': 4,
+    'RGBX': 4,
+    'CMYK': 4,
+    'I': 4,
+    'F': 4,
+}
+
+
+def image_nbytes(image):
+    """Estimate the decoded size of a PIL image in bytes."""
+    bytes_per_pixel = MODE_BYTES_PER_PIXEL.get(image.mode, len(image.getbands()))
+    return int(image.width * image.height * bytes_per_pixel)
+
+
+class PageCache:
+    """Least-recently-used cache of rasterized pages, bounded by a byte budget.
+
+    The cache is thread-safe so that prefetch workers can fill it. A
+    MemoryBudget tracking the cache is notified after each put, outside the
+    cache lock.
+    """
+
+    def __init__(self, budget_bytes, sizeof=image_nbytes):
+        self.budget_bytes = budget_bytes
+        self.sizeof = sizeof
+        self.memory_budget = None
+        self._entries = OrderedDict()  # key -> (value, size in bytes)
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.RLock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def get(self, key):
+        """Return the cached value for key, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key, value):
+        """Store value under key and evict old entries until the budget is met."""
+        size = self.sizeof(value)
+        with self._lock:
+            self.discard(key)
+            self._entries[key] = (value, size)
+            self.total_bytes += size
+            # The newest entry is always kept, even if it alone exceeds the budget
+            self.trim(self.budget_bytes, keep=(key,))
+        if self.memory_budget is not None:
+            self.memory_budget.enforce()
+
+    def trim(self, target_bytes, keep=()):
+        """Evict least recently used entries, except those in keep, until at most target_bytes remain.
+
+        Returns the number of bytes freed.
+        """
+        freed = 0
+        with self._lock:
+            for key in list(self._entries):
+                if self.total_bytes <= target_bytes:
+                    break
+                if key not in keep:
+                    _, size = self._entries.pop(key)
+                    self.total_bytes -= size
+                    freed += size
+                    self.evictions += 1
+        return freed
+
+    def sizes(self):
+        """Return [(key, size in bytes)] from least to most recently used."""
+        with self._lock:
+            return [(key, size) for key, (_, size) in self._entries.items()]
+
+    def discard(self, key):
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is not None:
+                self.total_bytes -= entry[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.total_bytes = 0
+
+    def stats(self):
+        """Return the cache counters, for sizing the budget."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'total_bytes': self.total_bytes,
+                'budget_bytes': self.budget_bytes,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
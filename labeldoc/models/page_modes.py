@@ -0,0 +1,45 @@
+# app/models/page_modes.py
+
+from PIL import Image, ImageChops
+
+
+def compact_image(image):
+    """Return image in the most compact mode that holds it exactly.
+
+    Bilevel pages become '1', other grayscale pages 'L' and colour pages of
+    at most 256 colours 'P'. Pages with transparency or more colours are
+    returned unchanged.
+    """
+    if image.mode in ('1', 'P'):
+        return image
+    if image.mode == 'RGBA':
+        if image.getchannel('A').getextrema() != (255, 255):
+            return image
+        image = image.convert('RGB')
+    if image.mode not in ('RGB', 'L'):
+        return image
+
+    colors = image.getcolors(256)
+    if colors is None:
+        return image  # More than 256 colours, so not grayscale either
+    if image.mode == 'RGB':
+        if not all(red == green == blue for _, (red, green, blue) in colors):
+            return to_palette(image)
+        image = image.getchannel('R')
+        colors = [(count, color[0]) for count, color in colors]
+    if {value for _, value in colors} <= {0, 255}:
+        return image.convert('1', dither=Image.Dither.NONE)
+    return image
+
+
+def to_palette(image):
+    """Return an RGB image of at most 256 colours as a 'P' image with the same colours, or image if that fails.
+
+    With no more colours than palette entries, Pillow's max coverage
+    quantizer gives each colour its own entry. The result is still checked
+    against the page, so a page is never stored with approximated colours.
+    """
+    paletted = image.quantize(colors=256, method=Image.Quantize.MAXCOVERAGE, dither=Image.Dither.NONE)
+    if ImageChops.difference(paletted.convert('RGB'), image).getbbox() is not None:
+        return image
+    return paletted
@@ -0,0 +1,340 @@
+# app/models/page_source.py
+
+import itertools
+import os
+import re
+from bisect import bisect_right
+from PIL import Image
+from ..config.settings import DETAIL_MAX_DPI, RASTER_COMPACT_MODES, RASTER_PROFILE, RASTER_WORKERS
+from .disk_cache import content_hash
+from .page_cache import PageCache
+from .page_modes import compact_image
+from .rasterizer import raster_profile, rasterize_pdf, run_pdftoppm
+from ..utils.instrumentation import count, timed
+
+
+_image_list_ids = itertools.count()
+
+# Per-page lines of pdfinfo -f FIRST -l LAST, e.g. "Page    2 size: 612 x 792 pts (letter)" and "Page    2 rot: 90"
+PAGE_SIZE_PATTERN = re.compile(r'Page\s+(\d+) size$')
+PAGE_ROTATION_PATTERN = re.compile(r'Page\s+(\d+) rot$')
+SIZE_PATTERN = re.compile(r'([\d.]+) x ([\d.]+)')
+
+
+def consecutive_runs(indices):
+    """Split sorted indices into lists of consecutive indices."""
+    return [[index for _, index in run] for _, run in itertools.groupby(enumerate(indices), lambda item: item[1] - item[0])]
+
+
+def file_key(path):
+    """Cache key for a file, invalidated when the file is modified."""
+    return (os.path.abspath(path), os.stat(path).st_mtime_ns)
+
+
+class PageSource:
+    """A document whose pages are rasterized on demand."""
+
+    def __init__(self, key):
+        self.key = key
+
+    def page_count(self):
+        raise NotImplementedError
+
+    def render_page(self, index):
+        raise NotImplementedError
+
+    def page_size(self, index):
+        """Return the (width, height) of page index in pixels, from metadata where possible."""
+        return self.render_page(index).size
+
+    def map_page(self, index):
+        """Return (MappedPage of page index in the disk cache, or None; PIL image rendered meanwhile, or None).
+
+        When the page could not be mapped but had to be rendered, the image is
+        returned so that it is not rendered again. (None, None) means neither.
+        """
+        return self.map_range(index, index + 1)[0]
+
+    def map_range(self, start, stop):
+        """Return map_page(index) for pages start to stop - 1."""
+        return [(None, None)] * (stop - start)
+
+
+class FilePageSource(PageSource):
+    """Pages of a file on disk, read from the disk cache when it holds them.
+
+    Rasterized pages are stored in the most compact mode that holds them
+    exactly, so a bilevel scan is not kept as RGB.
+    """
+
+    def __init__(self, path, disk_cache=None, dpi=0, color_mode='native'):
+        super().__init__(file_key(path) + (dpi, color_mode))
+        self.path = path
+        self.disk_cache = disk_cache
+        self.dpi = dpi
+        self.color_mode = color_mode
+
+    def content_hash(self):
+        return content_hash(self.path)
+
+    def cache_key(self, index):
+        """Disk cache key of page index: (content hash, index, DPI, colour mode)."""
+        return (self.content_hash(), index, self.dpi, self.color_mode)
+
+    @timed('page.render')
+    def render_page(self, index):
+        if self.disk_cache is None:
+            return self.compact(self.rasterize_page(index))
+        cache_key = self.cache_key(index)
+        image = self.disk_cache.get(*cache_key)
+        count('disk_cache.hit' if image is not None else 'disk_cache.miss')
+        if image is None:
+            image = self.compact(self.rasterize_page(index))
+            self.disk_cache.put(*cache_key, image)
+        return image
+
+    @timed('page.map_range')
+    def map_range(self, start, stop):
+        """Return pages start to stop - 1 mapped from the disk cache, rasterizing the missing ones into the cache.
+
+        Consecutive missing pages are rasterized together with rasterize_range.
+        A rendered page that could not be stored (disk full, permissions) is
+        returned as an image instead, see PageSource.map_page.
+        """
+        if self.disk_cache is None:
+            return super().map_range(start, stop)
+        results = {}
+        missing = []
+        for index in range(start, stop):
+            page = self.disk_cache.map(*self.cache_key(index))
+            count('disk_cache.hit' if page is not None else 'disk_cache.miss')
+            if page is not None:
+                results[index] = (page, None)
+            else:
+                missing.append(index)
+        for run in consecutive_runs(missing):
+            for index, image in zip(run, self.rasterize_range(run[0], run[-1] + 1)):
+                image = self.compact(image)
+                cache_key = self.cache_key(index)
+                page = self.disk_cache.map(*cache_key) if self.disk_cache.put(*cache_key, image) else None
+                results[index] = (page, None) if page is not None else (None, image)
+        return [results[index] for index in range(start, stop)]
+
+    @timed('page.compact')
+    def compact(self, image):
+        return compact_image(image) if RASTER_COMPACT_MODES else image
+
+    def rasterize_page(self, index):
+        raise NotImplementedError
+
+    def rasterize_range(self, start, stop):
+        """Rasterize pages start to stop - 1, bypassing the disk cache."""
+        return [self.rasterize_page(index) for index in range(start, stop)]
+
+
+class PdfPageSource(FilePageSource):
+    """PDF pages rendered with poppler, using the options of a rasterization profile.
+
+    profile is a name from RASTER_PROFILES or a dict of options. Page ranges
+    are split across up to workers concurrent poppler processes.
+    """
+
+    def __init__(self, path, disk_cache=None, profile=RASTER_PROFILE, workers=RASTER_WORKERS):
+        self.options = raster_profile(profile)
+        color_mode = 'mono' if self.options['mono'] else 'gray' if self.options['grayscale'] else 'rgb'
+        if self.options['fmt'] == 'jpeg':
+            color_mode += '-jpeg'  # Lossy pages must not be mixed up with exact ones in the disk cache
+        super().__init__(path, disk_cache, self.options['dpi'], color_mode)
+        self.grayscale = self.options['grayscale']
+        self.workers = workers
+        # pdf2image is imported on the first PDF, so that opening images does not load it
+        from pdf2image import pdfinfo_from_path
+        self.info = pdfinfo_from_path(path)  # Reads metadata only, no rasterization
+        self._page_sizes = None  # (width, height) of each page in pixels, read on first use
+
+    def page_count(self):
+        return int(self.info['Pages'])
+
+    def page_size(self, index):
+        if self._page_sizes is None:
+            self._page_sizes = self.read_page_sizes()
+        size = self._page_sizes.get(index)
+        if size is None:
+            return super().page_size(index)
+        return size
+
+    @timed('poppler.pdfinfo')
+    def read_page_sizes(self):
+        """Return {page index: (width, height) in pixels} from one pdfinfo run over all pages.
+
+        Pages may differ in size and orientation; rotated pages are rendered
+        with their width and height swapped, as pdftoppm does.
+        """
+        from pdf2image import pdfinfo_from_path
+        info = pdfinfo_from_path(self.path, first_page=1, last_page=self.page_count())
+        sizes = {}
+        rotations = {}
+        for key, value in info.items():
+            page_match = PAGE_SIZE_PATTERN.match(key)
+            size_match = SIZE_PATTERN.match(str(value))
+            if page_match is not None and size_match is not None:
+                sizes[int(page_match.group(1)) - 1] = size_match.groups()
+            page_match = PAGE_ROTATION_PATTERN.match(key)
+            if page_match is not None:
+                rotations[int(page_match.group(1)) - 1] = int(float(value)) % 180
+        first_page_match = SIZE_PATTERN.match(self.info.get('Page size', ''))
+        if not sizes and first_page_match is not None:
+            # Older pdfinfo without per-page lines: the size of the first page for every page
+            sizes = dict.fromkeys(range(self.page_count()), first_page_match.groups())
+        page_sizes = {}
+        for index, (width, height) in sizes.items():
+            width, height = (round(float(value) * self.dpi / 72) for value in (width, height))
+            page_sizes[index] = (height, width) if rotations.get(index) == 90 else (width, height)
+        return page_sizes
+
+    def rasterize_page(self, index):
+        page_number = index + 1
+        return rasterize_pdf(self.path, page_number, page_number, self.options, workers=1)[0]
+
+    def rasterize_range(self, start, stop):
+        return rasterize_pdf(self.path, start + 1, stop, self.options, self.workers)
+
+    def render_region(self, index, scale, box):
+        """Rasterize box (x, y, width, height in page image pixels) of page index at scale times the page DPI.
+
+        The DPI is capped at DETAIL_MAX_DPI, so the image can be smaller than
+        requested. Returns None when the cap is not above the page DPI.
+        """
+        dpi = min(self.dpi * scale, DETAIL_MAX_DPI)
+        if dpi <= self.dpi:
+            return None
+        scale = dpi / self.dpi
+        crop = tuple(round(value * scale) for value in box)
+        page_number = index + 1
+        return run_pdftoppm(self.path, page_number, page_number, dict(self.options, dpi=dpi), crop)[0]
+
+
+class ImageFilePageSource(FilePageSource):
+    """A single-page image file, decoded on first access."""
+
+    def __init__(self, path, disk_cache=None):
+        super().__init__(path, disk_cache)
+        self._size = None
+
+    def page_count(self):
+        return 1
+
+    def page_size(self, index):
+        if self._size is None:
+            with Image.open(self.path) as image:  # Reads the header only
+                self._size = image.size
+        return self._size
+
+    @timed('image.decode')
+    def rasterize_page(self, index):
+        image = Image.open(self.path)
+        image.load()
+        return image
+
+
+class ImageListPageSource(PageSource):
+    """Pages that are already in memory, e.g. captured from the web view."""
+
+    def __init__(self, images):
+        super().__init__(("images", next(_image_list_ids)))
+        self.images = images
+
+    def page_count(self):
+        return len(self.images)
+
+    def render_page(self, index):
+        return self.images[index]
+
+    def page_size(self, index):
+        return self.images[index].size
+
+
+def open_page_source(path, disk_cache=None, profile=RASTER_PROFILE, workers=RASTER_WORKERS):
+    """Create the page source matching the file type of path."""
+    clean_path = path.lower()
+    if clean_path.endswith('.pdf'):
+        return PdfPageSource(path, disk_cache, profile, workers)
+    elif clean_path.endswith('.png'):
+        return ImageFilePageSource(path, disk_cache)
+    raise ValueError(f'Could not load {path}. File type not supported.')
+
+
+class PageList:
+    """Sequence of pages over one or more sources, rasterized on first access.
+
+    Rendered pages live in a shared PageCache keyed by (source key, page index),
+    so evicted pages are transparently rendered again when requested.
+    """
+
+    def __init__(self, sources=None, cache=None):
+        self.sources: list[PageSource] = list(sources or [])
+        self.cache = cache if cache is not None else PageCache(float('inf'))
+        self.refresh()
+
+    def refresh(self):
+        """Recount the pages, after a source gained pages (e.g. while streaming)."""
+        self._offsets = []
+        total = 0
+        for source in self.sources:
+            self._offsets.append(total)
+            total += source.page_count()
+        self._length = total
+
+    def __len__(self):
+        return self._length
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += self._length
+        if not 0 <= index < self._length:
+            raise IndexError('page index out of range')
+        source, local_index = self.locate(index)
+        key = (source.key, local_index)
+        image = self.cache.get(key)
+        if image is None:
+            image = source.render_page(local_index)
+            self.cache.put(key, image)
+        return image
+
+    def __iter__(self):
+        for index in range(self._length):
+            yield self[index]
+
+    def page_size(self, index):
+        """Return the (width, height) of page index without rasterizing it, where the source allows."""
+        source, local_index = self.locate(index)
+        return source.page_size(local_index)
+
+    def map_page(self, index):
+        """Return (MappedPage, image) of page index, see PageSource.map_page.
+
+        Mapped pages bypass the page cache; an image rendered instead is cached like pages[index].
+        """
+        return self.map_range(index, index + 1)[0]
+
+    def map_range(self, start, stop):
+        """Return map_page(index) for pages start to stop - 1, which must belong to one source.
+
+        The missing pages are rasterized together, see FilePageSource.map_range.
+        """
+        source, local_start = self.locate(start)
+        results = source.map_range(local_start, local_start + stop - start)
+        for local_index, (_, image) in enumerate(results, local_start):
+            if image is not None:
+                self.cache.put((source.key, local_index), image)
+        return results
+
+    def page_key(self, index):
+        """Key identifying page index across documents, for caches of derived images."""
+        source, local_index = self.locate(index)
+        return (source.key, local_index)
+
+    def locate(self, index):
+        """Return the source holding page index and the page's index within it."""
+        position = bisect_right(self._offsets, index) - 1
+        return self.sources[position], index - self._offsets[position]
@@ -0,0 +1,118 @@
+# app/models/rasterizer.py
+
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from PIL import Image
+
+from ..config.settings import RASTER_DPI, RASTER_GRAYSCALE, RASTER_MONO, RASTER_PROFILE, RASTER_PROFILES, RASTER_WORKERS
+from ..utils.instrumentation import timed
+
+# PNM magic number -> (PIL mode, raw mode of the pixel rows)
+PNM_MODES = {
+    b'P6': ('RGB', 'RGB'),
+    b'P5': ('L', 'L'),
+    b'P4': ('1', '1;I'),  # In PBM files 1 is black
+}
+FORMAT_FLAGS = {'ppm': [], 'png': ['-png'], 'jpeg': ['-jpeg']}
+
+
+def raster_profile(profile=None, **overrides):
+    """Return the rasterization options of a profile name (or dict), with overrides applied."""
+    if profile is None or isinstance(profile, str):
+        profile = RASTER_PROFILES[profile or RASTER_PROFILE]
+    options = {'dpi': RASTER_DPI, 'grayscale': RASTER_GRAYSCALE, 'mono': RASTER_MONO, 'fmt': 'ppm'}
+    options.update(profile)
+    options.update({key: value for key, value in overrides.items() if value is not None})
+    return options
+
+
+def parse_pnm_stream(data):
+    """Split concatenated binary PNM images (as written by pdftoppm to stdout) into PIL images."""
+    view = memoryview(data)
+    images = []
+    pos = 0
+    while pos < len(data):
+        magic = bytes(view[pos:pos + 2])
+        if magic not in PNM_MODES:
+            raise ValueError(f'Unsupported PNM data at byte {pos}')
+        mode, raw_mode = PNM_MODES[magic]
+        pos += 2
+        values = []
+        while len(values) < (2 if magic == b'P4' else 3):
+            while data[pos:pos + 1].isspace():
+                pos += 1
+            start = pos
+            while data[pos:pos + 1].isdigit():
+                pos += 1
+            values.append(int(data[start:pos]))
+        pos += 1  # Single whitespace byte before the pixels
+        width, height = values[0], values[1]
+        row_bytes = (width + 7) // 8 if magic == b'P4' else width * len(mode)
+        size = row_bytes * height
+        # One copy, from the pipe buffer into the image, so pages do not pin the whole stream
+        images.append(Image.frombytes(mode, (width, height), view[pos:pos + size], 'raw', raw_mode))
+        pos += size
+    return images
+
+
+def pdftoppm_args(path, first_page, last_page, options, crop=None):
+    """Build the pdftoppm command line rendering pages first_page to last_page (1-based) to stdout."""
+    args = ['pdftoppm', '-r', f"{options['dpi']:g}", '-f', str(first_page), '-l', str(last_page)]
+    if options['mono']:
+        args.append('-mono')
+    elif options['grayscale']:
+        args.append('-gray')
+    args.extend(FORMAT_FLAGS[options['fmt']])
+    if crop is not None:
+        x, y, width, height = crop  # In pixels at the requested DPI
+        args.extend(['-x', str(x), '-y', str(y), '-W', str(width), '-H', str(height)])
+    args.append(path)
+    return args
+
+
+@timed('poppler.pdftoppm')
+def run_pdftoppm(path, first_page, last_page, options, crop=None):
+    """Rasterize a page range in one poppler process, reading the images from its stdout."""
+    if options['fmt'] != 'ppm' and first_page != last_page:
+        # Compressed formats cannot be split from a stream, render them page by page
+        return [image for page in range(first_page, last_page + 1)
+                for image in run_pdftoppm(path, page, page, options, crop)]
+    result = subprocess.run(pdftoppm_args(path, first_page, last_page, options, crop), capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'pdftoppm failed on {path}: {result.stderr.decode(errors="replace").strip()}')
+    if options['fmt'] == 'ppm':
+        return parse_pnm_stream(result.stdout)
+    image = Image.open(BytesIO(result.stdout))
+    image.load()
+    return [image]
+
+
+def split_range(first_page, last_page, parts):
+    """Split first_page..last_page into at most parts contiguous (first, last) ranges."""
+    page_count = last_page - first_page + 1
+    parts = max(1, min(parts, page_count))
+    ranges = []
+    start = first_page
+    for part in range(parts):
+        size = page_count // parts + (1 if part < page_count % parts else 0)
+        ranges.append((start, start + size - 1))
+        start += size
+    return ranges
+
+
+def rasterize_pdf(path, first_page, last_page, profile=None, workers=RASTER_WORKERS):
+    """Rasterize pages first_page to last_page (1-based) of a PDF, in page order.
+
+    The range is split into contiguous chunks, each rendered by its own
+    poppler process. The processes run concurrently and hand their images
+    back through pipes, without temporary files.
+    """
+    options = raster_profile(profile)
+    ranges = split_range(first_page, last_page, workers)
+    if len(ranges) == 1:
+        return run_pdftoppm(path, first_page, last_page, options)
+    with ThreadPoolExecutor(max_workers=len(ranges)) as executor:
+        chunks = executor.map(lambda page_range: run_pdftoppm(path, *page_range, options), ranges)
+        return [image for chunk in chunks for image in chunk]
@@ -0,0 +1,53 @@
+# app/models/shape.py
+
+import uuid
+
+from ..config.settings import SHAPE_LINE_COLOR
+
+
+class Shape:
+    """A labeled rectangle or polygon in page image coordinates."""
+
+    def __init__(self, label, points, shape_type='rectangle', shape_id=None):
+        self.id = shape_id or uuid.uuid4().hex
+        self.label = label
+        self.points = [tuple(point) for point in points]
+        self.shape_type = shape_type
+
+    def __repr__(self):
+        return f'Shape({self.label!r}, {self.shape_type}, {self.bounding_box()})'
+
+    def bounding_box(self):
+        """Return (x0, y0, x1, y1) enclosing all points."""
+        xs = [x for x, _ in self.points]
+        ys = [y for _, y in self.points]
+        return (min(xs), min(ys), max(xs), max(ys))
+
+    def draw(self, painter):
+        # Qt is imported here so the models stay usable without a display
+        from PyQt6.QtCore import Qt, QPointF, QRectF
+        from PyQt6.QtGui import QColor, QPen, QPolygonF
+
+        painter.save()
+        pen = QPen(QColor(SHAPE_LINE_COLOR))
+        pen.setCosmetic(True)  # Constant line width at every zoom level
+        painter.setPen(pen)
+        painter.setBrush(Qt.BrushStyle.NoBrush)
+        if self.shape_type == 'rectangle':
+            x0, y0, x1, y1 = self.bounding_box()
+            painter.drawRect(QRectF(QPointF(x0, y0), QPointF(x1, y1)))
+        else:
+            painter.drawPolygon(QPolygonF([QPointF(x, y) for x, y in self.points]))
+        painter.restore()
+
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'label': self.label,
+            'shape_type': self.shape_type,
+            'points': [list(point) for point in self.points],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['label'], data['points'], data.get('shape_type', 'rectangle'), data.get('id'))
@@ -0,0 +1,107 @@
+# app/models/text_layer.py
+
+import html
+import json
+import os
+import re
+import subprocess
+from collections import namedtuple
+
+from ..utils.instrumentation import timed
+from .disk_cache import WORDS_SUFFIX
+from ..utils.spatial_index import GridIndex
+
+# A word of the PDF text layer; the box is in points (1/72 inch) from the top left of the page
+Word = namedtuple('Word', 'text x0 y0 x1 y1')
+
+PAGE_START = re.compile(r'<page\b')
+WORD_PATTERN = re.compile(
+    r'<word xMin="([-\d.]+)" yMin="([-\d.]+)" xMax="([-\d.]+)" yMax="([-\d.]+)">(.*?)</word>', re.S
+)
+
+
+def parse_bbox_html(text):
+    """Return the words of each page of pdftotext -bbox output, as a list of lists of Word."""
+    return [
+        [Word(html.unescape(word), float(x0), float(y0), float(x1), float(y1))
+         for x0, y0, x1, y1, word in WORD_PATTERN.findall(page)]
+        for page in PAGE_START.split(text)[1:]
+    ]
+
+
+@timed('poppler.pdftotext')
+def extract_words(path, first_page, last_page):
+    """Extract the word boxes of pages first_page to last_page (1-based) of a PDF with one pdftotext run."""
+    args = ['pdftotext', '-bbox', '-f', str(first_page), '-l', str(last_page), path, '-']
+    result = subprocess.run(args, capture_output=True)
+    if result.returncode != 0:
+        raise RuntimeError(f'pdftotext failed on {path}: {result.stderr.decode(errors="replace").strip()}')
+    return parse_bbox_html(result.stdout.decode('utf-8', errors='replace'))
+
+
+class TextLayerCache:
+    """Word boxes of PDF pages on disk, next to their rasterizations in a DiskPageCache.
+
+    Pages are keyed by file content hash and page index only: words are in
+    points, so they serve every DPI and colour mode. Pages without text are
+    stored too, so they are not extracted again. Word files count against
+    the page cache budget and are evicted with the pages.
+    """
+
+    def __init__(self, disk_cache):
+        self.disk_cache = disk_cache
+
+    def path_for(self, file_hash, page_index):
+        return os.path.join(self.disk_cache.directory, file_hash[:2], file_hash, f'{page_index:05d}{WORDS_SUFFIX}')
+
+    def get(self, file_hash, page_index):
+        """Return the words of the page, or None on a miss."""
+        path = self.path_for(file_hash, page_index)
+        try:
+            with open(path) as f:
+                words = [Word(*word) for word in json.load(f)]
+            os.utime(path)  # Mark as recently used for eviction
+            return words
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, TypeError):
+            return None  # Corrupt entry, extracted and written again
+
+    def put(self, file_hash, page_index, words):
+        """Store the words of a page. Failures are ignored, the cache is best effort."""
+        data = json.dumps([list(word) for word in words], separators=(',', ':')).encode()
+        self.disk_cache.write_entry(self.path_for(file_hash, page_index), data)
+
+
+class PageTextIndex:
+    """Words of one page in page image pixels, in a spatial index for snapping shapes to them."""
+
+    def __init__(self, words, scale):
+        self.scale = scale  # Page image pixels per point
+        self.index = GridIndex()
+        for word in words:
+            self.index.insert(word, self.word_box(word))
+
+    def __len__(self):
+        return len(self.index)
+
+    def word_box(self, word):
+        """Box of word in page image pixels."""
+        return (word.x0 * self.scale, word.y0 * self.scale, word.x1 * self.scale, word.y1 * self.scale)
+
+    def word_at(self, x, y):
+        """Return the word under the image point (x, y), or None."""
+        words = self.index.query_point(x, y)
+        return words[-1] if words else None
+
+    def words_in_rect(self, box):
+        """Return the words intersecting box, in reading order of the text layer."""
+        return self.index.query_rect(box)
+
+    def box_from_selection(self, box):
+        """Return the box enclosing the words a selection box intersects, or None if it touches none."""
+        words = self.words_in_rect(box)
+        if not words:
+            return None
+        boxes = [self.word_box(word) for word in words]
+        return (min(b[0] for b in boxes), min(b[1] for b in boxes), max(b[2] for b in boxes), max(b[3] for b in boxes))
@@ -0,0 +1,266 @@
+# app/models/workspace_catalog.py
+
+import os
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from ..config.settings import CATALOG_COMMIT_DOCUMENTS, RASTER_PROFILE, RASTER_WORKERS
+from .disk_cache import remember_content_hash
+from .page_source import open_page_source
+
+SCHEMA_VERSION = 1
+
+# Page statuses; pages move between unlabeled and labeled with their annotation count, the others are set by hand
+UNLABELED = 'unlabeled'
+LABELED = 'labeled'
+SKIPPED = 'skipped'
+REVIEWED = 'reviewed'
+PAGE_STATUSES = (UNLABELED, LABELED, SKIPPED, REVIEWED)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    content_hash TEXT NOT NULL,
+    page_count INTEGER NOT NULL,
+    dpi REAL NOT NULL,
+    color_mode TEXT NOT NULL,
+    added_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS pages (
+    document_id INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    page_index INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    annotation_count INTEGER NOT NULL DEFAULT 0,
+    status TEXT NOT NULL DEFAULT 'unlabeled',
+    updated_at REAL,
+    PRIMARY KEY (document_id, page_index)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS pages_by_status ON pages (status, document_id, page_index);
+CREATE INDEX IF NOT EXISTS pages_by_annotation_count ON pages (annotation_count, document_id, page_index);
+"""
+
+PAGE_QUERY = """
+SELECT d.path, p.page_index, p.width, p.height, d.dpi, d.content_hash, p.annotation_count, p.status
+FROM pages p JOIN documents d ON d.id = p.document_id
+"""
+
+
+def describe_document(path, profile=RASTER_PROFILE):
+    """Read what the catalog keeps of a document: (path, mtime_ns, size, content hash, DPI, colour mode, page sizes)."""
+    stat = os.stat(path)
+    source = open_page_source(path, profile=profile)
+    page_sizes = [source.page_size(index) for index in range(source.page_count())]
+    return (os.path.abspath(path), stat.st_mtime_ns, stat.st_size, source.content_hash(), source.dpi,
+            source.color_mode, page_sizes)
+
+
+class WorkspaceCatalog:
+    """SQLite catalog of the documents of a workspace, their pages and labeling progress.
+
+    Queues such as "next unlabeled page" are indexed queries, so they stay
+    fast with tens of thousands of documents and never open a file. Adding
+    documents is incremental: files with the size and modification time
+    already cataloged are not opened again. The content hash kept for each
+    document seeds the disk cache keys when the document is opened, so its
+    cached rasterizations are found without hashing the file again.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.connection = sqlite3.connect(path)
+        self.connection.row_factory = sqlite3.Row
+        self.connection.execute('PRAGMA journal_mode = WAL')
+        self.connection.execute('PRAGMA synchronous = NORMAL')  # Durable across crashes of the app, not of the OS
+        self.connection.execute('PRAGMA foreign_keys = ON')
+        version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+        if version not in (0, SCHEMA_VERSION):
+            raise ValueError(f'Unsupported workspace catalog version {version} in {path}')
+        self.connection.executescript(SCHEMA)
+        self.connection.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+    def close(self):
+        self.connection.close()
+
+    # Documents
+
+    def add_documents(self, paths, profile=RASTER_PROFILE, annotation_counts=None, workers=RASTER_WORKERS,
+                      on_progress=None, cancelled=None):
+        """Catalog new and modified documents among paths and return counts of what was done.
+
+        Documents are opened concurrently, to read their page sizes and hash
+        them. annotation_counts ({path: {page index: count}}) sets the initial
+        progress of the pages of newly cataloged documents. Rows are committed
+        every CATALOG_COMMIT_DOCUMENTS documents, so that other connections
+        see the documents cataloged so far, then on_progress(documents done,
+        documents to open) is called. Setting the cancelled event stops after
+        the documents being opened; the rest are cataloged next time.
+        """
+        annotation_counts = annotation_counts or {}
+        stats = {'added': 0, 'updated': 0, 'unchanged': 0, 'failed': 0, 'cancelled': False}
+        known = {row['path']: (row['mtime_ns'], row['size'])
+                 for row in self.connection.execute('SELECT path, mtime_ns, size FROM documents')}
+        changed = []
+        for path in paths:
+            path = os.path.abspath(path)
+            try:
+                stat = os.stat(path)
+            except OSError as e:
+                print(f"Skipping {path}: {e}")
+                stats['failed'] += 1
+                continue
+            if known.get(path) == (stat.st_mtime_ns, stat.st_size):
+                stats['unchanged'] += 1
+            else:
+                changed.append(path)
+
+        if on_progress is not None:
+            on_progress(0, len(changed))
+        records = []  # Described documents not stored yet
+
+        def store_records():
+            # One short write transaction per batch, so the app's own writes never wait on a slow document
+            with self.connection:
+                for record in records:
+                    self._store(record, annotation_counts.get(record[0], {}))
+                    stats['updated' if record[0] in known else 'added'] += 1
+            records.clear()
+
+        executor = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = {executor.submit(describe_document, path, profile): path for path in changed}
+            for done, future in enumerate(as_completed(futures), 1):
+                try:
+                    records.append(future.result())
+                except Exception as e:
+                    print(f"Skipping {futures[future]}: {e}")
+                    stats['failed'] += 1
+                if done % CATALOG_COMMIT_DOCUMENTS == 0 or done == len(changed):
+                    store_records()
+                    if on_progress is not None:
+                        on_progress(done, len(changed))
+                if cancelled is not None and cancelled.is_set():
+                    stats['cancelled'] = True
+                    break
+            store_records()
+        finally:
+            executor.shutdown(cancel_futures=True)
+        return stats
+
+    def _store(self, record, annotation_counts):
+        path, mtime_ns, size, file_hash, dpi, color_mode, page_sizes = record
+        document_id = self.connection.execute(
+            """INSERT INTO documents (path, mtime_ns, size, content_hash, page_count, dpi, color_mode, added_at)
+               VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+               ON CONFLICT (path) DO UPDATE SET mtime_ns = excluded.mtime_ns, size = excluded.size,
+                   content_hash = excluded.content_hash, page_count = excluded.page_count, dpi = excluded.dpi,
+                   color_mode = excluded.color_mode
+               RETURNING id""",
+            (path, mtime_ns, size, file_hash, len(page_sizes), dpi, color_mode, time.time()),
+        ).fetchone()[0]
+        # Pages of a modified document keep their progress, pages it lost are dropped
+        self.connection.execute('DELETE FROM pages WHERE document_id = ? AND page_index >= ?', (document_id, len(page_sizes)))
+        self.connection.executemany(
+            """INSERT INTO pages (document_id, page_index, width, height, annotation_count, status)
+               VALUES (?, ?, ?, ?, ?, ?)
+               ON CONFLICT (document_id, page_index) DO UPDATE SET width = excluded.width, height = excluded.height""",
+            [(document_id, index, width, height, annotation_counts.get(index, 0),
+              LABELED if annotation_counts.get(index, 0) else UNLABELED)
+             for index, (width, height) in enumerate(page_sizes)],
+        )
+
+    def document(self, path):
+        """Return the catalog row of the document at path, or None."""
+        return self.connection.execute('SELECT * FROM documents WHERE path = ?', (os.path.abspath(path),)).fetchone()
+
+    def document_count(self):
+        return self.connection.execute('SELECT COUNT(*) FROM documents').fetchone()[0]
+
+    def remember_content_hashes(self, paths):
+        """Seed the content hash memo with the cataloged hashes of paths, for the files that did not change."""
+        for path in paths:
+            row = self.document(path)
+            if row is not None:
+                remember_content_hash(row['path'], row['mtime_ns'], row['size'], row['content_hash'])
+
+    # Pages
+
+    def query_pages(self, status=None, min_annotations=None, max_annotations=None, path_glob=None, after=None,
+                    limit=None):
+        """Return the rows of the pages matching the filters, in document and page order.
+
+        after=(document path, page index) starts the queue after that page.
+        Each row has path, page_index, width, height, dpi, content_hash,
+        annotation_count and status.
+        """
+        conditions = []
+        params = []
+        if status is not None:
+            conditions.append('p.status = ?')
+            params.append(status)
+        if min_annotations is not None:
+            conditions.append('p.annotation_count >= ?')
+            params.append(min_annotations)
+        if max_annotations is not None:
+            conditions.append('p.annotation_count <= ?')
+            params.append(max_annotations)
+        if path_glob is not None:
+            conditions.append('d.path GLOB ?')
+            params.append(path_glob)
+        if after is not None:
+            document = self.document(after[0])
+            if document is not None:
+                conditions.append('(p.document_id, p.page_index) > (?, ?)')
+                params.extend((document['id'], after[1]))
+        sql = PAGE_QUERY
+        if conditions:
+            sql += ' WHERE ' + ' AND '.join(conditions)
+        sql += ' ORDER BY p.document_id, p.page_index'
+        if limit is not None:
+            sql += ' LIMIT ?'
+            params.append(limit)
+        return self.connection.execute(sql, params).fetchall()
+
+    def next_page(self, after=None, wrap=True, **filters):
+        """Return the row of the first page matching the filters after the page after, or None.
+
+        With wrap, the queue continues from the first page when nothing matches after it.
+        """
+        rows = self.query_pages(after=after, limit=1, **filters)
+        if not rows and wrap and after is not None:
+            rows = self.query_pages(limit=1, **filters)
+        return rows[0] if rows else None
+
+    def record_annotations(self, path, page_index, annotation_count):
+        """Store the annotation count of a page, moving it between unlabeled and labeled."""
+        with self.connection:
+            self.connection.execute(
+                """UPDATE pages SET annotation_count = :count, updated_at = :now,
+                       status = CASE WHEN status IN (:unlabeled, :labeled)
+                                     THEN CASE WHEN :count > 0 THEN :labeled ELSE :unlabeled END
+                                     ELSE status END
+                   WHERE document_id = (SELECT id FROM documents WHERE path = :path) AND page_index = :page""",
+                {'count': annotation_count, 'now': time.time(), 'unlabeled': UNLABELED, 'labeled': LABELED,
+                 'path': os.path.abspath(path), 'page': page_index},
+            )
+
+    def set_status(self, path, page_index, status):
+        """Set the status of a page, e.g. SKIPPED or REVIEWED."""
+        if status not in PAGE_STATUSES:
+            raise ValueError(f'Unknown page status {status!r}, expected one of {", ".join(PAGE_STATUSES)}')
+        with self.connection:
+            self.connection.execute(
+                """UPDATE pages SET status = ?, updated_at = ?
+                   WHERE document_id = (SELECT id FROM documents WHERE path = ?) AND page_index = ?""",
+                (status, time.time(), os.path.abspath(path), page_index),
+            )
+
+    def status_counts(self):
+        """Return {status: number of pages} over the workspace."""
+        counts = dict.fromkeys(PAGE_STATUSES, 0)
+        counts.update(self.connection.execute('SELECT status, COUNT(*) FROM pages GROUP BY status').fetchall())
+        return counts
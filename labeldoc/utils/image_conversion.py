@@ -1,21 +1,65 @@
 # app/utils/image_conversion.py
 
 from PyQt6.QtGui import QImage
-from PIL import Image
 
-def pil_to_qimage(pil_image):
-    """Convert PIL Image to QImage."""
-    if pil_image.mode == "RGB":
-        r, g, b = pil_image.split()
-        pil_image = Image.merge("RGB", (b, g, r))
-        image = pil_image.convert("RGBA")
-    elif pil_image.mode == "L":
-        image = pil_image.convert("RGBA")
-    elif pil_image.mode == "P":
-        image = pil_image.convert("RGBA")
-    else:
-        image = pil_image
-
-    data = image.tobytes("raw", "BGRA")
-    qimage = QImage(data, image.width, image.height, QImage.Format.Format_ARGB32)
+from .instrumentation import timed
+
+# PIL modes that map directly onto a QImage format, with no pixel conversion
+NATIVE_FORMATS = {
+    "1": QImage.Format.Format_Mono,
+    "L": QImage.Format.Format_Grayscale8,
+    "P": QImage.Format.Format_Indexed8,
+    "RGB": QImage.Format.Format_RGB888,
+    "RGBA": QImage.Format.Format_RGBA8888,
+    "RGBX": QImage.Format.Format_RGBX8888,
+}
+
+# PIL packs bilevel rows most significant bit first, with 1 as white
+MONO_COLOR_TABLE = [0xff000000, 0xffffffff]
+
+
+def palette_color_table(palette):
+    """Return a flat RGB palette as a QImage color table."""
+    return [0xff000000 | (palette[i] << 16) | (palette[i + 1] << 8) | palette[i + 2]
+            for i in range(0, len(palette) - 2, 3)]
+
+
+def wrap_pixels(data, mode, size, bytes_per_line, palette=None):
+    """Return a QImage over the raw rows in data, without copying. data is kept alive by the QImage."""
+    width, height = size
+    qimage = QImage(data, width, height, bytes_per_line, NATIVE_FORMATS[mode])
+    if mode == "1":
+        qimage.setColorTable(MONO_COLOR_TABLE)
+    elif mode == "P":
+        qimage.setColorTable(palette_color_table(palette or []))
+    qimage.buffer = data
     return qimage
+
+
+@timed('convert.pil_to_qimage')
+def pil_to_qimage(pil_image):
+    """Convert PIL Image to QImage.
+
+    The pixel data is exported once into a buffer that the QImage wraps without
+    copying. The buffer is attached to the QImage so it lives as long as the image.
+    Bilevel, grayscale and palette images keep their compact format; other modes,
+    and palette images with transparency, are expanded to RGBA.
+    """
+    if pil_image.mode not in NATIVE_FORMATS or (pil_image.mode == "P" and "transparency" in pil_image.info):
+        pil_image = pil_image.convert("RGBA")
+
+    data = pil_image.tobytes()
+    bytes_per_line = len(data) // pil_image.height if pil_image.height else 0
+    return wrap_pixels(data, pil_image.mode, pil_image.size, bytes_per_line, pil_image.getpalette())
+
+
+@timed('convert.mapped_to_qimage')
+def mapped_page_to_qimage(page):
+    """Return a QImage over the pixel rows of a MappedPage, sharing the mapping.
+
+    The rows are stored stride-aligned in the formats of NATIVE_FORMATS, so
+    no pixel is read or copied here; the OS pages them in as Qt draws them.
+    """
+    if page.mode not in NATIVE_FORMATS:
+        return pil_to_qimage(page.to_image())
+    return wrap_pixels(page.pixels, page.mode, page.size, page.stride, page.palette)
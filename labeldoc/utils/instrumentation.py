@@ -0,0 +1,154 @@
+# app/utils/instrumentation.py
+"""Named timers and counters around the hot paths, off by default.
+
+When instrumentation is disabled, timed() functions cost one flag check
+and timer() returns a shared no-op context manager. When enabled, each
+timing updates per-name statistics and is kept in a bounded trace that can
+be dumped as JSON or as a Chrome trace (chrome://tracing, Perfetto).
+"""
+
+import json
+import os
+import threading
+import time
+from collections import deque
+from functools import wraps
+
+from ..config.settings import INSTRUMENTATION_ENABLED, INSTRUMENTATION_TRACE_SIZE
+
+_enabled = INSTRUMENTATION_ENABLED
+_lock = threading.Lock()
+_timers = {}  # Name -> [calls, total seconds, max seconds, last seconds]
+_counters = {}  # Name -> count
+_trace = deque(maxlen=INSTRUMENTATION_TRACE_SIZE)  # (name, start, duration, thread id)
+_origin = time.perf_counter()
+
+
+def enable(enabled=True):
+    global _enabled
+    _enabled = enabled
+
+
+def is_enabled():
+    return _enabled
+
+
+def reset():
+    with _lock:
+        _timers.clear()
+        _counters.clear()
+        _trace.clear()
+
+
+def _record(name, start, end):
+    duration = end - start
+    with _lock:
+        stats = _timers.get(name)
+        if stats is None:
+            _timers[name] = [1, duration, duration, duration]
+        else:
+            stats[0] += 1
+            stats[1] += duration
+            stats[2] = max(stats[2], duration)
+            stats[3] = duration
+        _trace.append((name, start, duration, threading.get_ident()))
+
+
+class _Timer:
+    __slots__ = ('name', 'start')
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        _record(self.name, self.start, time.perf_counter())
+        return False
+
+
+class _NullTimer:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+
+_NULL_TIMER = _NullTimer()
+
+
+def timer(name):
+    """Return a context manager timing its block under name."""
+    return _Timer(name) if _enabled else _NULL_TIMER
+
+
+def timed(name):
+    """Decorator timing every call of the function under name."""
+    def decorator(function):
+        @wraps(function)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return function(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                _record(name, start, time.perf_counter())
+        return wrapper
+    return decorator
+
+
+def count(name, amount=1):
+    """Add amount to the counter name."""
+    if _enabled:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + amount
+
+
+def snapshot():
+    """Return {'timers': {name: statistics in ms}, 'counters': {name: count}}."""
+    with _lock:
+        timers = {
+            name: {'calls': calls, 'total_ms': total * 1000, 'mean_ms': total * 1000 / calls,
+                   'max_ms': longest * 1000, 'last_ms': last * 1000}
+            for name, (calls, total, longest, last) in sorted(_timers.items())
+        }
+        return {'timers': timers, 'counters': dict(sorted(_counters.items()))}
+
+
+def format_summary():
+    """Return the timers and counters as lines of text, for display."""
+    data = snapshot()
+    lines = [f"{name}: {stats['calls']}x, mean {stats['mean_ms']:.1f} ms, last {stats['last_ms']:.1f} ms"
+             for name, stats in data['timers'].items()]
+    lines.extend(f"{name}: {value}" for name, value in data['counters'].items())
+    return '\n'.join(lines)
+
+
+def chrome_trace():
+    """Return the recorded timings in the Chrome trace event format."""
+    pid = os.getpid()
+    with _lock:
+        events = [
+            {'name': name, 'cat': name.split('.')[0], 'ph': 'X', 'pid': pid, 'tid': thread_id,
+             'ts': (start - _origin) * 1e6, 'dur': duration * 1e6}
+            for name, start, duration, thread_id in _trace
+        ]
+    return {'traceEvents': events, 'displayTimeUnit': 'ms'}
+
+
+def dump(directory='.'):
+    """Write the statistics and the Chrome trace to timestamped JSON files in directory, return their paths."""
+    stamp = time.strftime('%Y%m%d-%H%M%S')
+    stats_path = os.path.join(directory, f'labeldoc-timings-{stamp}.json')
+    trace_path = os.path.join(directory, f'labeldoc-trace-{stamp}.json')
+    with open(stats_path, 'w') as f:
+        json.dump(snapshot(), f, indent=2)
+    with open(trace_path, 'w') as f:
+        json.dump(chrome_trace(), f)
+    return stats_path, trace_path
@@ -0,0 +1,100 @@
+# app/utils/spatial_index.py
+
+import itertools
+from collections import defaultdict
+
+from ..config.settings import GRID_CELL_SIZE
+
+
+class GridIndex:
+    """Uniform grid spatial index over axis-aligned boxes (x0, y0, x1, y1).
+
+    Each item is registered in every cell its box overlaps, so point and
+    rectangle queries only look at the items in the touched cells. Query
+    results are returned in insertion order, which is also the drawing order.
+    """
+
+    def __init__(self, cell_size=GRID_CELL_SIZE):
+        self.cell_size = cell_size
+        self._cells = defaultdict(set)  # (col, row) -> item ids
+        self._items = {}  # item id -> (order, item, box), in insertion order
+        self._order = itertools.count()
+
+    def __len__(self):
+        return len(self._items)
+
+    def __contains__(self, item):
+        return id(item) in self._items
+
+    def __iter__(self):
+        return (item for _, item, _ in self._items.values())
+
+    @staticmethod
+    def _normalized(box):
+        x0, y0, x1, y1 = box
+        return (min(x0, x1), min(y0, y1), max(x0, x1), max(y0, y1))
+
+    def _cell_range(self, box):
+        x0, y0, x1, y1 = box
+        size = self.cell_size
+        for col in range(int(x0 // size), int(x1 // size) + 1):
+            for row in range(int(y0 // size), int(y1 // size) + 1):
+                yield col, row
+
+    def insert(self, item, box):
+        """Add item covering box, replacing its previous box if already indexed."""
+        self.remove(item)
+        box = self._normalized(box)
+        self._items[id(item)] = (next(self._order), item, box)
+        for cell in self._cell_range(box):
+            self._cells[cell].add(id(item))
+
+    def remove(self, item):
+        entry = self._items.pop(id(item), None)
+        if entry is None:
+            return False
+        for cell in self._cell_range(entry[2]):
+            bucket = self._cells[cell]
+            bucket.discard(id(item))
+            if not bucket:
+                del self._cells[cell]
+        return True
+
+    def clear(self):
+        self._cells.clear()
+        self._items.clear()
+
+    def query_rect(self, box):
+        """Return the items whose box intersects box."""
+        box = self._normalized(box)
+        found = set()
+        col_count = int(box[2] // self.cell_size) - int(box[0] // self.cell_size) + 1
+        row_count = int(box[3] // self.cell_size) - int(box[1] // self.cell_size) + 1
+        if col_count * row_count > len(self._cells):
+            # The box covers more cells than are occupied, scan the occupied ones instead
+            cell_box = tuple(int(value // self.cell_size) for value in box)
+            for cell, bucket in self._cells.items():
+                if self._intersects((*cell, *cell), cell_box):
+                    found.update(bucket)
+        else:
+            for cell in self._cell_range(box):
+                found.update(self._cells.get(cell, ()))
+        return self._sorted_items(
+            item_id for item_id in found if self._intersects(self._items[item_id][2], box)
+        )
+
+    def query_point(self, x, y):
+        """Return the items whose box contains the point (x, y)."""
+        cell = (int(x // self.cell_size), int(y // self.cell_size))
+        return self._sorted_items(
+            item_id for item_id in self._cells.get(cell, ())
+            if self._intersects(self._items[item_id][2], (x, y, x, y))
+        )
+
+    def _sorted_items(self, item_ids):
+        entries = sorted(self._items[item_id] for item_id in item_ids)
+        return [item for _, item, _ in entries]
+
+    @staticmethod
+    def _intersects(a, b):
+        return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
@@ -0,0 +1,66 @@
+# app/utils/startup_profiler.py
+
+import sys
+import time
+from contextlib import contextmanager
+
+# Modules that are loaded on first use and should not appear at startup
+DEFERRED_MODULES = ('PyQt6.QtWebEngineWidgets', 'pdf2image', 'numpy')
+
+
+class StartupProfiler:
+    """Times the phases of application startup, up to the first paint of the main window.
+
+    Phases are recorded only when enabled, so the profiler can stay in the
+    startup code at no cost.
+    """
+
+    def __init__(self, enabled=False, start_time=None):
+        self.enabled = enabled
+        self.start_time = time.perf_counter() if start_time is None else start_time
+        self.phases = []  # (name, seconds)
+        self._last_time = self.start_time
+
+    @contextmanager
+    def phase(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if self.enabled:
+                end = time.perf_counter()
+                self.phases.append((name, end - start))
+                self._last_time = end
+
+    def mark(self, name):
+        """Record the time since the end of the previous phase as phase name."""
+        if self.enabled:
+            now = time.perf_counter()
+            self.phases.append((name, now - self._last_time))
+            self._last_time = now
+
+    def report(self):
+        total = self._last_time - self.start_time
+        lines = ['=== STARTUP PROFILE ===']
+        for name, seconds in self.phases:
+            lines.append(f"{name:<28} {seconds * 1000:8.1f} ms")
+        lines.append(f"{'Total to first paint':<28} {total * 1000:8.1f} ms")
+        loaded = [module for module in DEFERRED_MODULES if module in sys.modules]
+        lines.append(f"Deferred modules loaded:     {', '.join(loaded) if loaded else 'none'}")
+        return '\n'.join(lines)
+
+
+def on_first_paint(widget, callback):
+    """Call callback() once, right after widget is painted for the first time."""
+    from PyQt6.QtCore import QEvent, QObject, QTimer
+
+    class FirstPaintFilter(QObject):
+        def eventFilter(self, obj, event):
+            if event.type() == QEvent.Type.Paint:
+                widget.removeEventFilter(self)
+                QTimer.singleShot(0, callback)  # Once the paint event is handled
+            return False
+
+    event_filter = FirstPaintFilter(widget)
+    widget.installEventFilter(event_filter)
+    return event_filter
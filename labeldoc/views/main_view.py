@@ -1,11 +1,14 @@
 # app/views/main_view.py
 
+import os
 from PyQt6.QtCore import Qt
 from PyQt6.QtWidgets import QMainWindow, QDockWidget, QFileDialog, QWidget, QHBoxLayout
 
 from ..widgets.canvas import CanvasWidget
+from ..widgets.continuous_view import ContinuousView
 from ..widgets.results_widget import ResultsWidget
 from ..widgets.toolbar import ToolbarWidget
+from ..utils import instrumentation
 from ..controllers.app_controller import AppController
 
 class MainWindow(QMainWindow):
@@ -13,6 +16,8 @@ class MainWindow(QMainWindow):
     def __init__(self):
         super().__init__()
         self.controller: AppController = None
+        self.web_capture = None  # Capture of a web page in progress
+        self.workspace_page_shown = False  # Whether a page of the workspace being cataloged is open
         self.setWindowTitle("LabelDoc")
         self.setGeometry(100, 100, 1200, 800)
 
@@ -26,12 +31,17 @@ class MainWindow(QMainWindow):
         self.canvas = CanvasWidget(self)
         layout.addWidget(self.canvas)
 
+        # Continuous scroll of all pages, shown instead of the canvas when enabled
+        self.continuous_view = ContinuousView(self)
+        self.continuous_view.setVisible(False)
+        layout.addWidget(self.continuous_view)
+
         # Toolbar on the left
         self.toolbar = ToolbarWidget(self)
         self.addToolBar(Qt.ToolBarArea.LeftToolBarArea, self.toolbar)
 
         # Results widget on the right
-        self.results_widget = ResultsWidget()
+        self.results_widget = ResultsWidget(self.canvas.frame_pacer)
         results_dock = QDockWidget("Results", self)
         results_dock.setWidget(self.results_widget)
         results_dock.setAllowedAreas(Qt.DockWidgetArea.RightDockWidgetArea)
@@ -39,19 +49,79 @@ class MainWindow(QMainWindow):
 
         # Add status bar at the bottom
         self.statusBar().showMessage("Ready")
+        self.toolbar.timings_action.setChecked(instrumentation.is_enabled())
 
     def set_controller(self, controller):
         """Connect the main window to the app controller."""
         self.controller = controller
         self.toolbar.set_controller(controller)
 
+    def closeEvent(self, event):
+        """Save annotations before the window closes."""
+        if self.controller:
+            self.controller.shutdown()
+        super().closeEvent(event)
+
     def open_file_dialog(self):
         """Open a file dialog to select a document and load it."""
-        file_name, _ = QFileDialog.getOpenFileName(self, "Open Document", "", "Images (*.png *.xpm *.jpg *.bmp);;All Files (*)")
+        file_name, _ = QFileDialog.getOpenFileName(self, "Open Document", "", "Documents (*.pdf *.png);;All Files (*)")
         if file_name:
             self.controller.load_document(file_name)
             self.statusBar().showMessage(f"Loaded: {file_name}")
 
+    def open_workspace_dialog(self):
+        """Select a directory of documents and open it as a workspace."""
+        directory = QFileDialog.getExistingDirectory(self, "Open Workspace")
+        if directory:
+            self.open_workspace(directory)
+
+    def open_workspace(self, directory):
+        """Open directory as a workspace at its first unlabeled page, cataloging new documents in the background."""
+        indexer = self.controller.open_workspace(directory)
+        indexer.progress.connect(self.show_workspace_progress)
+        indexer.finished.connect(self.workspace_cataloged)
+        indexer.failed.connect(self.show_workspace_error)
+        self.statusBar().showMessage(f"Cataloging {directory}...")
+        self.workspace_page_shown = self.controller.next_unlabeled_page() is not None
+        indexer.start()
+
+    def show_workspace_progress(self, done, total):
+        if self.sender() is not self.controller.workspace_indexer:
+            return
+        if not self.workspace_page_shown and done:
+            # A new workspace has no pages until its first documents are cataloged
+            self.workspace_page_shown = self.controller.next_unlabeled_page() is not None
+        self.statusBar().showMessage(f"Cataloging workspace: {done} of {total} new or modified documents")
+
+    def workspace_cataloged(self, stats):
+        if self.sender() is not self.controller.workspace_indexer:
+            return
+        print(f"Workspace {self.sender().directory}: {stats['added']} documents added, {stats['updated']} updated, "
+              f"{stats['unchanged']} unchanged, {stats['failed']} skipped")
+        if stats['cancelled']:
+            return
+        if not self.workspace_page_shown:
+            self.workspace_page_shown = self.controller.next_unlabeled_page() is not None
+        counts = self.controller.model.catalog.status_counts()
+        self.statusBar().showMessage(f"Workspace cataloged - {counts['unlabeled']} of {sum(counts.values())} pages unlabeled")
+
+    def show_workspace_error(self, message):
+        if self.sender() is self.controller.workspace_indexer:
+            print(f"Failed to catalog the workspace: {message}")
+            self.statusBar().showMessage("Failed to catalog the workspace.")
+
+    def next_unlabeled_page(self):
+        """Go to the next page of the workspace without annotations."""
+        row = self.controller.next_unlabeled_page()
+        counts = self.controller.model.catalog.status_counts() if self.controller.model.catalog else None
+        if counts is None:
+            self.statusBar().showMessage("No workspace is open.")
+        elif row is None:
+            self.statusBar().showMessage(f"All {sum(counts.values())} pages of the workspace are labeled.")
+        else:
+            self.statusBar().showMessage(f"{os.path.basename(row['path'])}, page {row['page_index'] + 1} - "
+                                         f"{counts['unlabeled']} of {sum(counts.values())} pages unlabeled")
+
     def save_annotations(self):
         """Save annotations and update the status bar."""
         self.controller.save_annotations()
@@ -77,23 +147,80 @@ class MainWindow(QMainWindow):
         self.controller.last_page()
         self.statusBar().showMessage(f"Page {self.controller.model.current_page_index + 1} of {len(self.controller.model.pages)}")
 
-    def load_page(self, image_path, shapes):
-        """Load the image and annotations into the canvas."""
-        self.canvas.load_image(image_path)
+    def load_page(self, image, shapes, page_key=None, region_renderer=None):
+        """Load the image (PIL or QImage) and annotations into the canvas."""
+        self.canvas.load_image(image, page_key, region_renderer)
         self.canvas.load_shapes(shapes)
 
+    def show_continuous(self, enabled):
+        """Switch between the single-page canvas and the continuous scroll of all pages."""
+        self.canvas.setVisible(not enabled)
+        self.continuous_view.setVisible(enabled)
+        self.toolbar.continuous_action.setChecked(enabled)
+
+    def show_continuous_page(self, pages, annotations, index, prefetcher):
+        """Show the document in the continuous view, scrolled to page index."""
+        if self.continuous_view.pages is not pages:
+            self.continuous_view.set_document(pages, annotations, prefetcher)
+        self.continuous_view.annotations = annotations
+        self.continuous_view.scroll_to_page(index)
+
     def get_current_shapes(self):
         """Return the current shapes from the canvas."""
         return self.canvas.shapes
     
     def load_current_browser_page(self):
-        """Print the current web page in the active browser tab to a PDF, convert it to PIL images, and load them into the canvas."""
+        """Capture the current web page in the active browser tab and stream its pages into the canvas."""
         if hasattr(self.controller, 'browser_window'):
             browser = self.controller.browser_window
             current_tab = browser.tabs.currentWidget()
             if current_tab:
-                try:
-                    pil_images = current_tab.generate_pil_images_from_webpage()
-                    self.controller.load_images(pil_images)  # Assuming you have a method to handle a list of PIL images
-                except RuntimeError as e:
-                    print(f"Failed to load browser page: {e}")
+                if self.web_capture is not None:
+                    self.web_capture.cancel()  # Replaced by the new capture, not reported as cancelled
+                    self.web_capture = None
+                self.controller.begin_streamed_images()
+                self.web_capture = current_tab.capture_pages()
+                self.web_capture.page_ready.connect(self.add_captured_page)
+                self.web_capture.progress.connect(self.show_capture_progress)
+                self.web_capture.finished.connect(self.capture_finished)
+                self.web_capture.failed.connect(self.show_capture_error)
+                self.statusBar().showMessage("Capturing web page...")
+
+    def cancel_browser_capture(self):
+        """Stop streaming the pages of the web page being captured."""
+        if self.web_capture is not None:
+            self.web_capture.cancel()
+            self.web_capture = None
+            self.statusBar().showMessage("Web page capture cancelled.")
+
+    def add_captured_page(self, index, image):
+        # Pages of a cancelled capture may still be queued, ignore them
+        if self.sender() is self.web_capture:
+            self.controller.add_streamed_image(index, image)
+
+    def show_capture_progress(self, done, total):
+        if self.sender() is self.web_capture:
+            self.statusBar().showMessage(f"Capturing web page: {done} of {total} pages")
+
+    def capture_finished(self):
+        if self.sender() is self.web_capture:
+            self.web_capture = None
+            self.statusBar().showMessage("Web page loaded.")
+
+    def show_capture_error(self, message):
+        if self.sender() is self.web_capture:
+            self.web_capture = None
+        print(f"Failed to load browser page: {message}")
+        self.statusBar().showMessage("Failed to load browser page.")
+
+    def set_timings_enabled(self, enabled):
+        """Turn the hot-path instrumentation on or off, showing its timings live in the results dock."""
+        instrumentation.enable(enabled)
+        self.results_widget.show_timings(enabled)
+        self.toolbar.timings_action.setChecked(enabled)
+
+    def dump_timings(self):
+        """Write the recorded timings as JSON and as a Chrome trace to the working directory."""
+        stats_path, trace_path = instrumentation.dump()
+        print(f"Timings written to {stats_path} and {trace_path}")
+        self.statusBar().showMessage(f"Timings written to {stats_path} and {trace_path}")
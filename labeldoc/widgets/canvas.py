@@ -1,42 +1,98 @@
 # app/widgets/canvas.py
 
 from PyQt6.QtWidgets import QWidget, QSizePolicy
-from PyQt6.QtGui import QPainter, QImage, QColor, QTransform
-from PyQt6.QtCore import Qt, QPoint, QRect, QSize
+from PyQt6.QtGui import QPainter, QImage, QColor, QPen, QTransform
+from PyQt6.QtCore import Qt, QPoint, QPointF, QRect, QRectF, QSize, pyqtSignal
+from concurrent.futures import ThreadPoolExecutor
+from ..config.settings import QIMAGE_CACHE_BUDGET_BYTES, WORD_SHAPE_LABEL
+from ..models.page_cache import PageCache
+from ..models.shape import Shape
 from ..utils.image_conversion import pil_to_qimage
+from ..utils.instrumentation import count, timed
+from ..utils.spatial_index import GridIndex
+from .detail_layer import DetailLayer
+from .frame_pacer import FramePacer
+from .tile_pyramid import TilePyramid
 from ..actions import ActionManager, ZoomAction, DrawShapeAction, InitialZoomAction, PanAction
 
 class CanvasWidget(QWidget):
+    """Displays a page image and its shapes.
+
+    Shapes are drawn with shape.draw(painter) in page image coordinates and
+    must provide shape.bounding_box() -> (x0, y0, x1, y1) for the spatial index.
+    """
+    pyramid_ready = pyqtSignal(object)  # Emitted from the worker thread when a TilePyramid is built
+    text_index_ready = pyqtSignal(object, object)  # Page key and PageTextIndex, emitted from the text layer worker
 
     def __init__(self, parent=None):
         super().__init__(parent)
         self.image: QImage = None
-        self.shapes: list = []
+        self.page_key = None  # Cache key of the page on display
+        self.pyramid: TilePyramid = None
+        self.pyramid_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='labeldoc-pyramid')
+        self.pyramid_ready.connect(self.set_pyramid)
+        self.shape_index = GridIndex()  # Shapes on the current page, in drawing order
+        self.text_index = None  # PageTextIndex of the words of the current page, once extracted
+        self.text_index_ready.connect(self.set_text_index)
         self.zoom_level = 1.0  # Initial zoom level
         self.min_zoom_level = 0.009  # Reduced minimum zoom size by 10%
         self.max_zoom_level = 10.0
         self.offset = QPoint(0, 0)  # Offset for panning
         self.last_pos = QPoint(0, 0)  # Last mouse position
+        self.selection = None  # (start, end) image points of a Shift-drag box being drawn
         self.action_manager = ActionManager()
+        self.frame_pacer = FramePacer(self)  # Applies pan and zoom input once per frame
+        self.detail_layer = DetailLayer(self)  # Sharp re-render of the visible region when zoomed in
+        self.qimage_cache = PageCache(QIMAGE_CACHE_BUDGET_BYTES, sizeof=lambda qimage: qimage.sizeInBytes())
 
         # Set the canvas to expand and shrink dynamically
         self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Expanding)
     
     # Basic Canvas functionality
 
+    @property
+    def shapes(self):
+        return list(self.shape_index)
+
     def add_shape(self, shape):
-        self.shapes.append(shape)
+        self.shape_index.insert(shape, shape.bounding_box())
         self.update()
 
     def remove_shape(self, shape):
-        if shape in self.shapes:
-            self.shapes.remove(shape)
+        if self.shape_index.remove(shape):
             self.update()
+
+    def shapes_at(self, x, y):
+        """Return the shapes whose bounding box contains the image point (x, y), topmost last."""
+        return self.shape_index.query_point(x, y)
+
+    def shapes_in_rect(self, box):
+        """Return the shapes whose bounding box intersects box in image coordinates."""
+        return self.shape_index.query_rect(box)
+
+    def set_text_index(self, page_key, text_index):
+        # Ignore the words of pages that were replaced while they were being extracted
+        if page_key == self.page_key:
+            self.text_index = text_index
+
+    def word_box_at(self, x, y):
+        """Return the box of the text layer word under the image point (x, y), or None."""
+        word = self.text_index.word_at(x, y) if self.text_index else None
+        return self.text_index.word_box(word) if word is not None else None
+
+    def image_point(self, position):
+        """Return the image point (x, y) under a widget position."""
+        return (position.x() / self.zoom_level - self.offset.x(), position.y() / self.zoom_level - self.offset.y())
+
+    def snap_box_to_words(self, box):
+        """Return the box enclosing the text layer words that box touches, or None if there are none."""
+        return self.text_index.box_from_selection(box) if self.text_index else None
     
     def pan(self, pan_amount):
         new_offset = self.offset + pan_amount
         bounded_offset = self.bound_offset(new_offset)
         self.offset = bounded_offset
+        self.detail_layer.view_changed()
         self.update()
 
     def bound_offset(self, offset):
@@ -65,17 +121,71 @@ class CanvasWidget(QWidget):
 
     def set_zoom_level(self, zoom_level):
         self.zoom_level = max(self.min_zoom_level, min(self.max_zoom_level, zoom_level))
+        self.detail_layer.view_changed()
         self.update()
 
-    def load_image(self, pil_image):
-        """Convert PIL Image to QImage and store it."""
-        if pil_image:
-            self.image = pil_to_qimage(pil_image)
+    @timed('canvas.load_image')
+    def load_image(self, image, page_key=None, region_renderer=None):
+        """Store the page image, converting a PIL Image to QImage if needed.
+
+        Converted images are cached under page_key, so revisiting a page skips the conversion.
+        region_renderer(scale, box) re-rasterizes part of the page for deep zoom, see DetailLayer.
+        """
+        self.detail_layer.reset(region_renderer if image else None)
+        self.text_index = None
+        self.selection = None
+        if image:
+            if not isinstance(image, QImage):
+                cached = self.qimage_cache.get(page_key) if page_key is not None else None
+                image = cached if cached is not None else pil_to_qimage(image)
+            if page_key is not None and page_key not in self.qimage_cache:
+                self.qimage_cache.put(page_key, image)
+            self.image = image
+            self.page_key = page_key
+            self.build_pyramid()
             self.perform_initial_zoom()
             self.update_aspect_ratio()
+        else:
+            # A document without pages, e.g. a web page capture before its first page arrives
+            self.image = None
+            self.page_key = None
+            self.pyramid = None
+            self.update()
+
+    def memory_usage(self):
+        """Return the bytes held by the page on display, beyond the QImage cache: {representation: bytes}."""
+        image = self.image
+        if image is None:
+            return {}
+        pyramid = self.pyramid
+        detail = self.detail_layer.image
+        return {
+            # The page image is usually the cached QImage itself, accounted for by the cache
+            'image': 0 if self.page_key in self.qimage_cache else image.sizeInBytes(),
+            'pyramid': sum(level.sizeInBytes() for level in pyramid.levels[1:]) if pyramid else 0,
+            'detail': detail.sizeInBytes() if detail is not None else 0,
+        }
+
+    def build_pyramid(self):
+        """Build the tile pyramid of the current image in the background."""
+        self.pyramid = None
+        future = self.pyramid_executor.submit(TilePyramid, self.image)
+        future.add_done_callback(self._on_pyramid_built)
+
+    def _on_pyramid_built(self, future):
+        if not future.cancelled() and future.exception() is None:
+            self.pyramid_ready.emit(future.result())
+
+    def set_pyramid(self, pyramid):
+        # Ignore pyramids of pages that were replaced while they were being built
+        if pyramid.image is self.image:
+            self.pyramid = pyramid
+            self.update()
 
     def load_shapes(self, shapes):
-        self.shapes = shapes
+        self.shape_index.clear()
+        for shape in shapes:
+            self.shape_index.insert(shape, shape.bounding_box())
         self.update()
 
     def update_aspect_ratio(self):
@@ -113,6 +223,9 @@ class CanvasWidget(QWidget):
         old_zoom_level = self.zoom_level
         self.action_manager.do_action(ZoomAction(self, old_zoom_level, new_zoom_level))
     
+    def perform_draw_shape(self, shape, snap_to_words=False):
+        self.action_manager.do_action(DrawShapeAction(self, shape, snap_to_words))
+
     def perform_initial_zoom(self):
         action = InitialZoomAction(self)
         self.action_manager.do_action(action)
@@ -146,12 +259,23 @@ class CanvasWidget(QWidget):
     
     # Other helper functions
 
+    def image_rect(self):
+        """Return the bounds of the page image, in image coordinates."""
+        return QRectF(0, 0, self.image.width(), self.image.height()) if self.image else QRectF()
+
+    def visible_image_rect(self):
+        """Return the part of the page image that is in view, in image coordinates."""
+        rect = self.rect()
+        return QRectF(rect.x() / self.zoom_level - self.offset.x(), rect.y() / self.zoom_level - self.offset.y(),
+                      rect.width() / self.zoom_level, rect.height() / self.zoom_level)
+
     def update_canvas(self):
         """Update the canvas size based on the current zoom level."""
         self.update()
     
     # Handle events
 
+    @timed('canvas.paint')
     def paintEvent(self, event):
         painter = QPainter(self)
 
@@ -170,21 +294,39 @@ class CanvasWidget(QWidget):
 
             # Apply the transformation and draw the image
             painter.setTransform(transform)
-            painter.drawImage(QPoint(x, y), self.image)
-
-        if self.shapes:
-            for shape in self.shapes:
+            if self.pyramid:
+                # Only draw the tiles in view, at the level nearest the zoom level
+                self.pyramid.draw(painter, self.zoom_level, self.visible_image_rect(), QPointF(x, y))
+            else:
+                painter.drawImage(QPoint(x, y), self.image)
+            self.detail_layer.draw(painter, QPointF(x, y))
+
+        if self.image and self.shape_index:
+            # Draw only the shapes in view, in image coordinates like the page
+            painter.translate(self.offset.x(), self.offset.y())
+            visible_rect = self.visible_image_rect()
+            visible_shapes = self.shape_index.query_rect((visible_rect.left(), visible_rect.top(), visible_rect.right(), visible_rect.bottom()))
+            for shape in visible_shapes:
                 shape.draw(painter)
+            count('canvas.shapes_drawn', len(visible_shapes))
+
+        if self.image and self.selection:
+            (x0, y0), (x1, y1) = self.selection
+            painter.setTransform(QTransform().scale(self.zoom_level, self.zoom_level).translate(self.offset.x(), self.offset.y()))
+            pen = QPen(QColor(0, 120, 215), 0, Qt.PenStyle.DashLine)  # Cosmetic, one pixel wide at any zoom
+            painter.setPen(pen)
+            painter.setBrush(Qt.BrushStyle.NoBrush)
+            painter.drawRect(QRectF(min(x0, x1), min(y0, y1), abs(x1 - x0), abs(y1 - y0)))
+
+        self.frame_pacer.frame_painted()
 
     def handle_zoom_event_from_scroll(self, event):
         """Adjust the zoom level based on the mouse wheel."""
         zoom_factor = 1.1
         if event.angleDelta().y() > 0:
-            new_zoom_level = self.zoom_level * zoom_factor
+            self.frame_pacer.add_zoom(zoom_factor)
         else:
-            new_zoom_level = self.zoom_level / zoom_factor
-        
-        self.perform_zoom(new_zoom_level)
+            self.frame_pacer.add_zoom(1 / zoom_factor)
 
     def wheelEvent(self, event):
         """Handle zooming when Ctrl is held, and panning otherwise."""
@@ -194,23 +336,47 @@ class CanvasWidget(QWidget):
             # Use panning based on the scroll wheel movement for horizontal/vertical scrolls
             delta_x = -event.angleDelta().x()
             delta_y = -event.angleDelta().y()
-            self.perform_pan(self.offset, self.offset + QPoint(delta_x, delta_y))
+            self.frame_pacer.add_pan(QPoint(delta_x, delta_y))
 
     def resizeEvent(self, event):
         """Handle resizing of the widget to update the zoom and layout accordingly."""
         self.update_min_zoom_level()
         self.update_aspect_ratio()  # Update aspect ratio on resize
         self.offset = self.bound_offset(self.offset)  # Adjust the offset based on new bounds
+        self.detail_layer.view_changed()
         self.update()
     
     def mousePressEvent(self, event):
-        """Handle mouse press for panning."""
+        """Handle mouse press for panning, or for drawing a box when Shift is held."""
         if event.button() == Qt.MouseButton.LeftButton:
+            if event.modifiers() == Qt.KeyboardModifier.ShiftModifier and self.image:
+                start = self.image_point(event.position())
+                self.selection = (start, start)
             self.last_pos = event.pos()
 
+    def mouseDoubleClickEvent(self, event):
+        """Draw a box around the text layer word under the cursor."""
+        if event.button() == Qt.MouseButton.LeftButton and self.image:
+            box = self.word_box_at(*self.image_point(event.position()))
+            if box is not None:
+                self.perform_draw_shape(Shape(WORD_SHAPE_LABEL, [box[:2], box[2:]]))
+
+    def mouseReleaseEvent(self, event):
+        """Draw the Shift-drag box, fitted to the text layer words it touches, if any."""
+        if event.button() == Qt.MouseButton.LeftButton and self.selection is not None:
+            (x0, y0), (x1, y1) = self.selection
+            self.selection = None
+            if x0 != x1 and y0 != y1:
+                shape = Shape(WORD_SHAPE_LABEL, [(min(x0, x1), min(y0, y1)), (max(x0, x1), max(y0, y1))])
+                self.perform_draw_shape(shape, snap_to_words=True)
+            self.update()
+
     def mouseMoveEvent(self, event):
-        """Handle mouse movement for panning."""
-        if event.buttons() & Qt.MouseButton.LeftButton:
+        """Handle mouse movement for panning, or for drawing a box when Shift is held."""
+        if self.selection is not None:
+            self.selection = (self.selection[0], self.image_point(event.position()))
+            self.update()
+        elif event.buttons() & Qt.MouseButton.LeftButton:
             current_pos = event.pos()
-            self.perform_pan(self.last_pos, current_pos)
+            self.frame_pacer.add_pan(current_pos - self.last_pos)
             self.last_pos = current_pos
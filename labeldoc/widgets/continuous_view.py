@@ -0,0 +1,184 @@
+# app/widgets/continuous_view.py
+
+from bisect import bisect_right
+from itertools import accumulate
+
+from PyQt6.QtCore import Qt, QRectF, QTimer, pyqtSignal
+from PyQt6.QtGui import QColor, QPainter
+from PyQt6.QtWidgets import QAbstractScrollArea
+
+from ..config.settings import CONTINUOUS_PAGE_SPACING, CONTINUOUS_PRELOAD_PAGES
+from ..utils.instrumentation import timed
+
+
+class ContinuousView(QAbstractScrollArea):
+    """All pages of a document in one vertical scroll, virtualized.
+
+    The layout is computed from page sizes in the document metadata, so no
+    page is rasterized to be placed; a page that renders at another size is
+    placed again at its rendered size. Only the pages in view, plus
+    CONTINUOUS_PRELOAD_PAGES on each side, are rendered by the prefetcher
+    into the QImage cache; pages without a cached image are drawn as
+    placeholders. Memory is bounded by the caches, whatever the page count.
+    """
+
+    pages_ready = pyqtSignal()  # Emitted from prefetch workers
+    current_page_changed = pyqtSignal(int)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.pages = None
+        self.annotations = {}  # Shapes by page index
+        self.prefetcher = None
+        self.zoom_factor = 1.0  # Page width relative to the viewport width
+        self.min_zoom_factor = 0.25
+        self.max_zoom_factor = 4.0
+        self.current_page = 0  # Page at the top of the view
+        self._in_relayout = False
+        self._page_sizes = []  # (width, height) in page pixels
+        self._tops = []  # Top of each page in view pixels
+        self._heights = []
+        self._page_width = 1  # Width of every page in view pixels
+        self.pages_ready.connect(self.viewport().update)
+        self.verticalScrollBar().valueChanged.connect(self._update_current_page)
+
+    def set_document(self, pages, annotations, prefetcher):
+        self.pages = pages
+        self.annotations = annotations
+        self.prefetcher = prefetcher
+        self.refresh()
+
+    def refresh(self):
+        """Reread the page sizes, e.g. after pages were appended."""
+        self._page_sizes = [self.pages.page_size(index) for index in range(len(self.pages))] if self.pages else []
+        self.relayout()
+
+    def relayout(self):
+        """Place the pages for the current viewport width and zoom, keeping the current page in view."""
+        anchor_page = self.current_page
+        anchor_offset = self._anchor_offset()
+        self._in_relayout = True  # Scroll bar changes below must not move the current page
+        viewport = self.viewport()
+        self._page_width = max(1, int((viewport.width() - 2 * CONTINUOUS_PAGE_SPACING) * self.zoom_factor))
+        self._heights = [max(1, round(height * self._page_width / width)) for width, height in self._page_sizes]
+        self._tops = list(accumulate((height + CONTINUOUS_PAGE_SPACING for height in self._heights[:-1]),
+                                     initial=CONTINUOUS_PAGE_SPACING))[:len(self._heights)]
+        total_height = self._tops[-1] + self._heights[-1] + CONTINUOUS_PAGE_SPACING if self._heights else 0
+        total_width = self._page_width + 2 * CONTINUOUS_PAGE_SPACING
+
+        vertical = self.verticalScrollBar()
+        vertical.setPageStep(viewport.height())
+        vertical.setSingleStep(max(20, viewport.height() // 20))
+        vertical.setRange(0, max(0, total_height - viewport.height()))
+        horizontal = self.horizontalScrollBar()
+        horizontal.setPageStep(viewport.width())
+        horizontal.setRange(0, max(0, total_width - viewport.width()))
+        if self._heights:
+            anchor_page = min(anchor_page, len(self._heights) - 1)
+            vertical.setValue(self._tops[anchor_page] + round(anchor_offset * self._heights[anchor_page]))
+        self._in_relayout = False
+        self._update_current_page()
+        self.request_pages()
+        viewport.update()
+
+    def _anchor_offset(self):
+        """Fraction of the current page above the viewport top, kept across relayouts."""
+        if not self._heights or self.current_page >= len(self._heights):
+            return 0.0
+        return (self.verticalScrollBar().value() - self._tops[self.current_page]) / self._heights[self.current_page]
+
+    def visible_pages(self):
+        """Return the range of page indices in view."""
+        if not self._tops:
+            return range(0)
+        top = self.verticalScrollBar().value()
+        first = max(0, bisect_right(self._tops, top) - 1)
+        last = max(0, bisect_right(self._tops, top + self.viewport().height()) - 1)
+        return range(first, min(len(self._tops), last + 1))
+
+    def page_rect(self, index):
+        """Rectangle of page index in viewport coordinates."""
+        x = max(CONTINUOUS_PAGE_SPACING, (self.viewport().width() - self._page_width) / 2) - self.horizontalScrollBar().value()
+        y = self._tops[index] - self.verticalScrollBar().value()
+        return QRectF(x, y, self._page_width, self._heights[index])
+
+    def scroll_to_page(self, index):
+        if 0 <= index < len(self._tops):
+            self.verticalScrollBar().setValue(self._tops[index] - CONTINUOUS_PAGE_SPACING)
+
+    def request_pages(self):
+        """Render the pages in and near the view, nearest to the view first, and drop other queued work."""
+        if self.prefetcher is None or not self._tops:
+            return
+        visible = self.visible_pages()
+        indices = list(visible)
+        for distance in range(1, CONTINUOUS_PRELOAD_PAGES + 1):
+            indices.extend(index for index in (visible.stop - 1 + distance, visible.start - distance)
+                           if 0 <= index < len(self._tops))
+        self.prefetcher.prefetch(indices, on_done=self._on_page_rendered)
+
+    def _on_page_rendered(self, future):
+        if not future.cancelled():
+            self.pages_ready.emit()
+
+    def _update_current_page(self):
+        if not self._tops or self._in_relayout:
+            return
+        # The page under the top of the view, so that scroll_to_page(index) makes index current
+        top = self.verticalScrollBar().value() + CONTINUOUS_PAGE_SPACING
+        index = max(0, bisect_right(self._tops, top) - 1)
+        if index != self.current_page:
+            self.current_page = index
+            self.current_page_changed.emit(index)
+
+    # Events
+
+    @timed('continuous.paint')
+    def paintEvent(self, event):
+        painter = QPainter(self.viewport())
+        painter.fillRect(self.viewport().rect(), QColor(200, 200, 200))
+        if self.pages is None:
+            return
+        cache = self.prefetcher.qimage_cache
+        for index in self.visible_pages():
+            rect = self.page_rect(index)
+            image = cache.get(self.pages.page_key(index))
+            if image is None:
+                # Placeholder until the page is rendered
+                painter.fillRect(rect, QColor(235, 235, 235))
+                painter.setPen(QColor(120, 120, 120))
+                painter.drawText(rect, Qt.AlignmentFlag.AlignCenter, f"Page {index + 1}")
+                continue
+            width, height = self._page_sizes[index]
+            if abs(image.width() - width) > 1 or abs(image.height() - height) > 1:
+                # The metadata was wrong about this page, place it at its rendered size rather than stretch it
+                self._page_sizes[index] = (image.width(), image.height())
+                QTimer.singleShot(0, self.relayout)
+            painter.drawImage(rect, image)
+            shapes = self.annotations.get(index)
+            if shapes:
+                # Shapes are in page image coordinates
+                painter.save()
+                painter.translate(rect.topLeft())
+                scale = rect.width() / image.width()
+                painter.scale(scale, scale)
+                for shape in shapes:
+                    shape.draw(painter)
+                painter.restore()
+
+    def scrollContentsBy(self, dx, dy):
+        self.request_pages()
+        self.viewport().update()
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.relayout()
+
+    def wheelEvent(self, event):
+        """Zoom when Ctrl is held, scroll otherwise."""
+        if event.modifiers() == Qt.KeyboardModifier.ControlModifier:
+            factor = 1.1 if event.angleDelta().y() > 0 else 1 / 1.1
+            self.zoom_factor = max(self.min_zoom_factor, min(self.max_zoom_factor, self.zoom_factor * factor))
+            self.relayout()
+        else:
+            super().wheelEvent(event)
@@ -0,0 +1,116 @@
+# app/widgets/detail_layer.py
+
+import math
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, QRectF, QTimer, pyqtSignal
+
+from ..config.settings import DETAIL_MARGIN, DETAIL_MAX_PIXELS, DETAIL_RENDER_DELAY_MS
+from ..utils.image_conversion import pil_to_qimage
+
+
+class DetailLayer(QObject):
+    """High-resolution render of the visible part of the page, drawn over the base page image.
+
+    Once the canvas zooms past the resolution of the base image, the region in
+    view is re-rasterized at the zoom level by the page's region renderer,
+    render(scale, box) -> PIL Image, in a worker thread. Requests are debounced
+    by DETAIL_RENDER_DELAY_MS so that no render starts while the user is still
+    zooming or panning; until the render arrives the upsampled base page shows.
+    """
+
+    detail_ready = pyqtSignal(int, object, float, object)  # Generation, box, requested scale, QImage
+
+    def __init__(self, canvas, delay_ms=DETAIL_RENDER_DELAY_MS):
+        super().__init__(canvas)
+        self.canvas = canvas
+        self.renderer = None
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.request)
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='labeldoc-detail')
+        self.detail_ready.connect(self._on_detail_ready)
+        self.generation = 0  # Bumped by every request, so that stale renders are dropped
+        self._future = None
+        self.box = None  # Rendered region (x, y, width, height) in page image pixels
+        self.scale = 0.0  # Scale the region was requested at
+        self.image = None
+
+    def reset(self, renderer=None):
+        """Drop the current detail, for a new page rendered by renderer (None disables the layer)."""
+        self.renderer = renderer
+        self.generation += 1
+        self.timer.stop()
+        if self._future is not None:
+            self._future.cancel()
+        self.box = None
+        self.scale = 0.0
+        self.image = None
+
+    def target_scale(self):
+        """Device pixels per page image pixel at the current zoom level."""
+        return self.canvas.zoom_level * self.canvas.devicePixelRatioF()
+
+    def view_changed(self):
+        """Restart the debounce timer if the detail no longer covers the view."""
+        if self.renderer is None:
+            return
+        if self.target_scale() <= 1.0:
+            # The base image is sharp enough, free the detail
+            self.timer.stop()
+            self.image = None
+            self.box = None
+            return
+        if not self.covers(self.canvas.visible_image_rect(), self.target_scale()):
+            self.timer.start()
+
+    def covers(self, rect, scale):
+        """Return whether the detail holds rect at scale, or at the highest scale the renderer provides."""
+        if self.image is None:
+            return False
+        box = QRectF(*self.box)
+        rendered_scale = self.image.width() / self.box[2]
+        capped = rendered_scale < 0.95 * self.scale  # The renderer returned less than requested
+        return box.contains(rect.intersected(self.canvas.image_rect())) and (rendered_scale >= 0.95 * scale or capped)
+
+    def request(self):
+        """Render the visible region, with a margin, at the current zoom level."""
+        visible = self.canvas.visible_image_rect()
+        margin_x = visible.width() * DETAIL_MARGIN
+        margin_y = visible.height() * DETAIL_MARGIN
+        region = visible.adjusted(-margin_x, -margin_y, margin_x, margin_y).intersected(self.canvas.image_rect())
+        if self.renderer is None or region.isEmpty():
+            return
+        box = region.toAlignedRect()
+        box = (box.x(), box.y(), box.width(), box.height())
+        scale = self.target_scale()
+        if box[2] * box[3] * scale * scale > DETAIL_MAX_PIXELS:
+            scale = math.sqrt(DETAIL_MAX_PIXELS / (box[2] * box[3]))
+
+        self.generation += 1
+        if self._future is not None:
+            self._future.cancel()
+        self._future = self.executor.submit(self._render, self.generation, self.renderer, box, scale)
+
+    def _render(self, generation, renderer, box, scale):
+        try:
+            image = renderer(scale, box)
+        except Exception as e:
+            print(f"Could not render page detail: {e}")
+            return
+        if image is not None:
+            self.detail_ready.emit(generation, box, scale, pil_to_qimage(image))
+
+    def _on_detail_ready(self, generation, box, scale, image):
+        if generation != self.generation:
+            return
+        self.box = box
+        self.scale = scale
+        self.image = image
+        self.canvas.update()
+
+    def draw(self, painter, origin):
+        """Draw the detail over the page, with painter in page image coordinates."""
+        if self.image is not None:
+            painter.drawImage(QRectF(*self.box).translated(origin), self.image)
@@ -0,0 +1,103 @@
+# app/widgets/frame_pacer.py
+
+import time
+from collections import deque
+
+from PyQt6.QtCore import QObject, QPoint, QTimer, Qt
+
+from ..config.settings import DEFAULT_REFRESH_RATE, FRAME_STATS_WINDOW
+
+
+class FramePacer(QObject):
+    """Gathers pan and zoom input between frames and applies it once per frame tick.
+
+    Input events only accumulate a pan delta and a zoom factor. A timer tied to
+    the screen refresh rate applies them as one pan and one zoom action per
+    frame, so the canvas repaints at most once per refresh however fast the
+    input arrives. The timer stops when there is no more input.
+    """
+
+    def __init__(self, canvas):
+        super().__init__(canvas)
+        self.canvas = canvas
+        self.timer = QTimer(self)
+        self.timer.setTimerType(Qt.TimerType.PreciseTimer)
+        self.timer.timeout.connect(self.tick)
+        self.pending_pan = QPoint(0, 0)
+        self.pending_zoom_factor = 1.0
+        self._first_input_time = None  # Time of the oldest input not yet painted
+        self._applied_input_time = None  # Input time of the frame waiting to be painted
+        self._last_tick_time = None
+        self.frames = 0
+        self.dropped_frames = 0
+        self.latencies = deque(maxlen=FRAME_STATS_WINDOW)  # Input-to-paint latencies in seconds
+
+    @property
+    def frame_interval(self):
+        """Seconds between two display refreshes."""
+        screen = self.canvas.screen()
+        refresh_rate = screen.refreshRate() if screen else 0
+        return 1.0 / (refresh_rate or DEFAULT_REFRESH_RATE)
+
+    def add_pan(self, delta):
+        self.pending_pan += delta
+        self._input()
+
+    def add_zoom(self, factor):
+        self.pending_zoom_factor *= factor
+        self._input()
+
+    def _input(self):
+        if self._first_input_time is None:
+            self._first_input_time = time.perf_counter()
+        if not self.timer.isActive():
+            self._last_tick_time = None
+            self.timer.start(max(1, round(self.frame_interval * 1000)))
+            self.tick()  # Apply the first input right away, then pace the following ones
+
+    def tick(self):
+        now = time.perf_counter()
+        if self._first_input_time is None:
+            self.timer.stop()  # Idle: no input since the last frame
+            return
+
+        if self._last_tick_time is not None:
+            # Frames the display showed without a new canvas image while input was pending
+            missed = int((now - self._last_tick_time) / self.frame_interval + 0.5) - 1
+            self.dropped_frames += max(0, missed)
+        self._last_tick_time = now
+
+        self._applied_input_time = self._first_input_time
+        self._first_input_time = None
+        pan, self.pending_pan = self.pending_pan, QPoint(0, 0)
+        zoom_factor, self.pending_zoom_factor = self.pending_zoom_factor, 1.0
+        if zoom_factor != 1.0:
+            self.canvas.perform_zoom(self.canvas.zoom_level * zoom_factor)
+        if not pan.isNull():
+            self.canvas.perform_pan(self.canvas.offset, self.canvas.offset + pan)
+
+    def frame_painted(self):
+        """Record the input-to-paint latency of the frame that was just painted."""
+        if self._applied_input_time is not None:
+            self.frames += 1
+            self.latencies.append(time.perf_counter() - self._applied_input_time)
+            self._applied_input_time = None
+
+    def stats(self):
+        """Return frame pacing statistics over the last FRAME_STATS_WINDOW frames."""
+        latencies = sorted(self.latencies)
+        return {
+            'refresh_rate': 1.0 / self.frame_interval,
+            'frames': self.frames,
+            'dropped_frames': self.dropped_frames,
+            'mean_latency_ms': 1000 * sum(latencies) / len(latencies) if latencies else 0.0,
+            'p95_latency_ms': 1000 * latencies[int(0.95 * (len(latencies) - 1))] if latencies else 0.0,
+            'max_latency_ms': 1000 * latencies[-1] if latencies else 0.0,
+        }
+
+    def format_stats(self):
+        """Return the frame pacing statistics as a line of text, for display."""
+        stats = self.stats()
+        return (f"frames: {stats['frames']} painted, {stats['dropped_frames']} dropped at {stats['refresh_rate']:.0f} Hz, "
+                f"input-to-paint mean {stats['mean_latency_ms']:.1f} ms, p95 {stats['p95_latency_ms']:.1f} ms, "
+                f"max {stats['max_latency_ms']:.1f} ms")
@@ -1,8 +1,16 @@
+from PyQt6.QtCore import QTimer
+from PyQt6.QtGui import QFontDatabase
 from PyQt6.QtWidgets import QWidget, QVBoxLayout, QLabel, QLineEdit
 
+from ..config.settings import INSTRUMENTATION_REFRESH_MS
+from ..utils import instrumentation
+
 class ResultsWidget(QWidget):
-    def __init__(self):
+    def __init__(self, frame_pacer=None):
         super().__init__()
+        self.frame_pacer = frame_pacer  # FramePacer of the canvas, whose frame statistics join the timings
+        self.timings_timer = QTimer(self)
+        self.timings_timer.timeout.connect(self.refresh_timings)
         self.init_ui()
 
     def init_ui(self):
@@ -11,4 +19,26 @@ class ResultsWidget(QWidget):
         self.label = QLabel("Shape Metadata")
         layout.addWidget(self.label)
 
+        # Live hot-path timings, shown while instrumentation is enabled
+        self.timings_label = QLabel()
+        self.timings_label.setFont(QFontDatabase.systemFont(QFontDatabase.SystemFont.FixedFont))
+        self.timings_label.setVisible(False)
+        layout.addWidget(self.timings_label)
+        layout.addStretch()
+
         self.setLayout(layout)
+
+    def show_timings(self, visible):
+        """Show or hide the live timings, refreshed every INSTRUMENTATION_REFRESH_MS."""
+        self.timings_label.setVisible(visible)
+        if visible:
+            self.refresh_timings()
+            self.timings_timer.start(INSTRUMENTATION_REFRESH_MS)
+        else:
+            self.timings_timer.stop()
+
+    def refresh_timings(self):
+        lines = [instrumentation.format_summary() or "No timings recorded yet."]
+        if self.frame_pacer is not None:
+            lines.append(self.frame_pacer.format_stats())
+        self.timings_label.setText('\n'.join(lines))
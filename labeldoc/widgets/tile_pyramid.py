@@ -0,0 +1,79 @@
+# app/widgets/tile_pyramid.py
+
+import math
+from PyQt6.QtCore import Qt, QRectF
+from PyQt6.QtGui import QImage, qBlue, qGreen, qRed
+
+from ..config.settings import TILE_SIZE
+from ..utils.instrumentation import timed
+
+
+def is_gray_indexed(image: QImage):
+    """Whether image is bilevel or indexed with only gray colours (QImage.isGrayscale() is false for 1-bit images)."""
+    if image.format() not in (QImage.Format.Format_Mono, QImage.Format.Format_Indexed8):
+        return False
+    return all(qRed(color) == qGreen(color) == qBlue(color) for color in image.colorTable())
+
+
+class TilePyramid:
+    """Power-of-two downsampled levels of a page image, addressed as fixed-size tiles.
+
+    Level 0 is the page image itself, level n is 1 / 2**n of its size. Tiles are
+    source rectangles into a level image, so only the tiles that intersect the
+    viewport are drawn and no tile is ever copied.
+    """
+
+    @timed('canvas.build_pyramid')
+    def __init__(self, image: QImage, tile_size=TILE_SIZE):
+        self.image = image
+        self.tile_size = tile_size
+        self.width = image.width()
+        self.height = image.height()
+        self.levels: list[QImage] = [image]
+        level_image = image
+        if is_gray_indexed(image):
+            # Smooth scaling expands these to 32 bits per pixel; scaled from grayscale, levels stay 8 bits
+            level_image = image.convertToFormat(QImage.Format.Format_Grayscale8)
+        while max(level_image.width(), level_image.height()) > tile_size:
+            level_image = level_image.scaled(
+                max(1, level_image.width() // 2), max(1, level_image.height() // 2),
+                Qt.AspectRatioMode.IgnoreAspectRatio, Qt.TransformationMode.SmoothTransformation
+            )
+            self.levels.append(level_image)
+
+    def level_for_zoom(self, zoom_level):
+        """Return the level whose resolution is nearest to the zoom level."""
+        if zoom_level >= 1.0:
+            return 0
+        level = round(math.log2(1.0 / zoom_level))
+        return min(level, len(self.levels) - 1)
+
+    def tiles_in_rect(self, level, rect: QRectF):
+        """Yield (target, source) rectangles of the tiles at level that intersect rect.
+
+        rect and target are in page image coordinates, source is in level image coordinates.
+        """
+        level_image = self.levels[level]
+        scale_x = self.width / level_image.width()
+        scale_y = self.height / level_image.height()
+        rect = rect.intersected(QRectF(0, 0, self.width, self.height))
+        if rect.isEmpty():
+            return
+
+        first_col = int(rect.left() / scale_x) // self.tile_size
+        last_col = min(int(rect.right() / scale_x), level_image.width() - 1) // self.tile_size
+        first_row = int(rect.top() / scale_y) // self.tile_size
+        last_row = min(int(rect.bottom() / scale_y), level_image.height() - 1) // self.tile_size
+        for row in range(first_row, last_row + 1):
+            for col in range(first_col, last_col + 1):
+                source = QRectF(col * self.tile_size, row * self.tile_size, self.tile_size, self.tile_size)
+                source = source.intersected(QRectF(0, 0, level_image.width(), level_image.height()))
+                target = QRectF(source.x() * scale_x, source.y() * scale_y, source.width() * scale_x, source.height() * scale_y)
+                yield target, source
+
+    def draw(self, painter, zoom_level, visible_rect: QRectF, origin):
+        """Draw the tiles of the level nearest zoom_level that intersect visible_rect."""
+        level = self.level_for_zoom(zoom_level)
+        level_image = self.levels[level]
+        for target, source in self.tiles_in_rect(level, visible_rect):
+            painter.drawImage(target.translated(origin), level_image, source)
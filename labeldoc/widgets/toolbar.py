@@ -21,6 +21,9 @@ class ToolbarWidget(QToolBar):
         open_action = self.addAction(QIcon(os.path.join(self.icon_path, 'open.png')), "Open")
         open_action.triggered.connect(self.open_file_dialog)
 
+        open_workspace_action = self.addAction(QIcon(os.path.join(self.icon_path, 'file.png')), "Open\nWorkspace")
+        open_workspace_action.triggered.connect(self.parent().open_workspace_dialog)
+
         save_action = self.addAction(QIcon(os.path.join(self.icon_path, 'save.png')), "Save")
         save_action.triggered.connect(self.save_annotations)
 
@@ -30,6 +33,9 @@ class ToolbarWidget(QToolBar):
         load_web_to_canvas = self.addAction(QIcon(os.path.join(self.icon_path, 'load_web_page.png')), "Load Page\nFrom Web")
         load_web_to_canvas.triggered.connect(self.load_current_browser_page)
 
+        cancel_web_load = self.addAction(QIcon(os.path.join(self.icon_path, 'cancel.png')), "Cancel\nWeb Load")
+        cancel_web_load.triggered.connect(self.cancel_browser_capture)
+
         self.addSeparator()
 
         next_page_action = self.addAction(QIcon(os.path.join(self.icon_path, 'next.png')), "Next Page")
@@ -38,6 +44,13 @@ class ToolbarWidget(QToolBar):
         previous_page_action = self.addAction(QIcon(os.path.join(self.icon_path, 'prev.png')), "Previous Page")
         previous_page_action.triggered.connect(self.previous_page)
 
+        next_unlabeled_action = self.addAction(QIcon(os.path.join(self.icon_path, 'done.png')), "Next\nUnlabeled")
+        next_unlabeled_action.triggered.connect(self.parent().next_unlabeled_page)
+
+        self.continuous_action = self.addAction(QIcon(os.path.join(self.icon_path, 'fit-width.png')), "Continuous\nScroll")
+        self.continuous_action.setCheckable(True)
+        self.continuous_action.toggled.connect(self.set_continuous)
+
         undo_action = self.addAction(QIcon(os.path.join(self.icon_path, 'undo.png')), "Undo")
         undo_action.triggered.connect(self.parent().canvas.action_manager.undo)
 
@@ -49,13 +62,23 @@ class ToolbarWidget(QToolBar):
         print_log_action = self.addAction(QIcon(os.path.join(self.icon_path, 'log.png')), "Actions Log")
         print_log_action.triggered.connect(self.parent().canvas.action_manager.print_action_log)
 
+        memory_report_action = self.addAction(QIcon(os.path.join(self.icon_path, 'objects.png')), "Memory\nReport")
+        memory_report_action.triggered.connect(self.print_memory_report)
+
+        self.timings_action = self.addAction(QIcon(os.path.join(self.icon_path, 'expert.png')), "Timings")
+        self.timings_action.setCheckable(True)
+        self.timings_action.toggled.connect(self.parent().set_timings_enabled)
+
+        dump_timings_action = self.addAction(QIcon(os.path.join(self.icon_path, 'save-as.png')), "Dump\nTimings")
+        dump_timings_action.triggered.connect(self.parent().dump_timings)
+
     def open_browser(self):
         if self.controller:
             self.controller.open_browser()
 
     def open_file_dialog(self):
         if self.controller:
-            self.controller.open_file_dialog()
+            self.parent().open_file_dialog()
 
     def save_annotations(self):
         if self.controller:
@@ -69,6 +92,18 @@ class ToolbarWidget(QToolBar):
         if self.controller:
             self.controller.previous_page()
     
+    def set_continuous(self, enabled):
+        if self.controller:
+            self.controller.set_continuous(enabled)
+
     def load_current_browser_page(self):
         if self.controller:
             self.controller.load_current_browser_page()
+
+    def cancel_browser_capture(self):
+        if self.controller:
+            self.controller.cancel_browser_capture()
+
+    def print_memory_report(self):
+        if self.controller:
+            self.controller.print_memory_report()
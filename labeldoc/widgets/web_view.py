@@ -1,45 +1,83 @@
 # labeldoc/widgets/web_view.py
+import os
+import tempfile
+import threading
 from PyQt6.QtWidgets import (
     QWidget, QVBoxLayout, QLineEdit, QPushButton, QToolBar, QTabWidget, QMainWindow
 )
 from PyQt6.QtWebEngineWidgets import QWebEngineView
-from PyQt6.QtCore import QUrl, QEventLoop, QByteArray
-from pdf2image import convert_from_bytes
+from PyQt6.QtCore import QObject, QUrl, pyqtSignal
 
+from ..models.page_source import PdfPageSource
 
-class WebView(QWebEngineView):
-    def __init__(self, parent=None):
-        super().__init__(parent)
 
-    def load_url(self, url):
-        self.setUrl(QUrl(url))
+class WebCapture(QObject):
+    """Asynchronous capture of a web page as a stream of PIL images.
+
+    The page is printed to PDF through a callback, then rasterized one page at
+    a time on a worker thread. Signals are emitted from the worker and delivered
+    on the GUI thread.
+    """
+    page_ready = pyqtSignal(int, object)  # Page index, PIL image
+    progress = pyqtSignal(int, int)  # Pages done, total pages
+    finished = pyqtSignal()
+    failed = pyqtSignal(str)
 
-    def generate_pil_images_from_webpage(self):
-        """Generate a list of PIL images from the current tab."""
-        pdf_data = QByteArray()
+    def __init__(self, web_view):
+        super().__init__(web_view)
+        self.web_view = web_view
+        self._cancelled = threading.Event()
 
-        # Create an event loop to wait for the PDF generation to finish
-        event_loop = QEventLoop()
+    def start(self):
+        self.web_view.page().printToPdf(self._on_pdf_generated)
 
-        # Callback function that will be called when the PDF is generated
-        def on_pdf_generated(data):
-            nonlocal pdf_data
-            pdf_data = data
-            event_loop.quit()
+    def cancel(self):
+        self._cancelled.set()
 
-        # Start the PDF generation
-        self.page().printToPdf(on_pdf_generated)
+    def is_cancelled(self):
+        return self._cancelled.is_set()
 
-        # Block the execution until the PDF is saved
-        event_loop.exec()
+    def _on_pdf_generated(self, data):
+        pdf_bytes = data.data()
+        if self.is_cancelled():
+            return
+        if not pdf_bytes:
+            self.failed.emit("The page could not be printed to PDF.")
+            return
+        threading.Thread(target=self._rasterize, args=(pdf_bytes,), name='labeldoc-web-capture', daemon=True).start()
 
-        # Convert the QByteArray to bytes
-        pdf_bytes = pdf_data.data()
+    def _rasterize(self, pdf_bytes):
+        try:
+            with tempfile.TemporaryDirectory() as temp_dir:
+                pdf_path = os.path.join(temp_dir, 'capture.pdf')
+                with open(pdf_path, 'wb') as f:
+                    f.write(pdf_bytes)
+                source = PdfPageSource(pdf_path)
+                page_count = source.page_count()
+                self.progress.emit(0, page_count)
+                for index in range(page_count):
+                    if self.is_cancelled():
+                        return
+                    self.page_ready.emit(index, source.rasterize_page(index))
+                    self.progress.emit(index + 1, page_count)
+        except Exception as e:
+            self.failed.emit(str(e))
+            return
+        self.finished.emit()
 
-        # Convert the PDF bytes to PIL images
-        pil_images = convert_from_bytes(pdf_bytes)
 
-        return pil_images
+class WebView(QWebEngineView):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+
+    def load_url(self, url):
+        self.setUrl(QUrl(url))
+
+    def capture_pages(self):
+        """Start capturing the current page and return the WebCapture streaming its images."""
+        capture = WebCapture(self)
+        capture.start()
+        return capture
 
     def print_to_pdf(self, file_name):
         """Print the current web page to a PDF file."""
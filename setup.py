@@ -28,7 +28,7 @@ def get_install_requires():
         'imgviz>=0.11.0',
         'matplotlib',
         'numpy',
-        'Pillow>=2.8.0',
+        'Pillow>=9.1.0',  # Image.Dither
         'PyYAML',
         'PyQt6',
         'qtpy',
@@ -75,7 +75,7 @@ def main():
     setup(
         name='labeldoc',
         version=version,
-        packages=find_packages(exclude=['github2pypi']),
+        packages=find_packages(exclude=['github2pypi', 'benchmarks']),
         description='Image Polygonal Annotation with Python',
         long_description=get_long_description(),
         long_description_content_type='text/markdown',
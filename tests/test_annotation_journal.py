@@ -0,0 +1,63 @@
+import json
+
+from labeldoc.models.annotation_journal import AnnotationJournal
+from labeldoc.models.shape import Shape
+
+
+def open_journal(tmp_path, compact_records=1000):
+    return AnnotationJournal(str(tmp_path / 'annotations.json'), flush_interval=0.01, compact_records=compact_records)
+
+
+def ids(pages):
+    return {page: sorted(shape['id'] for shape in shapes) for page, shapes in pages.items()}
+
+
+def test_only_changes_are_journaled(tmp_path):
+    journal = open_journal(tmp_path)
+    a, b = Shape('a', [(0, 0), (1, 1)], shape_id='a'), Shape('b', [(2, 2), (3, 3)], shape_id='b')
+    journal.save_page('doc.pdf', 0, [a, b])
+    journal.save_page('doc.pdf', 0, [a, b])
+    journal.save_page('doc.pdf', 0, [a])
+    journal.close()
+    with open(journal.journal_path) as f:
+        records = [json.loads(line) for line in f]
+    assert [(record['op'], record.get('id') or record['shape']['id']) for record in records] == [
+        ('put', 'a'), ('put', 'b'), ('remove', 'b')]
+
+
+def test_recover_replays_journal_after_compaction(tmp_path):
+    journal = open_journal(tmp_path)
+    a, b, c = (Shape(name, [(0, 0), (1, 1)], shape_id=name) for name in 'abc')
+    journal.save_page('doc.pdf', 0, [a, b])
+    journal.save_page('doc.pdf', 1, [c])
+    journal.compact()
+    journal.flush()
+    with open(journal.journal_path) as f:
+        assert f.read() == ''  # Folded into the snapshot
+    b.label = 'renamed'
+    journal.save_page('doc.pdf', 0, [b])
+    journal.save_page('doc.pdf', 1, [])
+    journal.close()
+
+    recovered = open_journal(tmp_path).recover()
+    assert ids(recovered['doc.pdf']) == {0: ['b'], 1: []}
+    assert recovered['doc.pdf'][0][0]['label'] == 'renamed'
+
+
+def test_compacts_after_record_count(tmp_path):
+    journal = open_journal(tmp_path, compact_records=2)
+    journal.save_page('doc.pdf', 0, [Shape(name, [(0, 0), (1, 1)], shape_id=name) for name in 'ab'])
+    journal.close()
+    with open(journal.snapshot_path) as f:
+        snapshot = json.load(f)
+    assert ids(snapshot['documents']['doc.pdf']) == {'0': ['a', 'b']}
+    assert ids(open_journal(tmp_path).recover()['doc.pdf']) == {0: ['a', 'b']}
+
+
+def test_torn_last_record_is_ignored(tmp_path):
+    journal = open_journal(tmp_path)
+    journal.save_page('doc.pdf', 0, [Shape('a', [(0, 0), (1, 1)], shape_id='a')])
+    journal.close()
+    with open(journal.journal_path, 'a') as f:
+        f.write('{"op": "put", "doc": "doc.pdf", "pa')
+    assert ids(open_journal(tmp_path).recover()['doc.pdf']) == {0: ['a']}
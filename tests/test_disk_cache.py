@@ -0,0 +1,59 @@
+import os
+
+from PIL import Image, ImageChops, ImageDraw
+
+from labeldoc.models.disk_cache import DiskPageCache, content_hash
+
+
+def write(path, data, mtime_ns):
+    with open(path, 'wb') as f:
+        f.write(data)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+    return content_hash(str(path), sample_bytes=16)
+
+
+def test_content_hash_covers_size_and_both_ends(tmp_path):
+    path = tmp_path / 'doc.pdf'
+    data = bytes(range(100))
+    original = write(path, data, 1)
+    assert write(path, data, 2) == original  # Touched but unchanged
+    assert write(path, b'x' + data[1:], 3) != original
+    assert write(path, data[:-1] + b'x', 4) != original
+    assert write(path, data + b'x', 5) != original
+    # The middle of a large file is not sampled
+    assert write(path, data[:50] + b'x' + data[51:], 6) == original
+
+
+def test_pages_round_trip_in_every_mode(tmp_path):
+    cache = DiskPageCache(str(tmp_path), 10 * 1024 * 1024)
+    page = Image.new('RGB', (37, 21), 'white')
+    ImageDraw.Draw(page).rectangle((3, 4, 20, 15), fill=(200, 30, 40))
+    for index, image in enumerate([page, page.convert('L'), page.convert('1'), page.convert('P')]):
+        assert cache.put('hash', index, 200, image.mode, image)
+        cached = cache.get('hash', index, 200, image.mode)
+        assert (cached.mode, cached.size) == (image.mode, image.size)
+        assert ImageChops.difference(cached.convert('RGB'), image.convert('RGB')).getbbox() is None
+    assert cache.get('hash', 9, 200, 'RGB') is None
+
+
+def test_corrupt_entries_are_dropped(tmp_path):
+    cache = DiskPageCache(str(tmp_path), 10 * 1024 * 1024)
+    cache.put('hash', 0, 200, 'L', Image.new('L', (10, 10)))
+    path = cache.path_for('hash', 0, 200, 'L')
+    with open(path, 'wb') as f:
+        f.write(b'garbage')
+    assert cache.map('hash', 0, 200, 'L') is None
+    assert not os.path.exists(path)
+
+
+def test_least_recently_used_pages_are_evicted_over_budget(tmp_path):
+    cache = DiskPageCache(str(tmp_path), 35000)  # Three pages
+    for index in range(3):
+        cache.put('hash', index, 200, 'L', Image.new('L', (100, 100)))
+        path = cache.path_for('hash', index, 200, 'L')
+        os.utime(path, (index, index))
+    cache.map('hash', 0, 200, 'L')  # Marks page 0 as recently used
+    cache.put('hash', 3, 200, 'L', Image.new('L', (100, 100)))
+    kept = [index for index in range(4) if os.path.exists(cache.path_for('hash', index, 200, 'L'))]
+    assert kept == [0, 2, 3]
+    assert cache.size_bytes() <= 35000
@@ -0,0 +1,106 @@
+import json
+import os
+
+import pytest
+
+from benchmarks.fixtures import make_png
+from labeldoc.export import COCO_PARTS, MANIFEST_NAME, export
+
+
+def shape(shape_id, label='word'):
+    return {'id': shape_id, 'label': label, 'points': [[1, 2], [30, 40]], 'shape_type': 'rectangle'}
+
+
+@pytest.fixture
+def document(tmp_path):
+    """A document of three PNG pages, as opened from several image files."""
+    paths = [make_png(str(tmp_path / f'scan{number}.png'), (100, 80), number) for number in range(3)]
+    return os.pathsep.join(paths)
+
+
+def run_export(tmp_path, annotations, **kwargs):
+    return export(annotations, str(tmp_path / 'out'), workers=1, cache_dir=str(tmp_path / 'cache'), **kwargs)
+
+
+def read_outputs(tmp_path):
+    out = tmp_path / 'out'
+    with open(out / 'coco.json') as f:
+        coco = json.load(f)
+    with open(out / 'annotations.jsonl') as f:
+        lines = [json.loads(line) for line in f]
+    return coco, lines
+
+
+def test_export_names_pages_after_their_files(tmp_path, document):
+    stats = run_export(tmp_path, {document: {0: [shape('a')], 2: [shape('b', 'figure')]}})
+    assert (stats['pages'], stats['annotations']) == (2, 2)
+    coco, lines = read_outputs(tmp_path)
+    assert [image['file_name'].split('-')[0] for image in coco['images']] == ['images/scan0', 'images/scan2']
+    assert [category['name'] for category in coco['categories']] == ['word', 'figure']
+    assert [line['page'] for line in lines] == [0, 2]
+    assert sorted(name.split('-')[0] for name in os.listdir(tmp_path / 'out' / 'labelme')) == ['scan0', 'scan2']
+    assert not any(os.path.exists(tmp_path / 'out' / name) for name in COCO_PARTS)
+
+
+def test_new_annotations_join_a_finished_export(tmp_path, document):
+    run_export(tmp_path, {document: {0: [shape('a')]}})
+    stats = run_export(tmp_path, {document: {0: [shape('a')], 1: [shape('b'), shape('c')]}})
+    assert (stats['pages'], stats['skipped_pages']) == (1, 1)
+    coco, lines = read_outputs(tmp_path)
+    assert [image['id'] for image in coco['images']] == [1, 2]
+    assert [(annotation['id'], annotation['image_id']) for annotation in coco['annotations']] == [(1, 1), (2, 2), (3, 2)]
+    assert [line['page'] for line in lines] == [0, 1]
+
+
+def test_export_resumes_from_a_manifest_behind_its_outputs(tmp_path, document):
+    annotations = {document: {0: [shape('a')], 1: [shape('b')], 2: [shape('c')]}}
+    run_export(tmp_path, {document: dict(annotations[document])})
+    # A crash before the manifest was synced: its last records are lost and one is torn
+    out = tmp_path / 'out'
+    with open(out / MANIFEST_NAME) as f:
+        manifest_lines = f.readlines()
+    with open(out / MANIFEST_NAME, 'w') as f:
+        f.writelines(manifest_lines[:2])
+        f.write(manifest_lines[2][:20])
+    with open(out / 'annotations.jsonl', 'a') as f:
+        f.write('{"document": "torn')
+
+    stats = run_export(tmp_path, annotations)
+    assert (stats['pages'], stats['skipped_pages']) == (2, 1)
+    coco, lines = read_outputs(tmp_path)
+    assert [(image['id'], image['labeldoc_page']) for image in coco['images']] == [(1, 0), (2, 1), (3, 2)]
+    assert [annotation['id'] for annotation in coco['annotations']] == [1, 2, 3]
+    assert [line['page'] for line in lines] == [0, 1, 2]
+
+
+def test_export_with_other_options_needs_restart(tmp_path, document):
+    run_export(tmp_path, {document: {0: [shape('a')]}})
+    with pytest.raises(ValueError):
+        run_export(tmp_path, {document: {0: [shape('a')]}}, crops=True)
+    stats = run_export(tmp_path, {document: {0: [shape('a')]}}, crops=True, restart=True)
+    assert (stats['pages'], stats['skipped_pages']) == (1, 0)
+    assert os.listdir(tmp_path / 'out' / 'crops' / 'word')
+
+
+def test_export_stopped_between_pages_resumes(tmp_path, document, monkeypatch):
+    from labeldoc.export import DatasetWriter
+
+    write_page = DatasetWriter.write_page
+
+    def write_one_page(self, *args):
+        if self.manifest.done:
+            raise KeyboardInterrupt
+        write_page(self, *args)
+
+    annotations = {document: {0: [shape('a')], 1: [shape('b')], 2: [shape('c')]}}
+    monkeypatch.setattr(DatasetWriter, 'write_page', write_one_page)
+    with pytest.raises(KeyboardInterrupt):
+        run_export(tmp_path, {document: dict(annotations[document])})
+    assert not os.path.exists(tmp_path / 'out' / 'coco.json')
+    monkeypatch.setattr(DatasetWriter, 'write_page', write_page)
+
+    stats = run_export(tmp_path, annotations)
+    assert (stats['pages'], stats['skipped_pages']) == (2, 1)
+    coco, lines = read_outputs(tmp_path)
+    assert [image['id'] for image in coco['images']] == [1, 2, 3]
+    assert [line['page'] for line in lines] == [0, 1, 2]
@@ -0,0 +1,69 @@
+from PIL import Image
+
+from labeldoc.models.page_cache import PageCache, image_nbytes
+
+
+def test_image_nbytes_by_mode():
+    assert image_nbytes(Image.new('RGB', (10, 20))) == 600
+    assert image_nbytes(Image.new('1', (10, 20))) == 200
+    assert image_nbytes(Image.new('RGBA', (10, 20))) == 800
+
+
+def test_evicts_least_recently_used_over_budget():
+    cache = PageCache(30, sizeof=len)
+    cache.put('a', b'x' * 10)
+    cache.put('b', b'x' * 10)
+    cache.put('c', b'x' * 10)
+    assert cache.get('a') is not None  # 'b' is now the least recently used
+    cache.put('d', b'x' * 10)
+    assert 'b' not in cache
+    assert [key for key, _ in cache.sizes()] == ['c', 'a', 'd']
+    assert cache.total_bytes == 30
+    assert cache.evictions == 1
+
+
+def test_newest_entry_is_kept_even_over_budget():
+    cache = PageCache(10, sizeof=len)
+    cache.put('a', b'x' * 5)
+    cache.put('b', b'x' * 50)
+    assert list(cache.sizes()) == [('b', 50)]
+
+
+def test_replacing_a_key_updates_its_size():
+    cache = PageCache(100, sizeof=len)
+    cache.put('a', b'x' * 10)
+    cache.put('a', b'x' * 30)
+    assert len(cache) == 1
+    assert cache.total_bytes == 30
+
+
+def test_trim_keeps_protected_keys():
+    cache = PageCache(100, sizeof=len)
+    for key in 'abc':
+        cache.put(key, b'x' * 10)
+    assert cache.trim(0, keep={'a'}) == 20
+    assert list(cache.sizes()) == [('a', 10)]
+
+
+def test_stats_count_hits_and_misses():
+    cache = PageCache(100, sizeof=len)
+    cache.put('a', b'x')
+    cache.get('a')
+    cache.get('a')
+    cache.get('b')
+    stats = cache.stats()
+    assert (stats['hits'], stats['misses'], stats['entries']) == (2, 1, 1)
+    assert stats['hit_rate'] == 2 / 3
+
+
+def test_memory_budget_is_enforced_after_put():
+    enforced = []
+
+    class Budget:
+        def enforce(self):
+            enforced.append(len(cache))
+
+    cache = PageCache(100, sizeof=len)
+    cache.memory_budget = Budget()
+    cache.put('a', b'x')
+    assert enforced == [1]
@@ -0,0 +1,52 @@
+from PIL import Image, ImageChops, ImageDraw
+
+from benchmarks.fixtures import make_page
+from labeldoc.models.page_modes import compact_image
+
+
+def assert_same_pixels(compacted, image):
+    assert ImageChops.difference(compacted.convert('RGB'), image.convert('RGB')).getbbox() is None
+
+
+def test_black_and_white_page_becomes_bilevel():
+    image = Image.new('RGB', (40, 30), 'white')
+    ImageDraw.Draw(image).rectangle((5, 5, 20, 20), fill='black')
+    compacted = compact_image(image)
+    assert compacted.mode == '1'
+    assert_same_pixels(compacted, image)
+
+
+def test_gray_page_becomes_grayscale():
+    image = make_page((60, 80)).convert('L').convert('RGB')
+    compacted = compact_image(image)
+    assert compacted.mode == 'L'
+    assert_same_pixels(compacted, image)
+
+
+def test_few_colour_page_becomes_palette():
+    image = make_page((60, 80))
+    ImageDraw.Draw(image).rectangle((10, 10, 30, 30), fill=(200, 30, 40))
+    compacted = compact_image(image)
+    assert compacted.mode == 'P'
+    assert_same_pixels(compacted, image)
+
+
+def test_page_with_palette_sized_colour_count():
+    image = Image.new('RGB', (256, 1))
+    image.putdata([(value, 255 - value, value // 2) for value in range(256)])
+    compacted = compact_image(image)
+    assert compacted.mode == 'P'
+    assert_same_pixels(compacted, image)
+
+
+def test_many_colour_and_transparent_pages_are_unchanged():
+    photo = Image.new('RGB', (32, 32))
+    photo.putdata([(x * 8, y * 8, (x + y) * 4) for y in range(32) for x in range(32)])
+    assert compact_image(photo) is photo
+    transparent = Image.new('RGBA', (10, 10), (0, 0, 0, 0))
+    assert compact_image(transparent) is transparent
+
+
+def test_opaque_rgba_page_is_compacted():
+    image = Image.new('RGBA', (10, 10), (255, 255, 255, 255))
+    assert compact_image(image).mode == '1'
@@ -0,0 +1,107 @@
+from PIL import Image
+
+from labeldoc.models.disk_cache import DiskPageCache
+from labeldoc.models.page_cache import PageCache
+from labeldoc.models.page_source import FilePageSource, ImageListPageSource, PageList, PageSource
+
+
+class CountingSource(PageSource):
+    """Pages of a solid colour, counting the renders."""
+
+    def __init__(self, name, page_count):
+        super().__init__((name, 0))
+        self.pages = page_count
+        self.rendered = []
+
+    def page_count(self):
+        return self.pages
+
+    def render_page(self, index):
+        self.rendered.append(index)
+        return Image.new('L', (10, 10), index)
+
+
+def test_pages_are_rendered_on_first_access_only():
+    source = CountingSource('doc', 100)
+    pages = PageList([source])
+    assert len(pages) == 100
+    assert source.rendered == []
+    assert pages[42].getpixel((0, 0)) == 42
+    assert pages[-1].getpixel((0, 0)) == 99
+    pages[42]
+    assert source.rendered == [42, 99]
+
+
+def test_evicted_pages_are_rendered_again():
+    source = CountingSource('doc', 3)
+    pages = PageList([source], PageCache(200))  # Two 100 byte pages
+    for index in (0, 1, 2, 0):
+        pages[index]
+    assert source.rendered == [0, 1, 2, 0]
+
+
+def test_pages_span_sources():
+    first, second = CountingSource('a', 2), ImageListPageSource([Image.new('L', (5, 5), value) for value in (7, 8)])
+    pages = PageList([first, second])
+    assert len(pages) == 4
+    assert pages.locate(2) == (second, 0)
+    assert [page.getpixel((0, 0)) for page in pages] == [0, 1, 7, 8]
+    assert pages.page_key(3) == (second.key, 1)
+    assert pages.page_size(3) == (5, 5)
+
+
+def test_refresh_counts_pages_added_to_a_source():
+    images = [Image.new('L', (5, 5))]
+    source = ImageListPageSource(images)
+    pages = PageList([source])
+    images.append(Image.new('L', (5, 5)))
+    assert len(pages) == 1
+    pages.refresh()
+    assert len(pages) == 2
+
+
+class RangeSource(FilePageSource):
+    """Pages of a file, recording the ranges rasterized."""
+
+    def __init__(self, path, disk_cache):
+        super().__init__(path, disk_cache)
+        self.ranges = []
+
+    def page_count(self):
+        return 6
+
+    def rasterize_page(self, index):
+        return Image.new('L', (10, 10), index)
+
+    def rasterize_range(self, start, stop):
+        self.ranges.append((start, stop))
+        return super().rasterize_range(start, stop)
+
+
+def make_range_source(tmp_path, disk_cache):
+    path = tmp_path / 'doc.bin'
+    path.write_bytes(b'document')
+    return RangeSource(str(path), disk_cache)
+
+
+def test_map_range_rasterizes_missing_runs_together(tmp_path):
+    source = make_range_source(tmp_path, DiskPageCache(str(tmp_path / 'cache'), float('inf')))
+    source.map_range(1, 2)
+    source.map_range(4, 5)
+    results = source.map_range(0, 6)
+    assert source.ranges == [(1, 2), (4, 5), (0, 1), (2, 4), (5, 6)]
+    assert all(image is None for _, image in results)
+    assert [page.to_image().getpixel((0, 0)) for page, _ in results] == list(range(6))
+
+
+def test_pages_the_disk_cache_cannot_store_are_rendered_once(tmp_path):
+    class FullDiskCache(DiskPageCache):
+        def write_entry(self, path, data):
+            return 0
+
+    source = make_range_source(tmp_path, FullDiskCache(str(tmp_path / 'cache'), float('inf')))
+    pages = PageList([source])
+    page, image = pages.map_page(3)
+    assert page is None and image.getpixel((0, 0)) == 3
+    assert pages[3] is image
+    assert source.ranges == [(3, 4)]
@@ -0,0 +1,78 @@
+import io
+import shutil
+
+import pytest
+from PIL import Image, ImageChops
+
+from benchmarks.fixtures import make_page, make_pdf
+from labeldoc.models.page_source import PdfPageSource, consecutive_runs
+from labeldoc.models.rasterizer import parse_pnm_stream, pdftoppm_args, raster_profile, rasterize_pdf, split_range
+
+requires_poppler = pytest.mark.skipif(shutil.which('pdftoppm') is None, reason='poppler is not installed')
+
+
+def pnm_bytes(image):
+    data = io.BytesIO()
+    image.save(data, 'PPM')
+    return data.getvalue()
+
+
+def assert_same(a, b):
+    assert a.mode == b.mode and a.size == b.size
+    assert ImageChops.difference(a.convert('L'), b.convert('L')).getbbox() is None
+
+
+def test_parse_pnm_stream_splits_concatenated_images():
+    pages = [make_page((31, 17), 1), make_page((40, 25), 2, 'L'), make_page((13, 9), 3, '1')]
+    images = parse_pnm_stream(b''.join(pnm_bytes(page) for page in pages))
+    assert [image.mode for image in images] == ['RGB', 'L', '1']
+    for image, page in zip(images, pages):
+        assert_same(image, page)
+
+
+def test_parse_pnm_stream_rejects_other_data():
+    with pytest.raises(ValueError):
+        parse_pnm_stream(pnm_bytes(make_page((8, 8))) + b'\x89PNG')
+
+
+def test_split_range():
+    assert split_range(1, 10, 3) == [(1, 4), (5, 7), (8, 10)]
+    assert split_range(3, 4, 8) == [(3, 3), (4, 4)]
+    assert split_range(5, 5, 0) == [(5, 5)]
+
+
+def test_consecutive_runs():
+    assert consecutive_runs([0, 1, 2, 5, 7, 8]) == [[0, 1, 2], [5], [7, 8]]
+    assert consecutive_runs([]) == []
+
+
+def test_pdftoppm_args_follow_profile():
+    options = raster_profile({'dpi': 200, 'grayscale': True, 'mono': False, 'fmt': 'png'})
+    assert pdftoppm_args('a.pdf', 2, 3, options, crop=(1, 2, 30, 40)) == [
+        'pdftoppm', '-r', '200', '-f', '2', '-l', '3', '-gray', '-png',
+        '-x', '1', '-y', '2', '-W', '30', '-H', '40', 'a.pdf']
+
+
+@requires_poppler
+def test_rasterize_pdf_across_workers_keeps_page_order(tmp_path):
+    path = make_pdf(str(tmp_path / 'doc.pdf'), 5, size=(120, 160))
+    options = {'dpi': 72, 'grayscale': False, 'mono': False}
+    single = rasterize_pdf(path, 1, 5, options, workers=1)
+    split = rasterize_pdf(path, 1, 5, options, workers=3)
+    assert [image.size for image in single] == [(120, 160)] * 5
+    for a, b in zip(single, split):
+        assert_same(a, b)
+
+
+@requires_poppler
+def test_pdf_page_source_sizes_and_disk_cache(tmp_path):
+    from labeldoc.models.disk_cache import DiskPageCache
+
+    path = make_pdf(str(tmp_path / 'doc.pdf'), 3, size=(144, 72))
+    disk_cache = DiskPageCache(str(tmp_path / 'cache'), 10 * 1024 * 1024)
+    source = PdfPageSource(path, disk_cache, profile={'dpi': 100}, workers=2)
+    assert source.page_count() == 3
+    assert source.page_size(2) == (200, 100)
+    mapped = source.map_range(0, 3)
+    assert all(page is not None and image is None for page, image in mapped)
+    assert_same(mapped[1][0].to_image(), source.render_page(1))
@@ -0,0 +1,61 @@
+from labeldoc.utils.spatial_index import GridIndex
+
+
+class Item:
+    def __init__(self, name):
+        self.name = name
+
+    def __repr__(self):
+        return self.name
+
+
+def test_query_rect_returns_intersecting_items_in_insertion_order():
+    index = GridIndex(cell_size=10)
+    a, b, c = Item('a'), Item('b'), Item('c')
+    index.insert(b, (50, 50, 60, 60))
+    index.insert(a, (0, 0, 25, 25))
+    index.insert(c, (24, 24, 30, 30))
+    assert index.query_rect((20, 20, 26, 26)) == [a, c]
+    assert index.query_rect((0, 0, 100, 100)) == [b, a, c]
+    assert index.query_rect((70, 70, 80, 80)) == []
+
+
+def test_query_rect_over_many_empty_cells_scans_occupied_cells():
+    index = GridIndex(cell_size=1)
+    a, b = Item('a'), Item('b')
+    index.insert(a, (5, 5, 6, 6))
+    index.insert(b, (900, 900, 901, 901))
+    assert index.query_rect((0, 0, 1000, 1000)) == [a, b]
+    assert index.query_rect((0, 0, 500, 500)) == [a]
+
+
+def test_query_point_and_reversed_boxes():
+    index = GridIndex(cell_size=10)
+    item = Item('item')
+    index.insert(item, (30, 30, 5, 5))  # Drawn from the bottom right corner
+    assert index.query_point(5, 5) == [item]
+    assert index.query_point(17, 29) == [item]
+    assert index.query_point(31, 17) == []
+
+
+def test_insert_again_moves_item_and_remove_forgets_it():
+    index = GridIndex(cell_size=10)
+    item = Item('item')
+    index.insert(item, (0, 0, 5, 5))
+    index.insert(item, (100, 100, 105, 105))
+    assert len(index) == 1
+    assert index.query_point(2, 2) == []
+    assert index.query_point(102, 102) == [item]
+    assert index.remove(item)
+    assert not index.remove(item)
+    assert item not in index
+    assert index.query_rect((0, 0, 200, 200)) == []
+    assert not index._cells
+
+
+def test_negative_coordinates():
+    index = GridIndex(cell_size=10)
+    item = Item('item')
+    index.insert(item, (-15, -15, -5, -5))
+    assert index.query_point(-10, -10) == [item]
+    assert index.query_rect((-6, -6, 0, 0)) == [item]